@@ -1,36 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
 
-from app.database import get_db
-from app.models import Channel, ChannelStatsSnapshot
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.database import get_db, get_read_db
+from app.models import Channel, ChannelHeatmap, ChannelPsychographics
+from app.api.deps import get_current_identity
+from app.api.pagination import keyset, page_size_query, split_page
+from app.api.responses import FastJSONResponse
+from app.services import heatmap, portfolio, rollups, stats_import
+from app.services.user_cache import UserIdentity
 
 router = APIRouter()
 
+IMPORT_CHUNK_SIZE = 64 * 1024
+COMMENTS_BATCH_MAX = 10000
+
 
 class ChannelStats(BaseModel):
     channel_id: int
     subscribers_count: int | None
     growth_7d: float | None
+    growth: int | None
     er_estimate: float | None
     period_days: int
 
 
+class PortfolioChannel(BaseModel):
+    id: int
+    title: str | None
+    username: str | None
+    subscribers_count: int | None
+    growth: int | None
+    er_estimate: float | None
+    posts_count: int
+    competitors_count: int
+    pending_outgoing: int
+    pending_incoming: int
+
+
+class PortfolioOut(BaseModel):
+    channels: list[PortfolioChannel]
+    tariff: str
+    period_days: int
+
+
+class CommentsIn(BaseModel):
+    comments: list[str] = Field(..., min_length=1, max_length=COMMENTS_BATCH_MAX)
+
+
+class StatsImportOut(BaseModel):
+    rows: int
+    skipped: int
+    snapshots_written: int
+    seconds: float
+    rows_per_second: float
+
+
 class PsychographicOut(BaseModel):
     emotions: dict[str, float]
     types: dict[str, float]
     sample_comments_count: int
 
 
+def _psychographic_out(row: ChannelPsychographics | None) -> PsychographicOut:
+    from app.services import psychographics
+    return PsychographicOut(
+        emotions=psychographics.distribution(row.emotion_counts if row else {}, psychographics.EMOTIONS),
+        types=psychographics.distribution(row.type_counts if row else {}, psychographics.TYPES),
+        sample_comments_count=row.comments_count if row else 0,
+    )
+
+
 @router.get("/channel/{channel_id}", response_model=ChannelStats)
 async def get_channel_analytics(
     channel_id: int,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    period_days: int = Query(7, ge=1, le=3650),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     result = await db.execute(
         select(Channel).where(
@@ -40,24 +88,33 @@ async def get_channel_analytics(
     )
     channel = result.scalar_one_or_none()
     if not channel:
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Channel not found")
+    today = datetime.utcnow().date()
+    stats = await rollups.window(db, channel_id, today - timedelta(days=period_days - 1), today)
+    week = stats if period_days == 7 else await rollups.window(db, channel_id, today - timedelta(days=6), today)
+    subscribers = channel.subscribers_count
+    if subscribers is None and stats:
+        subscribers = stats.subscribers_count
     return ChannelStats(
         channel_id=channel.id,
-        subscribers_count=channel.subscribers_count,
-        growth_7d=None,
-        er_estimate=None,
-        period_days=7,
+        subscribers_count=subscribers,
+        growth_7d=week.growth if week else None,
+        growth=stats.growth if stats else None,
+        er_estimate=stats.er if stats else None,
+        period_days=period_days,
     )
 
 
 @router.get("/dashboard")
 async def get_dashboard(
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    cursor: str | None = Query(None),
+    page_size: int = page_size_query(),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
-    result = await db.execute(select(Channel).where(Channel.owner_id == user.id))
-    channels = result.scalars().all()
+    q = select(Channel).where(Channel.owner_id == user.id)
+    result = await db.execute(keyset(q, Channel.created_at, Channel.id, cursor, page_size))
+    channels, next_cursor = split_page(result.scalars().all(), page_size, lambda c: (c.created_at, c.id))
     return {
         "channels": [
             {
@@ -69,98 +126,99 @@ async def get_dashboard(
             for c in channels
         ],
         "tariff": user.tariff,
+        "next_cursor": next_cursor,
     }
 
 
+@router.get("/portfolio", response_model=PortfolioOut)
+async def get_portfolio(
+    period_days: int = Query(7, ge=1, le=3650),
+    user: UserIdentity = Depends(get_current_identity),
+):
+    return PortfolioOut(
+        channels=await portfolio.load(user.id, period_days),
+        tariff=user.tariff,
+        period_days=period_days,
+    )
+
+
 @router.get("/channel/{channel_id}/heatmap", response_model=dict)
 async def get_channel_heatmap(
     channel_id: int,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
-    ch = await db.execute(
-        select(Channel).where(
-            Channel.id == channel_id,
-            Channel.owner_id == user.id,
-        )
-    )
-    channel = ch.scalar_one_or_none()
-    if not channel:
-        raise HTTPException(status_code=404, detail="Channel not found")
     result = await db.execute(
-        select(ChannelStatsSnapshot).where(
-            ChannelStatsSnapshot.channel_id == channel_id,
-            ChannelStatsSnapshot.period_type == "heatmap",
-        )
+        select(Channel.id, ChannelHeatmap)
+        .outerjoin(ChannelHeatmap, ChannelHeatmap.channel_id == Channel.id)
+        .where(Channel.id == channel_id, Channel.owner_id == user.id)
     )
-    snapshots = result.scalars().all()
-    key_to_cell = {(s.period_value, s.day_of_week or 0): s for s in snapshots}
-    heatmap = []
-    for h in range(24):
-        for d in range(7):
-            cell = key_to_cell.get((h, d))
-            if cell and cell.posts_count:
-                avg_v = cell.total_views / cell.posts_count
-                avg_r = cell.total_reactions / cell.posts_count
-                heatmap.append({
-                    "hour_utc": h,
-                    "day_of_week": d,
-                    "posts_count": cell.posts_count,
-                    "avg_views": avg_v,
-                    "avg_reactions": avg_r,
-                    "score": avg_v * 0.3 + avg_r * 10,
-                })
-            else:
-                heatmap.append({
-                    "hour_utc": h,
-                    "day_of_week": d,
-                    "posts_count": 0,
-                    "avg_views": 0.0,
-                    "avg_reactions": 0.0,
-                    "score": 0.0,
-                })
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    agg = row[1] or heatmap.empty_heatmap(channel_id)
     best_post_hour = 12
     best_reply_hour = 14
-    if heatmap:
-        by_score = sorted(heatmap, key=lambda x: x["score"], reverse=True)
-        if by_score and by_score[0]["score"] > 0:
-            best_post_hour = by_score[0]["hour_utc"]
-            best_reply_hour = (best_post_hour + 2) % 24
-    return {
+    if agg.best_slots and agg.best_slots[0]["score"] > 0:
+        best_post_hour = agg.best_slots[0]["hour_utc"]
+        best_reply_hour = (best_post_hour + 2) % 24
+    return FastJSONResponse({
         "channel_id": channel_id,
-        "cells": heatmap,
+        "cells": heatmap.heatmap_cells(agg),
         "best_post_hour_utc": best_post_hour,
         "best_reply_hour_utc": best_reply_hour,
-    }
+        "best_slots": agg.best_slots,
+    })
+
+
+@router.post("/channel/{channel_id}/import", response_model=StatsImportOut)
+async def import_channel_stats(
+    channel_id: int,
+    file: UploadFile = File(...),
+    format: str | None = Query(None, pattern="^(csv|ndjson|jsonl)$"),
+    db: AsyncSession = Depends(get_db),
+    user: UserIdentity = Depends(get_current_identity),
+):
+    owned = await db.scalar(select(Channel.id).where(Channel.id == channel_id, Channel.owner_id == user.id))
+    if not owned:
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    async def chunks():
+        while chunk := await file.read(IMPORT_CHUNK_SIZE):
+            yield chunk
+
+    fmt = format or stats_import.format_from_filename(file.filename)
+    report = await stats_import.import_records(db, channel_id, stats_import.aiter_records(chunks(), fmt))
+    return StatsImportOut(**report._asdict())
+
+
+@router.post("/channel/{channel_id}/comments", response_model=PsychographicOut)
+async def ingest_channel_comments(
+    channel_id: int,
+    payload: CommentsIn,
+    db: AsyncSession = Depends(get_db),
+    user: UserIdentity = Depends(get_current_identity),
+):
+    from app.services import psychographics
+    owned = await db.scalar(select(Channel.id).where(Channel.id == channel_id, Channel.owner_id == user.id))
+    if not owned:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    row = await psychographics.ingest(db, channel_id, payload.comments)
+    return _psychographic_out(row)
 
 
 @router.get("/channel/{channel_id}/psychographic", response_model=PsychographicOut)
 async def get_channel_psychographic(
     channel_id: int,
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
-    ch = await db.execute(
-        select(Channel).where(
-            Channel.id == channel_id,
-            Channel.owner_id == user.id,
-        )
+    result = await db.execute(
+        select(Channel.id, ChannelPsychographics)
+        .outerjoin(ChannelPsychographics, ChannelPsychographics.channel_id == Channel.id)
+        .where(Channel.id == channel_id, Channel.owner_id == user.id)
     )
-    if not ch.scalar_one_or_none():
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Channel not found")
-    return PsychographicOut(
-        emotions={
-            "joy": 0.35,
-            "trust": 0.28,
-            "interest": 0.22,
-            "neutral": 0.12,
-            "criticism": 0.03,
-        },
-        types={
-            "enthusiasts": 0.25,
-            "silent_readers": 0.55,
-            "critics": 0.08,
-            "discussants": 0.12,
-        },
-        sample_comments_count=0,
-    )
+    return _psychographic_out(row[1])
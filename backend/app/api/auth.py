@@ -3,9 +3,13 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.config import settings
 from app.database import get_db
 from app.models import User
-from app.services.auth import create_access_token
+from app.api.deps import access_payload, security
+from app.services import auth as auth_tokens
 from app.services.telegram_auth import verify_telegram_auth
 
 router = APIRouter()
@@ -22,12 +26,30 @@ class TelegramAuthInput(BaseModel):
     init_data: str | None = None
 
 
-class AuthResponse(BaseModel):
+class TokenResponse(BaseModel):
     access_token: str
+    refresh_token: str
+    expires_in: int
+
+
+class AuthResponse(TokenResponse):
     user_id: int
     tariff: str
 
 
+class RefreshInput(BaseModel):
+    refresh_token: str
+
+
+def _issue_tokens(user_id: int, telegram_id: int | None) -> dict:
+    claims = {"sub": str(user_id), "telegram_id": telegram_id}
+    return {
+        "access_token": auth_tokens.create_access_token(claims),
+        "refresh_token": auth_tokens.create_refresh_token(claims),
+        "expires_in": settings.access_token_ttl_seconds,
+    }
+
+
 def _auth_data_from_init_data(init_data: str) -> dict | None:
     from urllib.parse import parse_qs
     parsed = parse_qs(init_data, keep_blank_values=True)
@@ -78,9 +100,34 @@ async def telegram_login(
         db.add(user)
         await db.flush()
         await db.refresh(user)
-    token = create_access_token({"sub": str(user.id), "telegram_id": user.telegram_id})
     return AuthResponse(
-        access_token=token,
+        **_issue_tokens(user.id, user.telegram_id),
         user_id=user.id,
         tariff=user.tariff,
     )
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(payload: RefreshInput):
+    claims = auth_tokens.verify_token(payload.refresh_token, auth_tokens.REFRESH)
+    try:
+        consumed = bool(claims) and await auth_tokens.consume(claims)
+    except auth_tokens.RevocationUnavailable:
+        raise HTTPException(status_code=503, detail="Token refresh unavailable, retry shortly", headers={"Retry-After": "5"})
+    if not consumed:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return TokenResponse(**_issue_tokens(int(claims["sub"]), claims.get("telegram_id")))
+
+
+@router.post("/logout", status_code=204)
+async def logout(
+    payload: RefreshInput | None = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    access = access_payload(credentials)
+    revoked = [access]
+    if payload is not None:
+        claims = auth_tokens.verify_token(payload.refresh_token, auth_tokens.REFRESH)
+        if claims and claims.get("sub") == access.get("sub"):
+            revoked.append(claims)
+    await auth_tokens.revoke(*revoked)
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select
+from sqlalchemy import func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Channel
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.deps import get_current_identity
+from app.api.pagination import decode_rank_cursor, encode_cursor
+from app.services import channel_search, limits, negotiations
+from app.services.user_cache import UserIdentity
 
 router = APIRouter()
 
@@ -14,40 +16,70 @@ SEARCH_QUERIES_PER_WEEK_CREATOR = 5
 
 
 class ChannelSearchResult(BaseModel):
-    id: int
+    id: int | None
+    catalog_id: int
     title: str | None
     username: str | None
     subscribers_count: int | None
+    source: str
+    score: float
 
 
-@router.get("/search", response_model=list[ChannelSearchResult])
+class ChannelSearchPage(BaseModel):
+    items: list[ChannelSearchResult]
+    next_cursor: str | None
+
+
+async def _owned_channel_ids(db: AsyncSession, user_id: int, entries) -> dict:
+    usernames = [e.username for e in entries if e.username]
+    telegram_ids = [e.telegram_channel_id for e in entries if e.telegram_channel_id is not None]
+    if not usernames and not telegram_ids:
+        return {}
+    rows = (await db.execute(
+        select(Channel.id, Channel.username, Channel.telegram_channel_id).where(
+            Channel.owner_id == user_id,
+            or_(func.lower(Channel.username).in_(usernames), Channel.telegram_channel_id.in_(telegram_ids)),
+        )
+    )).all()
+    owned = {}
+    for channel_id, username, telegram_channel_id in rows:
+        owned[telegram_channel_id] = channel_id
+        if username:
+            owned[channel_search.normalize_username(username)] = channel_id
+    return owned
+
+
+@router.get("/search", response_model=ChannelSearchPage)
 async def search_channels(
     q: str = Query(..., min_length=1),
     limit: int = Query(10, ge=1, le=50),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    cursor: str | None = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
-    result = await db.execute(
-        select(Channel).where(
-            Channel.owner_id == user.id,
-        ).limit(limit * 3)
+    after = decode_rank_cursor(cursor)
+    matched = await channel_search.search(db, q, user.id, limit + 1, after)
+    next_cursor = None
+    if len(matched) > limit:
+        matched = matched[:limit]
+        last, score = matched[-1]
+        next_cursor = encode_cursor(score, last.id)
+    owned = await _owned_channel_ids(db, user.id, [c for c, _ in matched])
+    return ChannelSearchPage(
+        items=[
+            ChannelSearchResult(
+                id=owned.get(c.username) or owned.get(c.telegram_channel_id),
+                catalog_id=c.id,
+                title=c.title,
+                username=c.username,
+                subscribers_count=c.subscribers_count,
+                source=c.source,
+                score=score,
+            )
+            for c, score in matched
+        ],
+        next_cursor=next_cursor,
     )
-    channels = result.scalars().all()
-    q_lower = q.lower()
-    matched = [
-        c for c in channels
-        if (c.title and q_lower in c.title.lower())
-        or (c.username and q_lower in (c.username or "").lower())
-    ][:limit]
-    return [
-        ChannelSearchResult(
-            id=c.id,
-            title=c.title,
-            username=c.username,
-            subscribers_count=c.subscribers_count,
-        )
-        for c in matched
-    ]
 
 
 @router.post("/connect")
@@ -56,26 +88,21 @@ async def connect_channel(
     username: str | None = None,
     title: str | None = None,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     from app.models import Channel as ChannelModel
-    result = await db.execute(
-        select(Channel).where(Channel.owner_id == user.id)
-    )
-    owned = result.scalars().all()
-    max_channels = 1 if user.tariff == "creator" else (3 if user.tariff == "strategist" else 10)
-    if len(owned) >= max_channels:
-        from fastapi import HTTPException
-        raise HTTPException(
-            status_code=403,
-            detail=f"Tariff limit: max {max_channels} channels",
-        )
+    username = channel_search.clean_username(username)
     existing = await db.execute(
         select(Channel).where(Channel.telegram_channel_id == telegram_channel_id)
     )
     if existing.scalar_one_or_none():
         from fastapi import HTTPException
         raise HTTPException(status_code=400, detail="Channel already connected")
+    try:
+        await limits.reserve(db, user.id, user.tariff, limits.CHANNELS)
+    except limits.LimitExceeded as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=403, detail=str(e))
     ch = ChannelModel(
         owner_id=user.id,
         telegram_channel_id=telegram_channel_id,
@@ -85,4 +112,13 @@ async def connect_channel(
     db.add(ch)
     await db.flush()
     await db.refresh(ch)
+    await channel_search.upsert_entry(
+        db,
+        source="owned",
+        username=username,
+        title=title,
+        telegram_channel_id=telegram_channel_id,
+        owner_id=user.id,
+    )
+    await negotiations.claim_for_channel(db, user.id, username)
     return {"channel_id": ch.id, "title": ch.title, "username": ch.username}
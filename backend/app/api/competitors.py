@@ -1,30 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from sqlalchemy import select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
+from sqlalchemy.orm import aliased
+from pydantic import BaseModel, Field
+from typing import Literal
+from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Channel, Competitor
-from app.api.deps import get_current_user
-from app.models.user import User
+from app.api.deps import get_current_identity
+from app.api.pagination import keyset, page_size_query, split_page
+from app.api.responses import FastJSONResponse
+from app.services import ad_detector, benchmark, channel_search, limits
+from app.services.user_cache import UserIdentity
 
 router = APIRouter()
 
 
-def _max_competitors(tariff: str) -> int:
-    if tariff == "agency":
-        return 50
-    if tariff == "strategist":
-        return 15
-    return 1
-
-
 class CompetitorCreate(BaseModel):
     channel_id: int
     telegram_username: str
     title: str | None = None
 
 
+class AudienceIngest(BaseModel):
+    kind: Literal["channel", "competitor"]
+    id: int
+    member_ids: list[int] = Field(..., min_length=1, max_length=100000)
+
+
+class CompetitorPostIn(BaseModel):
+    competitor_id: int
+    text: str
+    post_url: str | None = None
+    posted_at: datetime | None = None
+
+
+class CompetitorPostsIn(BaseModel):
+    posts: list[CompetitorPostIn] = Field(..., min_length=1, max_length=1000)
+
+
 class CompetitorOut(BaseModel):
     id: int
     channel_id: int
@@ -35,11 +50,18 @@ class CompetitorOut(BaseModel):
     created_at: str
 
 
-@router.get("", response_model=list[CompetitorOut])
+class CompetitorPage(BaseModel):
+    items: list[CompetitorOut]
+    next_cursor: str | None
+
+
+@router.get("", response_model=CompetitorPage)
 async def list_competitors(
     channel_id: int | None = Query(None),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    cursor: str | None = Query(None),
+    page_size: int = page_size_query(),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     q = select(Competitor).where(Competitor.owner_id == user.id)
     if channel_id is not None:
@@ -47,58 +69,68 @@ async def list_competitors(
         if not ch.scalar_one_or_none():
             raise HTTPException(status_code=404, detail="Channel not found")
         q = q.where(Competitor.channel_id == channel_id)
-    result = await db.execute(q)
-    rows = result.scalars().all()
-    return [
-        CompetitorOut(
-            id=c.id,
-            channel_id=c.channel_id,
-            telegram_username=c.telegram_username,
-            title=c.title,
-            subscribers_count=c.subscribers_count,
-            er_estimate=c.er_estimate,
-            created_at=c.created_at.isoformat(),
-        )
-        for c in rows
-    ]
+    result = await db.execute(keyset(q, Competitor.created_at, Competitor.id, cursor, page_size))
+    rows, next_cursor = split_page(result.scalars().all(), page_size, lambda c: (c.created_at, c.id))
+    return CompetitorPage(
+        items=[
+            CompetitorOut(
+                id=c.id,
+                channel_id=c.channel_id,
+                telegram_username=c.telegram_username,
+                title=c.title,
+                subscribers_count=c.subscribers_count,
+                er_estimate=c.er_estimate,
+                created_at=c.created_at.isoformat(),
+            )
+            for c in rows
+        ],
+        next_cursor=next_cursor,
+    )
 
 
 @router.post("", response_model=CompetitorOut)
 async def add_competitor(
     payload: CompetitorCreate,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     ch = await db.execute(
         select(Channel).where(Channel.id == payload.channel_id, Channel.owner_id == user.id)
     )
     if not ch.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Channel not found")
-    result = await db.execute(select(Competitor).where(Competitor.owner_id == user.id))
-    current = len(result.scalars().all())
-    if current >= _max_competitors(user.tariff):
-        raise HTTPException(
-            status_code=403,
-            detail=f"Tariff limit: max {_max_competitors(user.tariff)} competitors",
-        )
+    telegram_username = channel_search.clean_username(payload.telegram_username)
+    if not telegram_username:
+        raise HTTPException(status_code=400, detail="Channel username required")
     existing = await db.execute(
         select(Competitor).where(
             Competitor.owner_id == user.id,
             Competitor.channel_id == payload.channel_id,
-            Competitor.telegram_username == payload.telegram_username.strip().lstrip("@"),
+            Competitor.telegram_username == telegram_username,
         )
     )
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Competitor already added")
+    try:
+        await limits.reserve(db, user.id, user.tariff, limits.COMPETITORS)
+    except limits.LimitExceeded as e:
+        raise HTTPException(status_code=403, detail=str(e))
     comp = Competitor(
         owner_id=user.id,
         channel_id=payload.channel_id,
-        telegram_username=payload.telegram_username.strip().lstrip("@"),
+        telegram_username=telegram_username,
         title=payload.title,
     )
     db.add(comp)
+    await db.execute(benchmark.bump_version([payload.channel_id]))
     await db.flush()
     await db.refresh(comp)
+    await channel_search.upsert_entry(
+        db,
+        source="competitor",
+        username=comp.telegram_username,
+        title=comp.title,
+    )
     return CompetitorOut(
         id=comp.id,
         channel_id=comp.channel_id,
@@ -113,8 +145,8 @@ async def add_competitor(
 @router.get("/benchmark")
 async def get_benchmark(
     channel_id: int = Query(...),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     ch = await db.execute(
         select(Channel).where(Channel.id == channel_id, Channel.owner_id == user.id)
@@ -122,38 +154,17 @@ async def get_benchmark(
     channel = ch.scalar_one_or_none()
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
-    result = await db.execute(
-        select(Competitor).where(
-            Competitor.owner_id == user.id,
-            Competitor.channel_id == channel_id,
-        )
-    )
-    competitors = result.scalars().all()
-    our_er = 0.0
-    our_subs = channel.subscribers_count or 0
-    niche_avg_er = 0.0
-    niche_avg_subs = 0
-    if competitors:
-        ers = [c.er_estimate for c in competitors if c.er_estimate is not None]
-        subs = [c.subscribers_count for c in competitors if c.subscribers_count is not None]
-        niche_avg_er = sum(ers) / len(ers) if ers else 0
-        niche_avg_subs = sum(subs) // len(subs) if subs else 0
-    return {
-        "channel_id": channel_id,
-        "your_subscribers": our_subs,
-        "your_er_estimate": our_er,
-        "niche_avg_subscribers": niche_avg_subs,
-        "niche_avg_er": niche_avg_er,
-        "competitors_count": len(competitors),
-    }
+    return await benchmark.niche_benchmark(db, channel, user.id)
 
 
 @router.get("/ads-tracker")
 async def get_ads_tracker(
     channel_id: int = Query(...),
     competitor_id: int | None = Query(None),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    cursor: str | None = Query(None),
+    page_size: int = page_size_query(),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     from app.models import CompetitorAdActivity
 
@@ -162,53 +173,112 @@ async def get_ads_tracker(
     )
     if not ch.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Channel not found")
-    q = select(Competitor).where(Competitor.owner_id == user.id, Competitor.channel_id == channel_id)
+    q = select(Competitor.id).where(Competitor.owner_id == user.id, Competitor.channel_id == channel_id)
     if competitor_id is not None:
         q = q.where(Competitor.id == competitor_id)
-    comps = (await db.execute(q)).scalars().all()
-    comp_ids = [c.id for c in comps]
-    if not comp_ids:
-        return {"activities": []}
-    q2 = select(CompetitorAdActivity).where(CompetitorAdActivity.competitor_id.in_(comp_ids))
-    acts = (await db.execute(q2)).scalars().all()
-    return {
+    competitor_ids = (await db.execute(q)).scalars().all()
+    acts = []
+    if competitor_ids:
+        A = CompetitorAdActivity
+        pages = [
+            keyset(select(A).where(A.competitor_id == cid), A.detected_at, A.id, cursor, page_size)
+            for cid in competitor_ids
+        ]
+        stmt = pages[0]
+        if len(pages) > 1:
+            merged = aliased(A, union_all(*(select(p.subquery()) for p in pages)).subquery())
+            stmt = select(merged).order_by(merged.detected_at.desc(), merged.id.desc()).limit(page_size + 1)
+        acts = (await db.execute(stmt)).scalars().all()
+    acts, next_cursor = split_page(acts, page_size, lambda a: (a.detected_at, a.id))
+    return FastJSONResponse({
         "activities": [
             {
                 "id": a.id,
                 "competitor_id": a.competitor_id,
-                "detected_at": a.detected_at.isoformat(),
+                "detected_at": a.detected_at,
                 "description": a.description,
+                "post_url": a.post_url,
             }
             for a in acts
         ],
-    }
+        "next_cursor": next_cursor,
+    })
+
+
+@router.post("/posts")
+async def ingest_competitor_posts(
+    payload: CompetitorPostsIn,
+    db: AsyncSession = Depends(get_db),
+    user: UserIdentity = Depends(get_current_identity),
+):
+    ids = {p.competitor_id for p in payload.posts}
+    result = await db.execute(
+        select(Competitor.id, Competitor.telegram_username).where(
+            Competitor.id.in_(ids),
+            Competitor.owner_id == user.id,
+        )
+    )
+    usernames = dict(result.all())
+    if len(usernames) != len(ids):
+        raise HTTPException(status_code=404, detail="Competitor not found")
+    detections = ad_detector.detect(
+        ad_detector.Post(p.competitor_id, p.text, p.post_url, p.posted_at, usernames[p.competitor_id])
+        for p in payload.posts
+    )
+    inserted = await ad_detector.write(db, detections)
+    return {"posts": len(payload.posts), "ads_detected": len(detections), "ads_recorded": inserted}
+
+
+@router.post("/audience-sketch")
+async def ingest_audience(
+    payload: AudienceIngest,
+    db: AsyncSession = Depends(get_db),
+    user: UserIdentity = Depends(get_current_identity),
+):
+    from app.services import audience
+    model = Channel if payload.kind == "channel" else Competitor
+    owned = await db.scalar(select(model.id).where(model.id == payload.id, model.owner_id == user.id))
+    if not owned:
+        raise HTTPException(status_code=404, detail=f"{payload.kind.capitalize()} not found")
+    row = await audience.ingest(db, payload.kind, payload.id, payload.member_ids)
+    return {"kind": row.kind, "id": row.ref_id, "members_ingested": row.members_ingested}
 
 
 @router.get("/audience-overlap")
 async def get_audience_overlap(
     channel_id: int = Query(...),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
+    from app.services import audience
     ch = await db.execute(
-        select(Channel).where(Channel.id == channel_id, Channel.owner_id == user.id)
+        select(Channel.id).where(Channel.id == channel_id, Channel.owner_id == user.id)
     )
     if not ch.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Channel not found")
     result = await db.execute(
-        select(Competitor).where(
+        select(Competitor.id, Competitor.telegram_username, Competitor.title).where(
             Competitor.owner_id == user.id,
             Competitor.channel_id == channel_id,
         )
     )
-    comps = result.scalars().all()
+    comps = result.all()
+    sketches = await audience.load(db, [("channel", channel_id)] + [("competitor", c.id) for c in comps])
+    own = sketches.get(("channel", channel_id))
+    measured = [c for c in comps if ("competitor", c.id) in sketches]
+    estimates = {}
+    if own is not None and measured:
+        results = audience.overlaps(own, [sketches[("competitor", c.id)] for c in measured])
+        estimates = {c.id: est for c, est in zip(measured, results)}
     overlaps = []
     for c in comps:
+        est = estimates.get(c.id)
         overlaps.append({
             "competitor_id": c.id,
             "competitor_username": c.telegram_username,
             "competitor_title": c.title,
-            "overlap_estimate": None,
-            "came_from_you_estimate": None,
+            "overlap_estimate": round(est.shared) if est else None,
+            "came_from_you_estimate": round(est.shared / est.audience, 4) if est and est.audience else None,
+            "jaccard_estimate": round(est.jaccard, 4) if est else None,
         })
     return {"channel_id": channel_id, "overlaps": overlaps}
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from datetime import datetime, timedelta
-
-from app.api.deps import get_current_user
-from app.models import User
-from app.database import async_session
-from app.services import content_generator
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import Literal
+from datetime import datetime
+
+from app.api.deps import get_current_identity
+from app.config import settings
+from app.services import content_generator, llm, quota
+from app.services.user_cache import UserIdentity
+
+log = logging.getLogger(__name__)
 
 router = APIRouter()
 
-CREATOR_WEEKLY_LIMIT = 5
-
 
 class GeneratePostInput(BaseModel):
     topic: str
@@ -46,107 +53,208 @@ class MassPersonalInput(BaseModel):
     count: int = 5
 
 
-def _get_weekly_limit(tariff: str) -> int:
-    if tariff == "agency":
-        return 999999
-    if tariff == "strategist":
-        return 100
-    return CREATOR_WEEKLY_LIMIT
+class BulkReplyInput(BaseModel):
+    comments: list[str] = Field(..., min_length=1)
+    mode: Literal["reputation", "personal"] = "reputation"
+
 
+def _cache_allowed(cache_control: str | None = Header(None)) -> bool:
+    directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+    return not directives & {"no-cache", "no-store"}
 
-def _need_reset_week(user: User) -> bool:
-    if not user.content_week_reset_at:
-        return True
-    return datetime.utcnow() >= user.content_week_reset_at
 
+async def _reserve(user_id: int, amount: int = 1) -> quota.Reservation:
+    try:
+        return await quota.reserve(user_id, amount)
+    except quota.UnknownUser:
+        raise HTTPException(status_code=404, detail="User not found")
+    except quota.QuotaExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Weekly limit ({e.limit}) reached. Upgrade for more.",
+        )
 
-async def _consume_generation(user_id: int) -> None:
-    async with async_session() as db:
-        u = await db.get(User, user_id)
-        if not u:
-            raise HTTPException(status_code=404, detail="User not found")
-        if _need_reset_week(u):
-            u.content_generations_used_this_week = 0
-            u.content_week_reset_at = datetime.utcnow() + timedelta(days=7)
-        limit = _get_weekly_limit(u.tariff)
-        if u.content_generations_used_this_week >= limit:
-            raise HTTPException(status_code=429, detail=f"Weekly limit ({limit}) reached.")
-        u.content_generations_used_this_week += 1
-        await db.commit()
+
+@asynccontextmanager
+async def _generation(user_id: int, amount: int = 1):
+    reservation = await _reserve(user_id, amount)
+    async with quota.settle(reservation):
+        try:
+            yield reservation
+        except llm.LLMBusy as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
 
 @router.post("/generate-post", response_model=GeneratePostResponse)
 async def generate_post(
     payload: GeneratePostInput,
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
+    use_cache: bool = Depends(_cache_allowed),
 ):
-    async with async_session() as db:
-        u = await db.get(User, user.id)
-        if not u:
-            raise HTTPException(status_code=404, detail="User not found")
-        if _need_reset_week(u):
-            u.content_generations_used_this_week = 0
-            u.content_week_reset_at = datetime.utcnow() + timedelta(days=7)
-        limit = _get_weekly_limit(u.tariff)
-        if u.content_generations_used_this_week >= limit:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Weekly limit ({limit}) reached. Upgrade for more.",
-            )
-        text = await content_generator.generate_post_text(payload.topic, payload.style_hint)
-        u.content_generations_used_this_week += 1
-        await db.commit()
+    async with _generation(user.id):
+        text = await content_generator.generate_post_text(payload.topic, payload.style_hint, use_cache=use_cache)
     return GeneratePostResponse(
         text=text,
         generated_at=datetime.utcnow().isoformat(),
     )
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _event_stream(reservation: quota.Reservation, chunks, **done_fields):
+    async with quota.settle(reservation):
+        try:
+            async for delta in chunks:
+                yield _sse("delta", {"text": delta})
+        except llm.LLMBusy as e:
+            await reservation.refund()
+            yield _sse("error", {"detail": str(e)})
+            return
+        except Exception:
+            log.exception("content stream failed")
+            await reservation.refund()
+            yield _sse("error", {"detail": "Generation failed, please retry"})
+            return
+        yield _sse("done", {**done_fields, "generated_at": datetime.utcnow().isoformat()})
+
+
+def _streaming_response(events, reservation: quota.Reservation | None = None) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(reservation.refund) if reservation else None,
+    )
+
+
+@router.post("/generate-post/stream")
+async def generate_post_stream(
+    payload: GeneratePostInput,
+    user: UserIdentity = Depends(get_current_identity),
+):
+    reservation = await _reserve(user.id)
+    chunks = content_generator.stream_post_text(payload.topic, payload.style_hint)
+    return _streaming_response(_event_stream(reservation, chunks), reservation)
+
+
 @router.post("/viral-hypothesis")
 async def viral_hypothesis(
     payload: ViralHypothesisInput,
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
+    use_cache: bool = Depends(_cache_allowed),
 ):
-    await _consume_generation(user.id)
-    text = await content_generator.generate_viral_hypothesis(payload.topic, payload.niche)
+    async with _generation(user.id):
+        text = await content_generator.generate_viral_hypothesis(payload.topic, payload.niche, use_cache=use_cache)
     return {"text": text, "generated_at": datetime.utcnow().isoformat()}
 
 
 @router.post("/repurpose")
 async def repurpose(
     payload: RepurposeInput,
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
+    use_cache: bool = Depends(_cache_allowed),
 ):
-    await _consume_generation(user.id)
-    text = await content_generator.repurpose_content(payload.source_text, payload.target_format)
+    async with _generation(user.id):
+        text = await content_generator.repurpose_content(payload.source_text, payload.target_format, use_cache=use_cache)
     return {"text": text, "target_format": payload.target_format, "generated_at": datetime.utcnow().isoformat()}
 
 
+@router.post("/repurpose/stream")
+async def repurpose_stream(
+    payload: RepurposeInput,
+    user: UserIdentity = Depends(get_current_identity),
+):
+    reservation = await _reserve(user.id)
+    chunks = content_generator.stream_repurpose_content(payload.source_text, payload.target_format)
+    return _streaming_response(
+        _event_stream(reservation, chunks, target_format=payload.target_format),
+        reservation,
+    )
+
+
 @router.post("/smart-sandwich")
 async def smart_sandwich(
     payload: SmartSandwichInput,
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
+    use_cache: bool = Depends(_cache_allowed),
 ):
-    await _consume_generation(user.id)
-    data = await content_generator.smart_sandwich(payload.post_context)
+    async with _generation(user.id):
+        data = await content_generator.smart_sandwich(payload.post_context, use_cache=use_cache)
     return {"comments": data, "generated_at": datetime.utcnow().isoformat()}
 
 
 @router.post("/reputation-templates")
 async def reputation_templates(
     payload: ReputationInput,
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
+    use_cache: bool = Depends(_cache_allowed),
 ):
-    await _consume_generation(user.id)
-    templates = await content_generator.reputation_reply(payload.negative_comment)
+    async with _generation(user.id):
+        templates = await content_generator.reputation_reply(payload.negative_comment, use_cache=use_cache)
     return {"templates": templates, "generated_at": datetime.utcnow().isoformat()}
 
 
 @router.post("/mass-personal-reply")
 async def mass_personal_reply(
     payload: MassPersonalInput,
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
+    use_cache: bool = Depends(_cache_allowed),
 ):
-    await _consume_generation(user.id)
-    replies = await content_generator.mass_personal_replies(payload.base_comment, min(payload.count, 10))
+    async with _generation(user.id):
+        replies = await content_generator.mass_personal_replies(payload.base_comment, min(payload.count, 10), use_cache=use_cache)
     return {"replies": replies, "generated_at": datetime.utcnow().isoformat()}
+
+
+async def _bulk_pack(user_id: int, pack: list[tuple[int, str]], mode: str, semaphore: asyncio.Semaphore, use_cache: bool) -> dict:
+    indexes = [i for i, _ in pack]
+    async with semaphore:
+        try:
+            reservation = await quota.reserve(user_id, len(pack))
+        except quota.UnknownUser:
+            return {"indexes": indexes, "detail": "User not found"}
+        except quota.QuotaExceeded as e:
+            return {"indexes": indexes, "detail": f"Weekly limit ({e.limit}) reached. Upgrade for more."}
+        try:
+            async with quota.settle(reservation):
+                replies = await content_generator.bulk_replies([c for _, c in pack], mode, use_cache=use_cache)
+        except llm.LLMBusy as e:
+            return {"indexes": indexes, "detail": str(e)}
+    return {"items": [{"index": i, "comment": c, "replies": r} for (i, c), r in zip(pack, replies)]}
+
+
+async def _bulk_events(user_id: int, payload: BulkReplyInput, use_cache: bool):
+    semaphore = asyncio.Semaphore(settings.content_bulk_concurrency)
+    indexed = list(enumerate(payload.comments))
+    size = settings.content_bulk_pack_size
+    tasks = [
+        asyncio.ensure_future(_bulk_pack(user_id, indexed[i:i + size], payload.mode, semaphore, use_cache))
+        for i in range(0, len(indexed), size)
+    ]
+    completed = failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if "detail" in result:
+                failed += len(result["indexes"])
+                yield _sse("error", result)
+                continue
+            for item in result["items"]:
+                completed += 1
+                yield _sse("item", item)
+        yield _sse("done", {"completed": completed, "failed": failed, "generated_at": datetime.utcnow().isoformat()})
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/bulk-reply/stream")
+async def bulk_reply_stream(
+    payload: BulkReplyInput,
+    user: UserIdentity = Depends(get_current_identity),
+    use_cache: bool = Depends(_cache_allowed),
+):
+    if len(payload.comments) > settings.content_bulk_max_comments:
+        raise HTTPException(status_code=400, detail=f"Max {settings.content_bulk_max_comments} comments per request")
+    return _streaming_response(_bulk_events(user.id, payload, use_cache))
@@ -3,27 +3,61 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, async_session
 from app.models import User
-from app.services.auth import verify_token
+from app.services import user_cache
+from app.services.auth import is_revoked, verify_token
+from app.services.user_cache import UserIdentity
 
 security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+def access_payload(credentials: HTTPAuthorizationCredentials | None) -> dict:
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     payload = verify_token(credentials.credentials)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+async def _user_id_from_credentials(credentials: HTTPAuthorizationCredentials | None) -> int:
+    payload = access_payload(credentials)
+    if await is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token revoked")
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
-    result = await db.execute(select(User).where(User.id == int(user_id)))
+    return int(user_id)
+
+
+async def _load_user(db: AsyncSession, user_id: int) -> User:
+    result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    await user_cache.store_user(user)
     return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    user_id = await _user_id_from_credentials(credentials)
+    cached = await user_cache.get_user_data(user_id)
+    if cached is not None:
+        return user_cache.to_user(cached)
+    return await _load_user(db, user_id)
+
+
+async def get_current_identity(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> UserIdentity:
+    user_id = await _user_id_from_credentials(credentials)
+    cached = await user_cache.get_user_data(user_id)
+    if cached is None:
+        async with async_session() as db:
+            user = await _load_user(db, user_id)
+        return UserIdentity(user.id, user.tariff)
+    return UserIdentity(cached["id"], cached["tariff"])
@@ -0,0 +1,63 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+
+from app.config import settings
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> list | None:
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def decode_rank_cursor(cursor: str | None) -> tuple[float, int] | None:
+    after = decode_cursor(cursor)
+    if after is None:
+        return None
+    if len(after) != 2 or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in after):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    rank, row_id = after
+    if not math.isfinite(rank) or not isinstance(row_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return float(rank), row_id
+
+
+def page_size_query(default: int | None = None):
+    return Query(default or settings.page_size_default, ge=1, le=settings.page_size_max)
+
+
+def keyset(stmt, created_col, id_col, cursor: str | None, page_size: int):
+    after = decode_cursor(cursor)
+    if after is not None:
+        if len(after) != 2:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        try:
+            created, row_id = datetime.fromisoformat(after[0]), int(after[1])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(tuple_(created_col, id_col) < tuple_(created, row_id))
+    return stmt.order_by(created_col.desc(), id_col.desc()).limit(page_size + 1)
+
+
+def split_page(rows: list, page_size: int, key) -> tuple[list, str | None]:
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    created, row_id = key(rows[-1])
+    return rows, encode_cursor(created.isoformat(), row_id)
@@ -1,16 +1,20 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.database import get_db
-from app.models import Channel, NegotiationRequest, User
-from app.api.deps import get_current_user
+from app.database import get_db, get_read_db
+from app.models import Channel, ChannelCatalogEntry, NegotiationRequest
+from app.api.deps import get_current_identity
+from app.api.pagination import keyset, page_size_query, split_page
+from app.api.responses import FastJSONResponse
+from app.services import channel_search, limits, negotiations
+from app.services.user_cache import UserIdentity
 
 router = APIRouter()
 
 SCOUT_MAX_RESULTS = 10
-STRATEGIST_NEGOTIATION_LIMIT = 20
 
 
 class ScoutChannel(BaseModel):
@@ -41,29 +45,54 @@ class NegotiationOut(BaseModel):
 async def partner_scout(
     channel_id: int = Query(...),
     limit: int = Query(5, ge=1, le=SCOUT_MAX_RESULTS),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
+    from app.services import similarity
     ch = await db.execute(
         select(Channel).where(Channel.id == channel_id, Channel.owner_id == user.id)
     )
-    if not ch.scalar_one_or_none():
+    channel = ch.scalar_one_or_none()
+    if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
+    username = channel_search.normalize_username(channel.username)
+    entry = (await db.execute(
+        select(ChannelCatalogEntry).where(
+            ChannelCatalogEntry.username == username
+            if username
+            else ChannelCatalogEntry.telegram_channel_id == channel.telegram_channel_id
+        )
+    )).scalar_one_or_none()
+    subscribers = channel.subscribers_count
+    if subscribers is None and entry:
+        subscribers = entry.subscribers_count
+    vec = similarity.featurize(
+        channel.title,
+        entry.description if entry else None,
+        channel.username,
+        subscribers,
+        entry.er_estimate if entry else None,
+    )
+    index = similarity.get_index()
+    await index.reload()
+    ranked = await asyncio.to_thread(index.query, vec, limit, {entry.id} if entry else set())
+    if not ranked:
+        return []
     result = await db.execute(
-        select(Channel).where(Channel.owner_id == user.id).limit(50)
+        select(ChannelCatalogEntry).where(ChannelCatalogEntry.id.in_([i for i, _ in ranked]))
     )
-    my_channels = result.scalars().all()
-    suggested = [
+    by_id = {e.id: e for e in result.scalars().all()}
+    return [
         ScoutChannel(
-            username=f"niche_channel_{i}",
-            title=f"Канал в вашей нише {i}",
-            subscribers_count=5000 + i * 1000,
-            er_estimate=0.03 + i * 0.005,
-            relevance_score=0.9 - i * 0.05,
+            username=by_id[i].username,
+            title=by_id[i].title,
+            subscribers_count=by_id[i].subscribers_count,
+            er_estimate=by_id[i].er_estimate,
+            relevance_score=round(score, 4),
         )
-        for i in range(1, limit + 1)
+        for i, score in ranked
+        if i in by_id
     ]
-    return suggested
 
 
 def _negotiation_allowed(tariff: str) -> bool:
@@ -74,7 +103,7 @@ def _negotiation_allowed(tariff: str) -> bool:
 async def create_negotiation(
     payload: NegotiationCreate,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     if not _negotiation_allowed(user.tariff):
         raise HTTPException(status_code=403, detail="Available on Strategist or Agency tariff")
@@ -84,22 +113,20 @@ async def create_negotiation(
     channel = ch.scalar_one_or_none()
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
-    if user.tariff == "strategist":
-        count = await db.scalar(
-            select(func.count()).select_from(NegotiationRequest).where(
-                NegotiationRequest.from_user_id == user.id,
-                NegotiationRequest.status == "pending",
-            )
-        )
-        if (count or 0) >= STRATEGIST_NEGOTIATION_LIMIT:
-            raise HTTPException(status_code=429, detail=f"Limit {STRATEGIST_NEGOTIATION_LIMIT} active negotiations")
-    to_username = payload.to_channel_username.strip().lstrip("@")
+    to_username = channel_search.clean_username(payload.to_channel_username)
+    if not to_username:
+        raise HTTPException(status_code=400, detail="Channel username required")
+    try:
+        await limits.reserve(db, user.id, user.tariff, limits.NEGOTIATIONS)
+    except limits.LimitExceeded as e:
+        raise HTTPException(status_code=429, detail=f"Limit {e.limit} active negotiations")
     req = NegotiationRequest(
         from_user_id=user.id,
         from_channel_id=payload.from_channel_id,
         to_channel_username=to_username,
         proposed_text=payload.proposed_text,
         status="pending",
+        to_user_id=await negotiations.resolve_recipient(db, to_username),
     )
     db.add(req)
     await db.flush()
@@ -118,72 +145,54 @@ async def create_negotiation(
 @router.get("/negotiation", response_model=dict)
 async def list_negotiations(
     direction: str = Query("sent", regex="^(sent|received)$"),
-    db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    cursor: str | None = Query(None),
+    page_size: int = page_size_query(),
+    db: AsyncSession = Depends(get_read_db),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     if direction == "sent":
-        result = await db.execute(
-            select(NegotiationRequest, Channel.title).where(
-                NegotiationRequest.from_user_id == user.id,
-            ).join(Channel, NegotiationRequest.from_channel_id == Channel.id)
-        )
-        rows = result.all()
-        items = [
-            NegotiationOut(
-                id=r.id,
-                from_channel_id=r.from_channel_id,
-                to_channel_username=r.to_channel_username,
-                proposed_text=r.proposed_text,
-                status=r.status,
-                created_at=r.created_at.isoformat(),
-                from_channel_title=title,
-            )
-            for r, title in rows
-        ]
+        cond = NegotiationRequest.from_user_id == user.id
     else:
-        ch_result = await db.execute(select(Channel.username).where(Channel.owner_id == user.id))
-        my_usernames = [str(u).strip().lstrip("@").lower() for (u,) in ch_result.all() if u]
-        result = await db.execute(
-            select(NegotiationRequest).where(
-                func.lower(NegotiationRequest.to_channel_username).in_(my_usernames),
-            )
-        )
-        reqs = result.scalars().all()
-        for r in reqs:
-            if r.to_user_id is None:
-                r.to_user_id = user.id
-        await db.flush()
-        items = []
-        for r in reqs:
-            ch = await db.execute(select(Channel).where(Channel.id == r.from_channel_id))
-            channel = ch.scalar_one_or_none()
-            items.append(NegotiationOut(
-                id=r.id,
-                from_channel_id=r.from_channel_id,
-                to_channel_username=r.to_channel_username,
-                proposed_text=r.proposed_text,
-                status=r.status,
-                created_at=r.created_at.isoformat(),
-                from_channel_title=channel.title if channel else None,
-            ))
-    return {"items": items, "direction": direction}
+        cond = negotiations.addressed_to(user.id)
+    stmt = (
+        select(NegotiationRequest, Channel.title)
+        .join(Channel, NegotiationRequest.from_channel_id == Channel.id)
+        .where(cond)
+    )
+    result = await db.execute(keyset(stmt, NegotiationRequest.created_at, NegotiationRequest.id, cursor, page_size))
+    rows, next_cursor = split_page(result.all(), page_size, lambda row: (row[0].created_at, row[0].id))
+    items = [
+        {
+            "id": r.id,
+            "from_channel_id": r.from_channel_id,
+            "to_channel_username": r.to_channel_username,
+            "proposed_text": r.proposed_text,
+            "status": r.status,
+            "created_at": r.created_at,
+            "from_channel_title": title,
+        }
+        for r, title in rows
+    ]
+    return FastJSONResponse({"items": items, "direction": direction, "next_cursor": next_cursor})
 
 
 @router.post("/negotiation/{request_id}/accept")
 async def accept_negotiation(
     request_id: int,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     result = await db.execute(
         select(NegotiationRequest).where(
             NegotiationRequest.id == request_id,
-            NegotiationRequest.to_user_id == user.id,
-        )
+            negotiations.addressed_to(user.id),
+        ).with_for_update()
     )
     req = result.scalar_one_or_none()
     if not req:
         raise HTTPException(status_code=404, detail="Request not found")
+    if req.status == "pending":
+        await limits.release(db, req.from_user_id, limits.NEGOTIATIONS)
     req.status = "accepted"
     await db.flush()
     return {"status": "accepted"}
@@ -193,13 +202,13 @@ async def accept_negotiation(
 async def decline_negotiation(
     request_id: int,
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: UserIdentity = Depends(get_current_identity),
 ):
     result = await db.execute(
         select(NegotiationRequest).where(
             NegotiationRequest.id == request_id,
-            NegotiationRequest.to_user_id == user.id,
-        )
+            negotiations.addressed_to(user.id),
+        ).with_for_update()
     )
     req = result.scalar_one_or_none()
     if not req:
@@ -207,11 +216,13 @@ async def decline_negotiation(
             select(NegotiationRequest).where(
                 NegotiationRequest.id == request_id,
                 NegotiationRequest.from_user_id == user.id,
-            )
+            ).with_for_update()
         )
         req = result.scalar_one_or_none()
     if not req:
         raise HTTPException(status_code=404, detail="Request not found")
+    if req.status == "pending":
+        await limits.release(db, req.from_user_id, limits.NEGOTIATIONS)
     req.status = "declined"
     await db.flush()
     return {"status": "declined"}
@@ -0,0 +1,573 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+from app.config import settings
+
+
+async def _import_stats(args) -> None:
+    from app.database import async_session, engine
+    from app.models import Channel
+    from app.services import stats_import
+
+    fmt = args.format or stats_import.format_from_filename(args.path)
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as f:
+            async with async_session() as db:
+                if await db.get(Channel, args.channel_id) is None:
+                    sys.exit(f"channel {args.channel_id} not found")
+                report = await stats_import.import_records(
+                    db, args.channel_id, stats_import.iter_records(f, fmt)
+                )
+                await db.commit()
+    finally:
+        await engine.dispose()
+    print(
+        f"imported {report.rows} rows ({report.skipped} skipped) into "
+        f"{report.snapshots_written} snapshots in {report.seconds:.2f}s "
+        f"({report.rows_per_second:,.0f} rows/s)"
+    )
+
+
+async def _rebuild_rollups(args) -> None:
+    from sqlalchemy import select
+
+    from app.database import async_session, engine
+    from app.models import ChannelStatsSnapshot
+    from app.services import rollups
+
+    try:
+        async with async_session() as db:
+            channel_ids = args.channel_id or (await db.scalars(
+                select(ChannelStatsSnapshot.channel_id).where(ChannelStatsSnapshot.period_type == "daily").distinct()
+            )).all()
+        days = 0
+        for channel_id in channel_ids:
+            async with async_session() as db:
+                days += await rollups.rebuild(db, channel_id)
+                await db.commit()
+    finally:
+        await engine.dispose()
+    print(f"rebuilt {days} daily rollups for {len(channel_ids)} channels")
+
+
+async def _set_tariff(args) -> None:
+    from app.database import engine
+    from app.services import quota
+    from app.services.cache import close_redis
+
+    try:
+        if not await quota.set_tariff(args.user_id, args.tariff):
+            sys.exit(f"user {args.user_id} not found")
+    finally:
+        await close_redis()
+        await engine.dispose()
+    print(f"user {args.user_id} is now on {args.tariff}")
+
+
+async def _resync_limits(args) -> None:
+    from sqlalchemy import select
+
+    from app.database import async_session, engine
+    from app.models import UsageCounter
+    from app.services import limits
+    from app.services.cache import close_redis
+
+    stmt = select(UsageCounter.user_id, UsageCounter.resource).where(UsageCounter.resource.in_(limits.COUNTED))
+    if args.user_id:
+        stmt = stmt.where(UsageCounter.user_id.in_(args.user_id))
+    try:
+        async with async_session() as db:
+            counters = (await db.execute(stmt)).all()
+        corrected = 0
+        for user_id, resource in counters:
+            async with async_session() as db:
+                corrected += await limits.resync(db, user_id, resource)
+                await db.commit()
+    finally:
+        await close_redis()
+        await engine.dispose()
+    print(f"checked {len(counters)} usage counters, corrected {corrected}")
+
+
+async def _refresh_competitors(args) -> None:
+    from app.database import engine
+    from app.services import competitor_refresh
+    from app.services.cache import close_redis
+
+    if args.source_url:
+        source = competitor_refresh.TGStatSource(
+            args.source_url, args.token or settings.tgstat_api_key, settings.competitor_refresh_timeout_seconds
+        )
+    else:
+        source = competitor_refresh.default_source()
+    try:
+        if args.once:
+            report = await competitor_refresh.run_cycle(source, concurrency=args.concurrency)
+            print(
+                f"refreshed {report.updated}/{report.channels} channels "
+                f"({report.not_modified} not modified, {report.missing} missing, {report.failed} failed, "
+                f"{report.deferred} deferred) "
+                f"in {report.seconds:.2f}s"
+            )
+        else:
+            await competitor_refresh.run_forever(source)
+    finally:
+        await source.close()
+        await close_redis()
+        await engine.dispose()
+
+
+async def _ingest_comments(args) -> None:
+    import json
+    from itertools import islice
+
+    from app.database import async_session, engine
+    from app.models import Channel
+    from app.services import psychographics
+
+    started = time.monotonic()
+    total = 0
+    try:
+        with open(args.path, encoding="utf-8") as f:
+            lines = (line.rstrip("\n") for line in f if line.strip())
+            if args.ndjson:
+                lines = (json.loads(line).get("text") or "" for line in lines)
+            async with async_session() as db:
+                if await db.get(Channel, args.channel_id) is None:
+                    sys.exit(f"channel {args.channel_id} not found")
+                while batch := list(islice(lines, args.batch_size)):
+                    await psychographics.ingest(db, args.channel_id, batch)
+                    total += len(batch)
+                await db.commit()
+    finally:
+        await engine.dispose()
+    seconds = time.monotonic() - started
+    print(f"scored {total} comments in {seconds:.2f}s ({total / seconds if seconds else 0:,.0f} comments/s)")
+
+
+async def _detect_ads(args) -> None:
+    import json
+    from datetime import datetime
+
+    from sqlalchemy import select
+
+    from app.database import async_session, engine
+    from app.models import Competitor
+    from app.services import ad_detector
+
+    async with async_session() as db:
+        usernames = dict((await db.execute(select(Competitor.id, Competitor.telegram_username))).all())
+    stream = ad_detector.AdStream(batch_size=args.batch_size)
+    runner = asyncio.create_task(stream.run())
+    started = time.monotonic()
+    try:
+        with open(args.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                competitor_id = int(item["competitor_id"])
+                if competitor_id not in usernames:
+                    continue
+                posted_at = item.get("posted_at")
+                await stream.submit(ad_detector.Post(
+                    competitor_id,
+                    item.get("text") or "",
+                    item.get("post_url"),
+                    datetime.fromisoformat(posted_at) if posted_at else None,
+                    usernames[competitor_id],
+                ))
+        await stream.close()
+        stats = await runner
+    finally:
+        await engine.dispose()
+    seconds = time.monotonic() - started
+    print(
+        f"scanned {stats['posts']} posts in {seconds:.2f}s ({stats['posts'] / seconds if seconds else 0:,.0f} posts/s), "
+        f"{stats['ads']} ads detected, {stats['written']} new"
+    )
+
+
+async def _build_similarity_index(args) -> None:
+    from app.database import async_session, engine
+    from app.services import similarity
+
+    index = similarity.get_index()
+    full = args.full
+    try:
+        while True:
+            async with async_session() as db:
+                started = time.monotonic()
+                updated = await index.refresh(db, full=full)
+            print(f"indexed {updated} catalog entries in {time.monotonic() - started:.2f}s", flush=True)
+            if not args.watch:
+                break
+            full = False
+            await asyncio.sleep(args.watch)
+    finally:
+        await engine.dispose()
+
+
+_COLD_START = """
+import asyncio, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+asyncio.run(app.router.startup())
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+async def _bench_startup(args) -> None:
+    import statistics
+
+    runs = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", _COLD_START, stdout=asyncio.subprocess.PIPE
+        )
+        out, _ = await proc.communicate()
+        if proc.returncode:
+            sys.exit("cold start failed")
+        import_s, startup_s = map(float, out.split())
+        runs.append((time.perf_counter() - started, import_s, startup_s))
+    total, imports, startup = (statistics.median(col) * 1000 for col in zip(*runs))
+    print(
+        f"cold start over {args.runs} runs (median): {total:.0f}ms process, "
+        f"{imports:.0f}ms importing app.main, {startup:.0f}ms startup hooks"
+    )
+
+
+def _json_payloads() -> dict:
+    from datetime import datetime, timedelta
+
+    from app.api.partners import NegotiationOut
+    from app.models import ChannelHeatmap
+    from app.services import heatmap
+
+    now = datetime.utcnow()
+    agg = ChannelHeatmap(
+        posts=[i % 5 for i in range(heatmap.CELLS)],
+        views=[i * 137 for i in range(heatmap.CELLS)],
+        reactions=[i * 3 for i in range(heatmap.CELLS)],
+    )
+    cells = heatmap.heatmap_cells(agg)
+    heatmap_payload = {
+        "channel_id": 1,
+        "cells": cells,
+        "best_post_hour_utc": 12,
+        "best_reply_hour_utc": 14,
+        "best_slots": cells[:3],
+    }
+    activities = [
+        {
+            "id": i,
+            "competitor_id": i % 7,
+            "detected_at": now - timedelta(minutes=i),
+            "description": "erid; реклама; mentions @partner_channel",
+            "post_url": f"https://t.me/rival/{i}",
+        }
+        for i in range(settings.page_size_max)
+    ]
+    negotiations = [
+        {
+            "id": i,
+            "from_channel_id": i % 3,
+            "to_channel_username": f"partner_{i}",
+            "proposed_text": "Предлагаю взаимный пост на следующей неделе",
+            "status": "pending",
+            "created_at": now - timedelta(hours=i),
+            "from_channel_title": "Growth notes",
+        }
+        for i in range(settings.page_size_max)
+    ]
+    return {
+        "heatmap": (heatmap_payload, heatmap_payload),
+        "ads-tracker": (
+            {"activities": [{**a, "detected_at": a["detected_at"].isoformat()} for a in activities], "next_cursor": None},
+            {"activities": activities, "next_cursor": None},
+        ),
+        "negotiation inbox": (
+            {
+                "items": [NegotiationOut(**{**n, "created_at": n["created_at"].isoformat()}) for n in negotiations],
+                "direction": "sent",
+                "next_cursor": None,
+            },
+            {"items": negotiations, "direction": "sent", "next_cursor": None},
+        ),
+    }
+
+
+async def _bench_json(args) -> None:
+    import timeit
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from app.api.responses import FastJSONResponse
+
+    for name, (legacy, fast) in _json_payloads().items():
+        before = min(timeit.repeat(lambda: JSONResponse(jsonable_encoder(legacy)).body, number=args.number, repeat=5))
+        after = min(timeit.repeat(lambda: FastJSONResponse(fast).body, number=args.number, repeat=5))
+        size = len(FastJSONResponse(fast).body)
+        print(
+            f"{name:<18} {size / 1024:6.1f} KiB  jsonable_encoder+json {before / args.number * 1e6:8.1f}us  "
+            f"orjson {after / args.number * 1e6:7.1f}us  ({before / after:.1f}x)"
+        )
+
+
+async def _bench_reads(args) -> None:
+    from sqlalchemy import func, select
+
+    from app.database import async_session, engine, read_engine, read_session
+    from app.models import Channel, Competitor, User
+
+    async def request(factory, user_id: int) -> None:
+        async with factory() as db:
+            await db.scalar(select(User).where(User.id == user_id))
+            (await db.execute(
+                select(Channel).where(Channel.owner_id == user_id).order_by(Channel.created_at.desc()).limit(50)
+            )).scalars().all()
+            await db.scalar(select(func.count()).select_from(Competitor).where(Competitor.owner_id == user_id))
+            await db.commit()
+
+    async def run(factory, concurrency: int) -> float:
+        remaining = iter(range(args.requests))
+
+        async def worker():
+            for i in remaining:
+                await request(factory, i % 100 + 1)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return args.requests / (time.perf_counter() - started)
+
+    print(f"primary {engine.url.render_as_string()}, reads {read_engine.url.render_as_string()}")
+    try:
+        for concurrency in args.concurrency:
+            await run(async_session, concurrency)
+            primary = await run(async_session, concurrency)
+            await run(read_session, concurrency)
+            reads = await run(read_session, concurrency)
+            print(f"concurrency {concurrency:>3}: get_db {primary:8.0f} req/s   get_read_db {reads:8.0f} req/s")
+    finally:
+        await engine.dispose()
+        await read_engine.dispose()
+
+
+async def _bench_rollups(args) -> None:
+    import random
+    import tempfile
+    from datetime import date, datetime, timedelta
+
+    from sqlalchemy import insert, select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.database import Base
+    from app.models import Channel, ChannelStatsSnapshot, User
+    from app.services import rollups
+
+    url = args.url or f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='growthkit-bench-')}/rollups.db"
+    engine = create_async_engine(url)
+    session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    S = ChannelStatsSnapshot
+    today = date.today()
+    first = today - timedelta(days=args.days - 1)
+
+    async def scan(db, channel_id: int, since: date) -> tuple:
+        rows = (await db.execute(
+            select(S.posts_count, S.total_views, S.total_reactions, S.subscribers_count)
+            .where(
+                S.channel_id == channel_id,
+                S.period_type == "daily",
+                S.period_value >= int(since.strftime("%Y%m%d")),
+            )
+            .order_by(S.period_value, S.created_at, S.id)
+        )).all()
+        subs = [r.subscribers_count for r in rows if r.subscribers_count is not None]
+        return sum(r.posts_count for r in rows), sum(r.total_views for r in rows), subs[-1] - subs[0] if subs else None
+
+    async def timed(fn, *fn_args) -> float:
+        async with session() as db:
+            started = time.perf_counter()
+            for _ in range(args.number):
+                await fn(db, *fn_args)
+            return (time.perf_counter() - started) / args.number
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session() as db:
+            user = User(telegram_id=random.randrange(1 << 40))
+            db.add(user)
+            await db.flush()
+            channel = Channel(owner_id=user.id, telegram_channel_id=-random.randrange(1 << 40))
+            db.add(channel)
+            await db.flush()
+            now = datetime.utcnow()
+            rng = random.Random(7)
+            subscribers = 10_000
+            records = []
+            for n in range(args.days):
+                day = first + timedelta(days=n)
+                for _ in range(args.imports):
+                    subscribers += rng.randrange(-20, 60)
+                    records.append({
+                        "channel_id": channel.id, "period_type": "daily",
+                        "period_value": int(day.strftime("%Y%m%d")), "day_of_week": day.weekday(),
+                        "posts_count": rng.randrange(1, 6), "total_views": rng.randrange(1_000, 50_000),
+                        "total_reactions": rng.randrange(10, 900), "subscribers_count": subscribers, "created_at": now,
+                    })
+            await db.execute(insert(S), records)
+            started = time.perf_counter()
+            await rollups.rebuild(db, channel.id)
+            await db.commit()
+            print(f"{len(records)} daily snapshots over {args.days} days, rollups rebuilt in {time.perf_counter() - started:.2f}s")
+        for window in args.windows:
+            since = today - timedelta(days=window - 1)
+            before = await timed(scan, channel.id, since)
+            after = await timed(rollups.window, channel.id, since, today)
+            print(
+                f"{window:>4}-day window: snapshot scan {before * 1e3:7.2f}ms  "
+                f"rollups {after * 1e3:6.2f}ms  ({before / after:.1f}x)"
+            )
+    finally:
+        await engine.dispose()
+
+
+async def _bench_search(args) -> None:
+    import random
+    import statistics
+    import tempfile
+
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.database import Base
+    from app.models import ChannelCatalogEntry
+    from app.services import channel_search
+
+    url = args.url or f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='growthkit-bench-')}/search.db"
+    engine = create_async_engine(url)
+    session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    rng = random.Random(7)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randrange(4, 9))) for _ in range(2000)]
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        rows = []
+        for i in range(args.entries):
+            title = " ".join(rng.choice(words) for _ in range(3))
+            username = f"{rng.choice(words)}_{i}"
+            rows.append({
+                "username": username, "title": title, "source": "discovered",
+                "search_text": f"{username} {title}", "subscribers_count": rng.randrange(100, 500_000),
+            })
+        async with session() as db:
+            for i in range(0, len(rows), 5000):
+                await db.execute(insert(ChannelCatalogEntry), rows[i:i + 5000])
+            await db.commit()
+        queries = [rng.choice(words)[:rng.randrange(3, 7)] for _ in range(args.queries)]
+        latencies = []
+        async with session() as db:
+            await channel_search.search(db, queries[0], 1, 11)
+            for q in queries:
+                started = time.perf_counter()
+                await channel_search.search(db, q, 1, 11)
+                latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(
+            f"{args.entries} catalog entries, {len(queries)} queries on {engine.dialect.name}: "
+            f"p50 {statistics.median(latencies):.2f}ms  p95 {p95:.2f}ms  max {latencies[-1]:.2f}ms"
+        )
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import-stats", help="Bulk import historical post stats for a channel")
+    p.add_argument("channel_id", type=int)
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "ndjson", "jsonl"))
+    p.set_defaults(handler=_import_stats)
+
+    p = commands.add_parser("set-tariff", help="Change a user's tariff and drop their cached profile")
+    p.add_argument("user_id", type=int)
+    p.add_argument("tariff", choices=("creator", "strategist", "agency"))
+    p.set_defaults(handler=_set_tariff)
+
+    p = commands.add_parser("resync-limits", help="Recount tariff usage counters from the tables they track")
+    p.add_argument("--user-id", type=int, action="append", help="Limit to these users (repeatable)")
+    p.set_defaults(handler=_resync_limits)
+
+    p = commands.add_parser("refresh-competitors", help="Refresh competitor stats from the upstream stats API")
+    p.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+    p.add_argument("--concurrency", type=int)
+    p.add_argument("--source-url", help="Override the stats API base URL, e.g. a local fake server")
+    p.add_argument("--token", help="API token to send with --source-url")
+    p.set_defaults(handler=_refresh_competitors)
+
+    p = commands.add_parser("ingest-comments", help="Score comments into a channel's psychographic counters")
+    p.add_argument("channel_id", type=int)
+    p.add_argument("path", help="One comment per line, or NDJSON with a text field when --ndjson is set")
+    p.add_argument("--ndjson", action="store_true")
+    p.add_argument("--batch-size", type=int, default=5000)
+    p.set_defaults(handler=_ingest_comments)
+
+    p = commands.add_parser("detect-ads", help="Scan an NDJSON stream of competitor posts for ad placements")
+    p.add_argument("path", help="NDJSON with competitor_id, text, post_url and posted_at")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.set_defaults(handler=_detect_ads)
+
+    p = commands.add_parser("build-similarity-index", help="Update the partner scout similarity index")
+    p.add_argument("--full", action="store_true", help="Rebuild from scratch instead of applying changes")
+    p.add_argument("--watch", type=float, metavar="SECONDS", help="Keep running and apply changes every SECONDS")
+    p.set_defaults(handler=_build_similarity_index)
+
+    p = commands.add_parser("bench-startup", help="Measure worker cold start: process, app import and startup hooks")
+    p.add_argument("--runs", type=int, default=10)
+    p.set_defaults(handler=_bench_startup)
+
+    p = commands.add_parser("bench-json", help="Compare response serialization paths on representative payloads")
+    p.add_argument("--number", type=int, default=200)
+    p.set_defaults(handler=_bench_json)
+
+    p = commands.add_parser("rebuild-rollups", help="Recompute daily rollups from daily snapshots")
+    p.add_argument("--channel-id", type=int, action="append", help="Limit to these channels (repeatable)")
+    p.set_defaults(handler=_rebuild_rollups)
+
+    p = commands.add_parser("bench-rollups", help="Compare window stats from rollups against scanning daily snapshots")
+    p.add_argument("--url", help="Scratch database URL (defaults to a temporary SQLite file)")
+    p.add_argument("--days", type=int, default=730)
+    p.add_argument("--imports", type=int, default=3, help="Daily snapshots per day")
+    p.add_argument("--windows", type=int, nargs="+", default=[7, 30, 365])
+    p.add_argument("--number", type=int, default=200)
+    p.set_defaults(handler=_bench_rollups)
+
+    p = commands.add_parser("bench-search", help="Measure channel search latency percentiles on a seeded catalog")
+    p.add_argument("--url", help="Scratch database URL (defaults to a temporary SQLite file)")
+    p.add_argument("--entries", type=int, default=50_000)
+    p.add_argument("--queries", type=int, default=500)
+    p.set_defaults(handler=_bench_search)
+
+    p = commands.add_parser("bench-reads", help="Compare get_db and get_read_db on a typical three-query read request")
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 32])
+    p.set_defaults(handler=_bench_reads)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,20 +1,47 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
 
-engine = create_async_engine(settings.database_url, echo=False)
+
+def _engine_options(url: str, read_only: bool = False) -> dict:
+    parsed = make_url(url)
+    options = {
+        "echo": False,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+    if parsed.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+        )
+    if parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+        if read_only:
+            options["connect_args"]["server_settings"] = {"default_transaction_read_only": "on"}
+    if read_only:
+        options["isolation_level"] = "AUTOCOMMIT"
+        options["pool_reset_on_return"] = None
+        options["pool_pre_ping"] = False
+    return options
+
+
+engine = create_async_engine(settings.database_url, **_engine_options(settings.database_url))
+read_engine = (
+    create_async_engine(settings.database_read_url, **_engine_options(settings.database_read_url, read_only=True))
+    if settings.database_read_url
+    else engine.execution_options(isolation_level="AUTOCOMMIT")
+)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+read_session = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-
 async def get_db():
     async with async_session() as session:
         try:
@@ -25,3 +52,8 @@ async def get_db():
             raise
         finally:
             await session.close()
+
+
+async def get_read_db():
+    async with read_session() as session:
+        yield session
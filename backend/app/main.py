@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+import hmac
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import auth, analytics, content, channels, competitors, partners
-from app.database import init_db
+from app.api.responses import CompressionMiddleware, FastJSONResponse
+from app.config import settings
+from app.services import llm, llm_cache, telegram_auth, user_cache
+from app.services.cache import close_redis
+
+app = FastAPI(title="GrowthKit API", version="0.1.0", default_response_class=FastJSONResponse)
 
-app = FastAPI(title="GrowthKit API", version="0.1.0")
+app.add_middleware(CompressionMiddleware, minimum_size=settings.gzip_minimum_size)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,9 +31,26 @@ app.include_router(partners.router, prefix="/api/v1/partners", tags=["partners"]
 
 @app.on_event("startup")
 async def startup():
-    await init_db()
+    telegram_auth.bot_secret()
+    user_cache.start_listener()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await llm.close_client()
+    await user_cache.stop_listener()
+    await close_redis()
 
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: str | None = Header(None)):
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest((authorization or "").encode(), f"Bearer {settings.metrics_token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return {"llm": llm.stats(), "llm_cache": llm_cache.stats()}
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+
+log = logging.getLogger(__name__)
+
+BASELINE = "0001"
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _upgrade(connection, revision: str) -> None:
+    config = alembic_config()
+    config.attributes["connection"] = connection
+    tables = set(inspect(connection).get_table_names())
+    if "alembic_version" not in tables and "users" in tables:
+        log.info("existing schema without alembic_version, stamping %s", BASELINE)
+        command.stamp(config, BASELINE)
+    command.upgrade(config, revision)
+
+
+async def upgrade(revision: str = "head") -> None:
+    engine = create_async_engine(settings.database_url)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(_upgrade, revision)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate")
+    parser.add_argument("revision", nargs="?", default="head")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    asyncio.run(upgrade(args.revision))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,12 @@ from app.models.competitor import Competitor
 from app.models.channel_stats_snapshot import ChannelStatsSnapshot
 from app.models.competitor_ad import CompetitorAdActivity
 from app.models.negotiation_request import NegotiationRequest
+from app.models.channel_heatmap import ChannelHeatmap
+from app.models.channel_catalog import ChannelCatalogEntry
+from app.models.channel_daily_rollup import ChannelDailyRollup
+from app.models.usage_counter import UsageCounter
+from app.models.audience_sketch import AudienceSketch
+from app.models.channel_psychographics import ChannelPsychographics
 
 __all__ = [
     "User",
@@ -14,4 +20,10 @@ __all__ = [
     "ChannelStatsSnapshot",
     "CompetitorAdActivity",
     "NegotiationRequest",
+    "ChannelHeatmap",
+    "ChannelCatalogEntry",
+    "ChannelDailyRollup",
+    "UsageCounter",
+    "AudienceSketch",
+    "ChannelPsychographics",
 ]
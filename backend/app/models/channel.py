@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, String, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import BigInteger, String, Integer, DateTime, ForeignKey, JSON, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -7,6 +7,9 @@ from app.database import Base
 
 class Channel(Base):
     __tablename__ = "channels"
+    __table_args__ = (
+        Index("ix_channels_owner_created", "owner_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -15,7 +18,11 @@ class Channel(Base):
     title: Mapped[str | None] = mapped_column(String(512), nullable=True)
     subscribers_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
     raw_metadata: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    competitors_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = relationship("User", back_populates="channels")
+
+
+Index("ix_channels_username_lower", func.lower(Channel.username))
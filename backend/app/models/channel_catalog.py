@@ -0,0 +1,36 @@
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.database import Base
+
+
+class ChannelCatalogEntry(Base):
+    __tablename__ = "channel_catalog"
+    __table_args__ = (
+        Index(
+            "ix_channel_catalog_search_trgm",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_channel_catalog_username_prefix",
+            "username",
+            postgresql_ops={"username": "text_pattern_ops"},
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    username: Mapped[str | None] = mapped_column(String(255), nullable=True, unique=True)
+    telegram_channel_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True, index=True)
+    title: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    subscribers_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    er_estimate: Mapped[float | None] = mapped_column(nullable=True)
+    source: Mapped[str] = mapped_column(String(32), default="discovered")
+    owner_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    search_text: Mapped[str] = mapped_column(Text, default="")
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
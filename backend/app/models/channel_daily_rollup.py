@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Date, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date
+
+from app.database import Base
+
+
+class ChannelDailyRollup(Base):
+    __tablename__ = "channel_daily_rollups"
+
+    channel_id: Mapped[int] = mapped_column(ForeignKey("channels.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    posts_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_views: Mapped[int] = mapped_column(BigInteger, default=0)
+    total_reactions: Mapped[int] = mapped_column(BigInteger, default=0)
+    subscribers_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    running_posts: Mapped[int] = mapped_column(BigInteger, default=0)
+    running_views: Mapped[int] = mapped_column(BigInteger, default=0)
+    running_reactions: Mapped[int] = mapped_column(BigInteger, default=0)
+    last_subscribers_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
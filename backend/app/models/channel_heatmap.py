@@ -0,0 +1,16 @@
+from sqlalchemy import DateTime, ForeignKey, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.database import Base
+
+
+class ChannelHeatmap(Base):
+    __tablename__ = "channel_heatmaps"
+
+    channel_id: Mapped[int] = mapped_column(ForeignKey("channels.id"), primary_key=True)
+    posts: Mapped[list] = mapped_column(JSON)
+    views: Mapped[list] = mapped_column(JSON)
+    reactions: Mapped[list] = mapped_column(JSON)
+    best_slots: Mapped[list] = mapped_column(JSON, default=list)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
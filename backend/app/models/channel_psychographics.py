@@ -0,0 +1,15 @@
+from sqlalchemy import DateTime, ForeignKey, Integer, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.database import Base
+
+
+class ChannelPsychographics(Base):
+    __tablename__ = "channel_psychographics"
+
+    channel_id: Mapped[int] = mapped_column(ForeignKey("channels.id"), primary_key=True)
+    emotion_counts: Mapped[dict] = mapped_column(JSON, default=dict)
+    type_counts: Mapped[dict] = mapped_column(JSON, default=dict)
+    comments_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, DateTime, ForeignKey, Float
+from sqlalchemy import Integer, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -7,6 +7,9 @@ from app.database import Base
 
 class ChannelStatsSnapshot(Base):
     __tablename__ = "channel_stats_snapshots"
+    __table_args__ = (
+        Index("ix_channel_stats_snapshots_channel_period", "channel_id", "period_type", "period_value"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     channel_id: Mapped[int] = mapped_column(ForeignKey("channels.id"))
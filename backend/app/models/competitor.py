@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, String, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import BigInteger, String, Integer, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -7,6 +7,10 @@ from app.database import Base
 
 class Competitor(Base):
     __tablename__ = "competitors"
+    __table_args__ = (
+        Index("ix_competitors_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_competitors_channel_created", "channel_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
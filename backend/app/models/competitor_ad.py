@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, ForeignKey, Text
+from sqlalchemy import String, DateTime, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -7,9 +7,14 @@ from app.database import Base
 
 class CompetitorAdActivity(Base):
     __tablename__ = "competitor_ad_activities"
+    __table_args__ = (
+        Index("ix_competitor_ad_activities_competitor_detected", "competitor_id", "detected_at", "id"),
+        UniqueConstraint("competitor_id", "fingerprint", name="uq_competitor_ad_activities_fingerprint"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     competitor_id: Mapped[int] = mapped_column(ForeignKey("competitors.id"))
     detected_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     post_url: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
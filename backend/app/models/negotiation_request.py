@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Text, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -7,6 +7,10 @@ from app.database import Base
 
 class NegotiationRequest(Base):
     __tablename__ = "negotiation_requests"
+    __table_args__ = (
+        Index("ix_negotiation_requests_from_user_created", "from_user_id", "created_at", "id"),
+        Index("ix_negotiation_requests_to_user_created", "to_user_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     from_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -17,3 +21,6 @@ class NegotiationRequest(Base):
     to_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+Index("ix_negotiation_requests_to_username_lower", func.lower(NegotiationRequest.to_channel_username))
@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.models import CompetitorAdActivity
+from app.services.cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+STRONG = "strong"
+PROMO = "promo"
+MENTION = "mention"
+
+MARKERS = {
+    "erid": STRONG,
+    "реклама": STRONG,
+    "на правах рекламы": STRONG,
+    "партнерский пост": STRONG,
+    "партнёрский пост": STRONG,
+    "sponsored": STRONG,
+    "промокод": PROMO,
+    "промокоды": PROMO,
+    "промокоду": PROMO,
+    "промокодом": PROMO,
+    "promo code": PROMO,
+    "promocode": PROMO,
+    "скидка": PROMO,
+    "скидки": PROMO,
+    "скидку": PROMO,
+    "скидкой": PROMO,
+    "utm_": PROMO,
+    "?ref=": PROMO,
+    "&ref=": PROMO,
+    "bit.ly/": PROMO,
+    "clck.ru/": PROMO,
+    "t.me/": MENTION,
+    "@": MENTION,
+}
+WHOLE_WORD = frozenset(p for p in MARKERS if p[0].isalnum() and p[-1].isalnum())
+USERNAME_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_")
+MIN_USERNAME = 5
+SEEN_CACHE_SIZE = 200_000
+SEEN_TTL_SECONDS = 86400
+
+
+class Post(NamedTuple):
+    competitor_id: int
+    text: str
+    post_url: str | None = None
+    posted_at: datetime | None = None
+    channel_username: str | None = None
+
+
+class Detection(NamedTuple):
+    competitor_id: int
+    fingerprint: str
+    description: str
+    post_url: str | None
+    detected_at: datetime
+
+
+class AhoCorasick:
+    def __init__(self, patterns: dict[str, str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[list[tuple[str, str]]] = [[]]
+        for pattern, label in patterns.items():
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((pattern, label))
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> Iterable[tuple[int, str, str]]:
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern, label in out[state]:
+                yield i + 1, pattern, label
+
+
+_automaton = AhoCorasick(MARKERS)
+
+
+def _username_at(text: str, start: int) -> str | None:
+    end = start
+    while end < len(text) and text[end] in USERNAME_CHARS:
+        end += 1
+    name = text[start:end]
+    return name if len(name) >= MIN_USERNAME else None
+
+
+def _is_word(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not (before.isalnum() or before == "_" or after.isalnum() or after == "_")
+
+
+def fingerprint(post: Post) -> str:
+    key = post.post_url.strip().lower() if post.post_url else " ".join(post.text.split()).casefold()
+    return hashlib.sha256(f"{post.competitor_id}:{key}".encode()).hexdigest()
+
+
+def classify(post: Post) -> str | None:
+    text = post.text.casefold()
+    own = (post.channel_username or "").lower()
+    strong: set[str] = set()
+    promo: set[str] = set()
+    mentions: set[str] = set()
+    for end, pattern, label in _automaton.find(text):
+        if pattern in WHOLE_WORD and not _is_word(text, end - len(pattern), end):
+            continue
+        if label == STRONG:
+            strong.add(pattern)
+        elif label == PROMO:
+            promo.add(pattern)
+        elif pattern != "@" or end < 2 or text[end - 2] not in USERNAME_CHARS:
+            name = _username_at(text, end)
+            if name and name != own and not name.endswith("bot"):
+                mentions.add(name)
+    if not (strong or (promo and mentions) or len(promo) >= 2):
+        return None
+    parts = sorted(strong | promo)
+    if mentions:
+        parts.append("mentions " + ", ".join("@" + m for m in sorted(mentions)))
+    return "; ".join(parts)
+
+
+def detect(posts: Iterable[Post], seen: TTLCache | None = None) -> list[Detection]:
+    now = datetime.utcnow()
+    found = []
+    batch: set[str] = set()
+    for post in posts:
+        fp = fingerprint(post)
+        if fp in batch or (seen is not None and seen.get(fp)):
+            continue
+        batch.add(fp)
+        description = classify(post)
+        if description:
+            found.append(Detection(post.competitor_id, fp, description, post.post_url, post.posted_at or now))
+    return found
+
+
+async def write(db: AsyncSession, detections: list[Detection]) -> int:
+    if not detections:
+        return 0
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = (
+        insert(CompetitorAdActivity)
+        .values([
+            {
+                "competitor_id": d.competitor_id,
+                "fingerprint": d.fingerprint,
+                "description": d.description,
+                "post_url": d.post_url,
+                "detected_at": d.detected_at,
+            }
+            for d in detections
+        ])
+        .on_conflict_do_nothing(index_elements=["competitor_id", "fingerprint"])
+        .returning(CompetitorAdActivity.id)
+    )
+    return len((await db.execute(stmt)).all())
+
+
+class AdStream:
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, max_pending: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue[Post | None] = asyncio.Queue(max_pending)
+        self.seen = TTLCache(SEEN_CACHE_SIZE, SEEN_TTL_SECONDS)
+        self.stats = {"posts": 0, "ads": 0, "written": 0}
+
+    async def submit(self, post: Post) -> None:
+        await self.queue.put(post)
+
+    async def close(self) -> None:
+        await self.queue.put(None)
+
+    def _mark_seen(self, fingerprints: Iterable[str]) -> None:
+        for fp in fingerprints:
+            self.seen.set(fp, True)
+
+    async def _flush(self, batch: list[Post]) -> None:
+        detections = detect(batch, self.seen)
+        self.stats["posts"] += len(batch)
+        self.stats["ads"] += len(detections)
+        pending = {d.fingerprint for d in detections}
+        self._mark_seen(fp for fp in map(fingerprint, batch) if fp not in pending)
+        if not detections:
+            return
+        try:
+            async with async_session() as db:
+                written = await write(db, detections)
+                await db.commit()
+        except Exception:
+            log.exception("failed to write %d ad detections", len(detections))
+            return
+        self.stats["written"] += written
+        self._mark_seen(pending)
+
+    async def run(self) -> dict:
+        loop = asyncio.get_running_loop()
+        batch: list[Post] = []
+        deadline = None
+        while True:
+            closed = False
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                post = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                post = None
+            else:
+                if post is None:
+                    closed = True
+                else:
+                    batch.append(post)
+                    if deadline is None:
+                        deadline = loop.time() + self.flush_interval
+            if batch and (closed or len(batch) >= self.batch_size or loop.time() >= deadline):
+                await self._flush(batch)
+                batch = []
+                deadline = None
+            if closed:
+                return self.stats
@@ -0,0 +1,125 @@
+from typing import Iterable, NamedTuple
+
+import numpy as np
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import AudienceSketch
+
+HLL_P = 12
+HLL_M = 1 << HLL_P
+MINHASH_K = 256
+INGEST_CHUNK = 4096
+EMPTY = np.iinfo(np.uint64).max
+
+_SEEDS = np.random.default_rng(0x6B17).integers(0, EMPTY, size=MINHASH_K, dtype=np.uint64)
+_ALPHA = 0.7213 / (1 + 1.079 / HLL_M)
+
+
+class Overlap(NamedTuple):
+    audience: float
+    shared: float
+    jaccard: float
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = x >= np.uint64(1 << shift)
+        x = np.where(mask, x >> np.uint64(shift), x)
+        n += mask.astype(np.uint8) * shift
+    return n + (x > 0)
+
+
+def empty_sketch() -> tuple[np.ndarray, np.ndarray]:
+    return np.zeros(HLL_M, dtype=np.uint8), np.full(MINHASH_K, EMPTY, dtype=np.uint64)
+
+
+def add_members(registers: np.ndarray, mins: np.ndarray, member_ids: np.ndarray) -> None:
+    for start in range(0, len(member_ids), INGEST_CHUNK):
+        ids = member_ids[start:start + INGEST_CHUNK].astype(np.uint64)
+        h = _mix(ids)
+        idx = (h >> np.uint64(64 - HLL_P)).astype(np.intp)
+        rest = h & np.uint64((1 << (64 - HLL_P)) - 1)
+        rank = (64 - HLL_P + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(registers, idx, rank)
+        mins[:] = np.minimum(mins, _mix(ids[:, None] ^ _SEEDS[None, :]).min(axis=0))
+
+
+def cardinality(registers: np.ndarray) -> np.ndarray:
+    registers = np.atleast_2d(registers)
+    raw = _ALPHA * HLL_M * HLL_M / np.power(2.0, -registers.astype(np.float64)).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    small = (raw <= 2.5 * HLL_M) & (zeros > 0)
+    linear = HLL_M * np.log(HLL_M / np.maximum(zeros, 1))
+    return np.where(small, linear, raw)
+
+
+def overlaps(
+    sketch: tuple[np.ndarray, np.ndarray],
+    others: list[tuple[np.ndarray, np.ndarray]],
+) -> list[Overlap]:
+    if not others:
+        return []
+    registers, mins = sketch
+    other_registers = np.stack([r for r, _ in others])
+    other_mins = np.stack([m for _, m in others])
+    union = cardinality(np.maximum(other_registers, registers[None, :]))
+    filled = (other_mins != EMPTY) | (mins[None, :] != EMPTY)
+    equal = (other_mins == mins[None, :]) & filled
+    jaccard = equal.sum(axis=1) / np.maximum(filled.sum(axis=1), 1)
+    audience = cardinality(other_registers)
+    shared = np.minimum(jaccard * union, audience)
+    return [Overlap(float(a), float(s), float(j)) for a, s, j in zip(audience, shared, jaccard)]
+
+
+def _decode(row: AudienceSketch) -> tuple[np.ndarray, np.ndarray]:
+    return np.frombuffer(row.hll, dtype=np.uint8).copy(), np.frombuffer(row.minhash, dtype=np.uint64).copy()
+
+
+async def _load_for_update(db: AsyncSession, kind: str, ref_id: int) -> AudienceSketch:
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    registers, mins = empty_sketch()
+    await db.execute(
+        insert(AudienceSketch)
+        .values(kind=kind, ref_id=ref_id, hll=registers.tobytes(), minhash=mins.tobytes(), members_ingested=0)
+        .on_conflict_do_nothing(index_elements=["kind", "ref_id"])
+    )
+    result = await db.execute(
+        select(AudienceSketch)
+        .where(AudienceSketch.kind == kind, AudienceSketch.ref_id == ref_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def ingest(db: AsyncSession, kind: str, ref_id: int, member_ids: Iterable[int]) -> AudienceSketch:
+    row = await _load_for_update(db, kind, ref_id)
+    registers, mins = _decode(row)
+    ids = np.fromiter(member_ids, dtype=np.int64)
+    add_members(registers, mins, ids)
+    row.hll = registers.tobytes()
+    row.minhash = mins.tobytes()
+    row.members_ingested += len(ids)
+    await db.flush()
+    return row
+
+
+async def load(db: AsyncSession, keys: list[tuple[str, int]]) -> dict[tuple[str, int], tuple[np.ndarray, np.ndarray]]:
+    if not keys:
+        return {}
+    result = await db.execute(
+        select(AudienceSketch).where(tuple_(AudienceSketch.kind, AudienceSketch.ref_id).in_(keys))
+    )
+    return {(row.kind, row.ref_id): _decode(row) for row in result.scalars().all()}
@@ -1,20 +1,134 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
-from jose import jwt
-from passlib.context import CryptContext
 from app.config import settings
+from app.services.cache import TTLCache, redis_client
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ACCESS = "access"
+REFRESH = "refresh"
+REVOKED_KEY = "auth:revoked"
+CONSUMED_PREFIX = "auth:consumed:"
 
+_verified = TTLCache(settings.token_cache_max_size, settings.access_token_ttl_seconds)
+_revoked: dict[str, float] = {}
+_consumed: dict[str, float] = {}
+_revoked_synced_at = 0.0
 
-def create_access_token(data: dict) -> str:
+
+class RevocationUnavailable(Exception):
+    pass
+
+
+def _encode(data: dict, token_type: str, lifetime: timedelta) -> str:
+    from jose import jwt
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=30)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    to_encode.update({"iat": now, "exp": now + lifetime, "type": token_type, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
 
 
-def verify_token(token: str) -> dict | None:
+def create_access_token(data: dict) -> str:
+    return _encode(data, ACCESS, timedelta(seconds=settings.access_token_ttl_seconds))
+
+
+def create_refresh_token(data: dict) -> str:
+    return _encode(data, REFRESH, timedelta(days=settings.refresh_token_ttl_days))
+
+
+def verify_token(token: str, token_type: str = ACCESS) -> dict | None:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _verified.get(key)
+    if payload is None:
+        from jose import jwt
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+        except Exception:
+            return None
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl <= 0:
+            return None
+        _verified.set(key, payload, min(ttl, settings.access_token_ttl_seconds))
+    elif payload["exp"] <= time.time():
+        _verified.pop(key)
+        return None
+    if payload.get("type") != token_type:
+        return None
+    return payload
+
+
+async def _sync_revoked() -> None:
+    global _revoked_synced_at
+    now = time.time()
+    if now - _revoked_synced_at < settings.revocation_sync_seconds:
+        return
+    _revoked_synced_at = now
+    for jti, exp in list(_revoked.items()):
+        if exp <= now:
+            del _revoked[jti]
+    client = redis_client()
+    if client is None:
+        return
     try:
-        return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+        await client.zremrangebyscore(REVOKED_KEY, "-inf", now)
+        rows = await client.zrangebyscore(REVOKED_KEY, now, "+inf", withscores=True)
     except Exception:
-        return None
+        return
+    for jti, exp in rows:
+        _revoked[jti.decode() if isinstance(jti, bytes) else jti] = exp
+
+
+async def is_revoked(payload: dict) -> bool:
+    await _sync_revoked()
+    return payload.get("jti") in _revoked
+
+
+def _consumed_key(jti: str) -> str:
+    return CONSUMED_PREFIX + jti
+
+
+def _consume_locally(jti: str, exp: float) -> bool:
+    now = time.time()
+    for key, expires in list(_consumed.items()):
+        if expires <= now:
+            del _consumed[key]
+    if jti in _consumed:
+        return False
+    _consumed[jti] = exp
+    return True
+
+
+async def consume(payload: dict) -> bool:
+    jti = payload.get("jti")
+    if not jti or jti in _consumed:
+        return False
+    exp = float(payload["exp"])
+    client = redis_client()
+    if client is None:
+        return _consume_locally(jti, exp)
+    ttl = max(1, int(exp - time.time()) + 1)
+    try:
+        added = await client.set(_consumed_key(jti), 1, nx=True, ex=ttl)
+    except Exception as e:
+        raise RevocationUnavailable() from e
+    _consume_locally(jti, exp)
+    return bool(added)
+
+
+async def revoke(*payloads: dict) -> None:
+    for payload in payloads:
+        if payload.get("type") == REFRESH:
+            try:
+                await consume(payload)
+            except RevocationUnavailable:
+                pass
+    entries = {p["jti"]: float(p["exp"]) for p in payloads if p.get("jti") and p.get("type") == ACCESS}
+    for jti, exp in entries.items():
+        _revoked[jti] = exp
+    client = redis_client()
+    if client is None or not entries:
+        return
+    try:
+        await client.zadd(REVOKED_KEY, entries)
+    except Exception:
+        pass
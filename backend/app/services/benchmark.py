@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Channel, Competitor
+from app.services import rollups
+from app.services.cache import TTLCache, redis_get_json, redis_set_json
+
+ER_WINDOW_DAYS = 30
+QUANTILES = (0.25, 0.5, 0.75)
+
+_local = TTLCache(10000, settings.benchmark_cache_ttl_seconds)
+
+
+def bump_version(channel_ids):
+    return (
+        update(Channel)
+        .where(Channel.id.in_(channel_ids))
+        .values(competitors_version=Channel.competitors_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    pos = (len(values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def _summary(prefix: str, count, mean, quantiles, below, your) -> dict:
+    p25, median, p75 = (float(q) if q is not None else None for q in quantiles)
+    return {
+        f"niche_avg_{prefix}": float(mean) if mean is not None else None,
+        f"niche_median_{prefix}": median,
+        f"niche_p25_{prefix}": p25,
+        f"niche_p75_{prefix}": p75,
+        f"your_{prefix}_percentile": round(below / count, 4) if count and your is not None else None,
+    }
+
+
+async def _aggregate_postgres(db: AsyncSession, scope, your_subs, your_er) -> dict:
+    subs, er = Competitor.subscribers_count, Competitor.er_estimate
+    row = (await db.execute(
+        select(
+            func.count(Competitor.id),
+            func.count(subs),
+            func.avg(subs),
+            *(func.percentile_cont(q).within_group(subs) for q in QUANTILES),
+            func.count().filter(subs < your_subs),
+            func.count(er),
+            func.avg(er),
+            *(func.percentile_cont(q).within_group(er) for q in QUANTILES),
+            func.count().filter(er < your_er),
+        ).where(*scope)
+    )).one()
+    total, subs_n, subs_mean, s25, s50, s75, subs_below, er_n, er_mean, e25, e50, e75, er_below = row
+    return {
+        "competitors_count": total,
+        **_summary("subscribers", subs_n, subs_mean, (s25, s50, s75), subs_below, your_subs),
+        **_summary("er", er_n, er_mean, (e25, e50, e75), er_below, your_er),
+    }
+
+
+async def _aggregate_fallback(db: AsyncSession, scope, your_subs, your_er) -> dict:
+    rows = (await db.execute(select(Competitor.subscribers_count, Competitor.er_estimate).where(*scope))).all()
+    out = {"competitors_count": len(rows)}
+    for prefix, values, your in (
+        ("subscribers", sorted(r[0] for r in rows if r[0] is not None), your_subs),
+        ("er", sorted(r[1] for r in rows if r[1] is not None), your_er),
+    ):
+        out.update(_summary(
+            prefix,
+            len(values),
+            sum(values) / len(values) if values else None,
+            tuple(_percentile(values, q) for q in QUANTILES),
+            sum(1 for v in values if your is not None and v < your),
+            your,
+        ))
+    return out
+
+
+async def niche_benchmark(db: AsyncSession, channel: Channel, user_id: int) -> dict:
+    key = f"benchmark:{channel.id}:{channel.competitors_version}"
+    cached = _local.get(key)
+    if cached is None:
+        cached = await redis_get_json(key)
+    if cached is not None:
+        _local.set(key, cached)
+        return cached
+    today = datetime.utcnow().date()
+    window = await rollups.window(db, channel.id, today - timedelta(days=ER_WINDOW_DAYS - 1), today)
+    your_subs = channel.subscribers_count
+    if your_subs is None and window:
+        your_subs = window.subscribers_count
+    your_er = window.er if window else None
+    scope = (Competitor.owner_id == user_id, Competitor.channel_id == channel.id)
+    if db.bind.dialect.name == "postgresql":
+        stats = await _aggregate_postgres(db, scope, your_subs, your_er)
+    else:
+        stats = await _aggregate_fallback(db, scope, your_subs, your_er)
+    result = {
+        "channel_id": channel.id,
+        "your_subscribers": your_subs or 0,
+        "your_er_estimate": your_er or 0.0,
+        **stats,
+    }
+    result["niche_avg_subscribers"] = int(result["niche_avg_subscribers"] or 0)
+    result["niche_avg_er"] = result["niche_avg_er"] or 0.0
+    _local.set(key, result)
+    await redis_set_json(key, result, int(settings.benchmark_cache_ttl_seconds))
+    return result
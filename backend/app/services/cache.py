@@ -0,0 +1,101 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.config import settings
+
+_MISSING = object()
+_redis = None
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def redis_client():
+    global _redis
+    if not settings.redis_url:
+        return None
+    if _redis is None:
+        from redis.asyncio import Redis
+        _redis = Redis.from_url(settings.redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+async def redis_get_json(key: str):
+    client = redis_client()
+    if client is None:
+        return None
+    try:
+        raw = await client.get(key)
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def redis_set_json(key: str, value, ttl: int) -> None:
+    client = redis_client()
+    if client is None:
+        return
+    try:
+        await client.set(key, json.dumps(value, default=str), ex=ttl)
+    except Exception:
+        pass
+
+
+async def redis_delete(*keys: str) -> None:
+    client = redis_client()
+    if client is None or not keys:
+        return
+    try:
+        await client.delete(*keys)
+    except Exception:
+        pass
+
+
+async def redis_publish(channel: str, message: str) -> None:
+    client = redis_client()
+    if client is None:
+        return
+    try:
+        await client.publish(channel, message)
+    except Exception:
+        pass
@@ -0,0 +1,191 @@
+import bisect
+from collections import Counter
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChannelCatalogEntry
+
+SOURCE_PRIORITY = {"discovered": 0, "competitor": 1, "owned": 2}
+PREFIX_BONUS = 1.0
+SUBSTRING_BONUS = 0.5
+
+
+def clean_username(username: str | None) -> str | None:
+    if not username:
+        return None
+    return username.strip().lstrip("@") or None
+
+
+def normalize_username(username: str | None) -> str | None:
+    cleaned = clean_username(username)
+    return cleaned.lower() if cleaned else None
+
+
+def _search_text(username: str | None, title: str | None, description: str | None) -> str:
+    return " ".join(p for p in (username, title, description) if p).lower()
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+async def upsert_entry(
+    db: AsyncSession,
+    *,
+    source: str,
+    username: str | None = None,
+    title: str | None = None,
+    description: str | None = None,
+    telegram_channel_id: int | None = None,
+    owner_id: int | None = None,
+    subscribers_count: int | None = None,
+    er_estimate: float | None = None,
+) -> ChannelCatalogEntry:
+    username = normalize_username(username)
+    if username:
+        cond = ChannelCatalogEntry.username == username
+    elif telegram_channel_id is not None:
+        cond = ChannelCatalogEntry.telegram_channel_id == telegram_channel_id
+    else:
+        cond = None
+    entry = None
+    if cond is not None:
+        entry = (await db.execute(select(ChannelCatalogEntry).where(cond))).scalar_one_or_none()
+    if entry is None:
+        entry = ChannelCatalogEntry(source=source, username=username, owner_id=owner_id)
+        db.add(entry)
+    elif SOURCE_PRIORITY.get(source, 0) > SOURCE_PRIORITY.get(entry.source, 0):
+        entry.source = source
+        entry.owner_id = owner_id
+    for field, value in (
+        ("title", title),
+        ("description", description),
+        ("telegram_channel_id", telegram_channel_id),
+        ("subscribers_count", subscribers_count),
+        ("er_estimate", er_estimate),
+    ):
+        if value is not None:
+            setattr(entry, field, value)
+    entry.search_text = _search_text(entry.username, entry.title, entry.description)
+    await db.flush()
+    _fallback_index.stale = True
+    return entry
+
+
+def _is_private(source: str | None, username: str | None) -> bool:
+    return source == "owned" and not username
+
+
+def _visible_to(user_id: int):
+    return or_(
+        ChannelCatalogEntry.source != "owned",
+        ChannelCatalogEntry.username.is_not(None),
+        ChannelCatalogEntry.owner_id == user_id,
+    )
+
+
+async def _search_postgres(db: AsyncSession, q: str, user_id: int, limit: int, after: tuple[float, int] | None):
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    prefix = ChannelCatalogEntry.username.like(f"{pattern}%", escape="\\")
+    substring = ChannelCatalogEntry.search_text.like(f"%{pattern}%", escape="\\")
+    rank = (
+        func.similarity(ChannelCatalogEntry.search_text, q)
+        + case((prefix, PREFIX_BONUS), else_=0.0)
+        + case((substring, SUBSTRING_BONUS), else_=0.0)
+    ).label("rank")
+    stmt = select(ChannelCatalogEntry, rank).where(
+        or_(ChannelCatalogEntry.search_text.op("%")(q), prefix, substring),
+        _visible_to(user_id),
+    )
+    if after is not None:
+        stmt = stmt.where(or_(rank < after[0], and_(rank == after[0], ChannelCatalogEntry.id < after[1])))
+    stmt = stmt.order_by(rank.desc(), ChannelCatalogEntry.id.desc()).limit(limit)
+    return [(entry, float(score)) for entry, score in (await db.execute(stmt)).all()]
+
+
+class NgramIndex:
+    def __init__(self):
+        self.stale = True
+        self.version: tuple | None = None
+        self.postings: dict[str, list[int]] = {}
+        self.texts: dict[int, str] = {}
+        self.usernames: list[tuple[str, int]] = []
+        self.visibility: dict[int, int | None] = {}
+
+    async def refresh(self, db: AsyncSession) -> None:
+        version = tuple((await db.execute(
+            select(func.count(ChannelCatalogEntry.id), func.max(ChannelCatalogEntry.updated_at))
+        )).one())
+        if not self.stale and version == self.version:
+            return
+        rows = (await db.execute(select(
+            ChannelCatalogEntry.id,
+            ChannelCatalogEntry.username,
+            ChannelCatalogEntry.search_text,
+            ChannelCatalogEntry.source,
+            ChannelCatalogEntry.owner_id,
+        ))).all()
+        postings: dict[str, list[int]] = {}
+        for entry_id, _, text, _, _ in rows:
+            for gram in _trigrams(text or ""):
+                postings.setdefault(gram, []).append(entry_id)
+        self.postings = postings
+        self.texts = {entry_id: text or "" for entry_id, _, text, _, _ in rows}
+        self.usernames = sorted((username, entry_id) for entry_id, username, _, _, _ in rows if username)
+        self.visibility = {
+            entry_id: owner_id if _is_private(source, username) else None
+            for entry_id, username, _, source, owner_id in rows
+        }
+        self.version = version
+        self.stale = False
+
+    def search(self, q: str, user_id: int) -> list[tuple[float, int]]:
+        grams = _trigrams(q)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scores: dict[int, float] = {}
+        for entry_id, count in shared.items():
+            total = len(grams | _trigrams(self.texts[entry_id]))
+            score = count / total if total else 0.0
+            if q in self.texts[entry_id]:
+                score += SUBSTRING_BONUS
+            elif score < 0.3:
+                continue
+            scores[entry_id] = score
+        start = bisect.bisect_left(self.usernames, (q, -1))
+        for username, entry_id in self.usernames[start:]:
+            if not username.startswith(q):
+                break
+            scores[entry_id] = scores.get(entry_id, 0.0) + PREFIX_BONUS
+        return sorted(
+            ((score, entry_id) for entry_id, score in scores.items() if self.visibility.get(entry_id) in (None, user_id)),
+            reverse=True,
+        )
+
+
+_fallback_index = NgramIndex()
+
+
+async def _search_fallback(db: AsyncSession, q: str, user_id: int, limit: int, after: tuple[float, int] | None):
+    await _fallback_index.refresh(db)
+    ranked = _fallback_index.search(q, user_id)
+    if after is not None:
+        ranked = [r for r in ranked if r < after]
+    ranked = ranked[:limit]
+    if not ranked:
+        return []
+    result = await db.execute(select(ChannelCatalogEntry).where(ChannelCatalogEntry.id.in_([i for _, i in ranked])))
+    by_id = {e.id: e for e in result.scalars().all()}
+    return [(by_id[i], score) for score, i in ranked if i in by_id]
+
+
+async def search(db: AsyncSession, q: str, user_id: int, limit: int, after: tuple[float, int] | None = None):
+    q = normalize_username(q)
+    if not q:
+        return []
+    if db.bind.dialect.name == "postgresql":
+        return await _search_postgres(db, q, user_id, limit, after)
+    return await _search_fallback(db, q, user_id, limit, after)
@@ -0,0 +1,318 @@
+import abc
+import asyncio
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import bindparam, select, update
+
+from app.config import settings
+from app.database import async_session
+from app.models import ChannelCatalogEntry, Competitor, User
+from app.services import benchmark, user_cache
+from app.services.channel_search import normalize_username
+
+log = logging.getLogger(__name__)
+
+TARIFF_PRIORITY = {"agency": 0, "strategist": 1}
+ETAG_KEY = "etag"
+
+
+class ChannelStats(NamedTuple):
+    subscribers_count: int | None
+    er_estimate: float | None
+    raw: dict
+
+
+class FetchResult(NamedTuple):
+    status: str
+    stats: ChannelStats | None = None
+    etag: str | None = None
+    retry_after: float | None = None
+
+
+class StatsSource(abc.ABC):
+    host = "default"
+
+    @abc.abstractmethod
+    async def fetch(self, username: str, etag: str | None) -> FetchResult:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class TGStatSource(StatsSource):
+    def __init__(self, base_url: str, token: str, timeout: float):
+        import httpx
+        self.base_url = base_url.rstrip("/")
+        self.host = urlsplit(self.base_url).netloc
+        self.token = token
+        self.client = httpx.AsyncClient(base_url=self.base_url, timeout=timeout)
+
+    async def fetch(self, username: str, etag: str | None) -> FetchResult:
+        headers = {"If-None-Match": etag} if etag else {}
+        resp = await self.client.get(
+            "/channels/stat",
+            params={"token": self.token, "channelId": f"@{username}"},
+            headers=headers,
+        )
+        if resp.status_code == 304:
+            return FetchResult("not_modified", etag=etag)
+        if resp.status_code == 429:
+            return FetchResult("throttled", retry_after=float(resp.headers.get("Retry-After") or 1))
+        if resp.status_code == 404:
+            return FetchResult("missing")
+        resp.raise_for_status()
+        body = resp.json()
+        data = body.get("response") if body.get("status") == "ok" else None
+        if not data:
+            return FetchResult("missing")
+        er = data.get("er_percent")
+        return FetchResult(
+            "ok",
+            ChannelStats(
+                subscribers_count=data.get("participants_count"),
+                er_estimate=er / 100 if er is not None else None,
+                raw=data,
+            ),
+            etag=resp.headers.get("ETag"),
+        )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def default_source() -> StatsSource:
+    if not settings.tgstat_api_key:
+        raise RuntimeError("TGSTAT_API_KEY is not configured")
+    return TGStatSource(settings.tgstat_base_url, settings.tgstat_api_key, settings.competitor_refresh_timeout_seconds)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_buckets: dict[str, TokenBucket] = {}
+
+
+def bucket_for(host: str, rate: float, burst: int) -> TokenBucket:
+    bucket = _buckets.get(host)
+    if bucket is None or bucket.rate != rate or bucket.capacity != max(burst, 1):
+        bucket = _buckets[host] = TokenBucket(rate, burst)
+    return bucket
+
+
+class CycleReport(NamedTuple):
+    channels: int
+    updated: int
+    not_modified: int
+    missing: int
+    failed: int
+    deferred: int
+    seconds: float
+
+
+async def _load_targets() -> list[tuple[tuple, str, list[int], str | None]]:
+    async with async_session() as db:
+        result = await db.execute(
+            select(
+                Competitor.id,
+                Competitor.telegram_username,
+                Competitor.owner_id,
+                Competitor.raw_metadata,
+                Competitor.updated_at,
+                User.tariff,
+            )
+            .join(User, User.id == Competitor.owner_id)
+            .where(Competitor.telegram_username.is_not(None))
+        )
+        rows = result.all()
+    active = await user_cache.recently_active({r.owner_id for r in rows})
+    by_username: dict[str, dict] = {}
+    for r in rows:
+        username = normalize_username(r.telegram_username)
+        if not username:
+            continue
+        priority = (
+            0 if r.owner_id in active else 1,
+            TARIFF_PRIORITY.get(r.tariff, 2),
+            r.updated_at.timestamp() if r.updated_at else 0.0,
+        )
+        target = by_username.setdefault(username, {"priority": priority, "ids": [], "etag": None})
+        target["priority"] = min(target["priority"], priority)
+        target["ids"].append(r.id)
+        target["etag"] = target["etag"] or (r.raw_metadata or {}).get(ETAG_KEY)
+    return [(t["priority"], username, t["ids"], t["etag"]) for username, t in by_username.items()]
+
+
+async def _write_batch(batch: list[tuple[str, list[int], FetchResult]]) -> None:
+    now = datetime.utcnow()
+    competitor_rows = []
+    catalog_rows = []
+    unchanged_ids = []
+    for username, ids, result in batch:
+        if result.status == "not_modified":
+            unchanged_ids.extend(ids)
+            continue
+        stats = result.stats
+        raw_metadata = {**stats.raw, ETAG_KEY: result.etag, "refreshed_at": now.isoformat()}
+        competitor_rows.extend(
+            {
+                "id": competitor_id,
+                "subscribers_count": stats.subscribers_count,
+                "er_estimate": stats.er_estimate,
+                "raw_metadata": raw_metadata,
+                "updated_at": now,
+            }
+            for competitor_id in ids
+        )
+        catalog_rows.append({
+            "b_username": username,
+            "b_subscribers": stats.subscribers_count,
+            "b_er": stats.er_estimate,
+        })
+    async with async_session() as db:
+        if unchanged_ids:
+            await db.execute(
+                update(Competitor)
+                .where(Competitor.id.in_(unchanged_ids))
+                .values(updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        if competitor_rows:
+            await db.execute(update(Competitor), competitor_rows)
+            await db.execute(benchmark.bump_version(
+                select(Competitor.channel_id).where(Competitor.id.in_([r["id"] for r in competitor_rows])).distinct()
+            ))
+            conn = await db.connection()
+            await conn.execute(
+                update(ChannelCatalogEntry.__table__)
+                .where(ChannelCatalogEntry.__table__.c.username == bindparam("b_username"))
+                .values(subscribers_count=bindparam("b_subscribers"), er_estimate=bindparam("b_er")),
+                catalog_rows,
+            )
+        await db.commit()
+
+
+async def run_cycle(
+    source: StatsSource,
+    *,
+    concurrency: int | None = None,
+    rate_per_second: float | None = None,
+    burst: int | None = None,
+    batch_size: int | None = None,
+) -> CycleReport:
+    concurrency = concurrency or settings.competitor_refresh_concurrency
+    max_retries = settings.competitor_refresh_max_retries
+    batch_size = batch_size or settings.competitor_refresh_batch_size
+    bucket = bucket_for(
+        source.host,
+        rate_per_second or settings.competitor_refresh_rate_per_second,
+        burst or settings.competitor_refresh_burst,
+    )
+    started = time.monotonic()
+    targets = await _load_targets()
+    queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    seq = itertools.count()
+    for priority, username, ids, etag in targets:
+        queue.put_nowait((priority, next(seq), username, ids, etag, 0))
+    results: asyncio.Queue = asyncio.Queue()
+    counts = {"ok": 0, "not_modified": 0, "missing": 0, "failed": 0, "deferred": 0}
+
+    async def fetcher():
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            priority, _, username, ids, etag, attempts = item
+            await bucket.acquire()
+            try:
+                result = await source.fetch(username, etag)
+            except Exception:
+                log.exception("stats fetch failed for @%s", username)
+                counts["failed"] += 1
+                continue
+            if result.status == "throttled":
+                bucket.pause(1 if result.retry_after is None else result.retry_after)
+                if attempts >= max_retries:
+                    log.warning("giving up on @%s until the next cycle after %d throttled attempts", username, attempts + 1)
+                    counts["deferred"] += 1
+                else:
+                    queue.put_nowait((priority, next(seq), username, ids, etag, attempts + 1))
+                continue
+            counts[result.status] += 1
+            if result.status in ("ok", "not_modified"):
+                await results.put((username, ids, result))
+
+    async def writer():
+        batch = []
+        while True:
+            item = await results.get()
+            if item is not None:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= batch_size):
+                try:
+                    await _write_batch(batch)
+                except Exception:
+                    log.exception("failed to write %d refreshed competitors", len(batch))
+                    for _, _, result in batch:
+                        counts[result.status] -= 1
+                        counts["failed"] += 1
+                batch = []
+            if item is None:
+                return
+
+    writer_task = asyncio.create_task(writer())
+    try:
+        await asyncio.gather(*(fetcher() for _ in range(min(concurrency, len(targets)) or 1)))
+    finally:
+        await results.put(None)
+        await writer_task
+    return CycleReport(
+        channels=len(targets),
+        updated=counts["ok"],
+        not_modified=counts["not_modified"],
+        missing=counts["missing"],
+        failed=counts["failed"],
+        deferred=counts["deferred"],
+        seconds=time.monotonic() - started,
+    )
+
+
+async def run_forever(source: StatsSource, interval: float | None = None) -> None:
+    interval = interval or settings.competitor_refresh_interval_seconds
+    while True:
+        try:
+            report = await run_cycle(source)
+            log.info("competitor refresh: %s", report._asdict())
+        except Exception:
+            log.exception("competitor refresh cycle failed")
+        await asyncio.sleep(interval)
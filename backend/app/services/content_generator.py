@@ -1,68 +1,100 @@
-from app.config import settings
+import asyncio
+import json
 
+from app.services import llm, llm_cache
 
-def _openai_client():
-    if not settings.openai_api_key:
-        return None
-    from openai import AsyncOpenAI
-    return AsyncOpenAI(api_key=settings.openai_api_key)
+
+async def _stream_with_fallback(prompt: str, fallback: str):
+    started = False
+    try:
+        async for delta in llm.stream(prompt):
+            started = True
+            yield delta
+    except llm.LLMBusy:
+        raise
+    except Exception:
+        if started:
+            raise
+        yield fallback
+
+
+def _post_prompt(topic: str, style_hint: str | None) -> str:
+    prompt = f"Write a short Telegram channel post (2-4 sentences) on topic: {topic}."
+    if style_hint:
+        prompt += f" Style: {style_hint}."
+    return prompt
 
 
-async def generate_post_text(topic: str, style_hint: str | None) -> str:
-    client = _openai_client()
-    if not client:
+async def generate_post_text(topic: str, style_hint: str | None, use_cache: bool = True) -> str:
+    if not llm.enabled():
         return f"[AI placeholder] Post about: {topic}. Style: {style_hint or 'default'}. Set OPENAI_API_KEY to enable real generation."
     try:
-        prompt = f"Write a short Telegram channel post (2-4 sentences) on topic: {topic}."
-        if style_hint:
-            prompt += f" Style: {style_hint}."
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return resp.choices[0].message.content or ""
+        return await llm_cache.complete(_post_prompt(topic, style_hint), use_cache=use_cache)
+    except llm.LLMBusy:
+        raise
     except Exception:
         return f"[Draft] Post about: {topic}. Add style: {style_hint or 'neutral'}."
 
 
-async def generate_viral_hypothesis(topic: str, niche: str | None) -> str:
-    client = _openai_client()
-    if not client:
+async def stream_post_text(topic: str, style_hint: str | None):
+    if not llm.enabled():
+        yield f"[AI placeholder] Post about: {topic}. Style: {style_hint or 'default'}. Set OPENAI_API_KEY to enable real generation."
+        return
+    async for delta in _stream_with_fallback(
+        _post_prompt(topic, style_hint),
+        f"[Draft] Post about: {topic}. Add style: {style_hint or 'neutral'}.",
+    ):
+        yield delta
+
+
+async def generate_viral_hypothesis(topic: str, niche: str | None, use_cache: bool = True) -> str:
+    if not llm.enabled():
         return f"[AI] Viral hypothesis for: {topic}. Niche: {niche or 'general'}. Set OPENAI_API_KEY for full analysis."
     try:
         prompt = f"Based on viral Telegram posts patterns, suggest a short 'formula of virality' for topic: {topic}."
         if niche:
             prompt += f" Niche: {niche}."
         prompt += " List 3-5 concrete tactics (hook, structure, CTA)."
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return resp.choices[0].message.content or ""
+        return await llm_cache.complete(prompt, use_cache=use_cache)
+    except llm.LLMBusy:
+        raise
     except Exception:
         return f"Viral hypothesis draft: {topic}. Niche: {niche or 'general'}."
 
 
-async def repurpose_content(source_text: str, target_format: str) -> str:
-    client = _openai_client()
-    formats = {"thread": "thread of 3-5 short tweets", "stories": "3 story slides text", "teaser": "video teaser script", "article": "short article intro"}
-    fmt = formats.get(target_format.lower(), target_format)
-    if not client:
+REPURPOSE_FORMATS = {"thread": "thread of 3-5 short tweets", "stories": "3 story slides text", "teaser": "video teaser script", "article": "short article intro"}
+
+
+def _repurpose_prompt(source_text: str, fmt: str) -> str:
+    return f"Convert this post into {fmt}. Keep the main message.\n\nPost:\n{source_text[:3000]}"
+
+
+async def repurpose_content(source_text: str, target_format: str, use_cache: bool = True) -> str:
+    fmt = REPURPOSE_FORMATS.get(target_format.lower(), target_format)
+    if not llm.enabled():
         return f"[AI] Repurpose to {fmt}:\n{source_text[:200]}..."
     try:
-        prompt = f"Convert this post into {fmt}. Keep the main message.\n\nPost:\n{source_text[:3000]}"
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return resp.choices[0].message.content or ""
+        return await llm_cache.complete(_repurpose_prompt(source_text, fmt), use_cache=use_cache)
+    except llm.LLMBusy:
+        raise
     except Exception:
         return f"Repurposed ({fmt}): {source_text[:150]}..."
 
 
-async def smart_sandwich(post_context: str) -> dict:
-    client = _openai_client()
-    if not client:
+async def stream_repurpose_content(source_text: str, target_format: str):
+    fmt = REPURPOSE_FORMATS.get(target_format.lower(), target_format)
+    if not llm.enabled():
+        yield f"[AI] Repurpose to {fmt}:\n{source_text[:200]}..."
+        return
+    async for delta in _stream_with_fallback(
+        _repurpose_prompt(source_text, fmt),
+        f"Repurposed ({fmt}): {source_text[:150]}...",
+    ):
+        yield delta
+
+
+async def smart_sandwich(post_context: str, use_cache: bool = True) -> dict:
+    if not llm.enabled():
         return {
             "first": "First comment: ask a short question to start discussion.",
             "second": "Second: develop the topic, add one thought.",
@@ -70,12 +102,7 @@ async def smart_sandwich(post_context: str) -> dict:
         }
     try:
         prompt = f"Post context: {post_context[:500]}. Generate engagement strategy - 3 comments. First: one short question. Second: develop discussion. Third: summary or call to action. Reply in JSON: {{\"first\": \"...\", \"second\": \"...\", \"third\": \"...\"}}"
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        text = resp.choices[0].message.content or "{}"
-        import json
+        text = await llm_cache.complete(prompt, use_cache=use_cache) or "{}"
         for start in ("{", "```"):
             if start in text:
                 idx = text.find(start)
@@ -87,41 +114,65 @@ async def smart_sandwich(post_context: str) -> dict:
                     break
         data = json.loads(text)
         return {"first": data.get("first", ""), "second": data.get("second", ""), "third": data.get("third", "")}
+    except llm.LLMBusy:
+        raise
     except Exception:
         return {"first": "What do you think?", "second": "Let's discuss.", "third": "Share your experience."}
 
 
-async def reputation_reply(negative_comment: str) -> list[str]:
-    client = _openai_client()
-    if not client:
+async def reputation_reply(negative_comment: str, use_cache: bool = True) -> list[str]:
+    if not llm.enabled():
         return ["Thank you for feedback. We'll look into it.", "We're sorry you had this experience. Please contact us in private."]
     try:
         prompt = f"Negative comment: \"{negative_comment[:300]}\". Generate 2 short diplomatic reply templates (1-2 sentences each) to resolve conflict. Number them."
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        text = resp.choices[0].message.content or ""
+        text = await llm_cache.complete(prompt, use_cache=use_cache)
         lines = [l.strip() for l in text.replace("1.", "").replace("2.", "|").split("|") if l.strip()]
         return lines[:3] if lines else ["Thanks for your feedback. We'll improve."]
+    except llm.LLMBusy:
+        raise
     except Exception:
         return ["Thank you for your feedback."]
 
 
-async def mass_personal_replies(base_comment: str, count: int) -> list[str]:
-    client = _openai_client()
+async def mass_personal_replies(base_comment: str, count: int, use_cache: bool = True) -> list[str]:
     if not count or count > 10:
         count = 5
-    if not client:
+    if not llm.enabled():
         return [f"Thanks! (variant {i+1})" for i in range(count)]
     try:
         prompt = f"Comment theme: \"{base_comment[:200]}\". Generate {count} different short personal thank-you or reply variants (1 sentence each) for similar comments. Each must be unique."
-        resp = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        text = resp.choices[0].message.content or ""
+        text = await llm_cache.complete(prompt, use_cache=use_cache)
         lines = [l.strip().lstrip("-123456789.) ").strip() for l in text.split("\n") if l.strip()][:count]
         return lines if lines else [f"Thank you! ({i+1})" for i in range(count)]
+    except llm.LLMBusy:
+        raise
     except Exception:
         return [f"Thanks! ({i+1})" for i in range(count)]
+
+
+async def bulk_replies(comments: list[str], mode: str, use_cache: bool = True) -> list[list[str]]:
+    if not llm.enabled():
+        if mode == "reputation":
+            return [await reputation_reply(c) for c in comments]
+        return [[f"Thanks! ({i+1})"] for i in range(len(comments))]
+    numbered = "\n".join(f"{i+1}. {c[:300]}" for i, c in enumerate(comments))
+    if mode == "reputation":
+        task = "For each numbered negative comment generate 2 short diplomatic reply templates (1-2 sentences each) to resolve conflict."
+    else:
+        task = "For each numbered comment write one short personal thank-you or reply (1 sentence). Each must be unique."
+    prompt = f"Comments:\n{numbered}\n\n{task} Reply in JSON: a list with one array of reply strings per comment, in the same order."
+    try:
+        text = await llm_cache.complete(prompt, use_cache=use_cache)
+        start, end = text.find("["), text.rfind("]") + 1
+        data = json.loads(text[start:end]) if 0 <= start < end else None
+        if isinstance(data, list) and len(data) == len(comments):
+            return [[str(r) for r in item] if isinstance(item, list) else [str(item)] for item in data]
+    except llm.LLMBusy:
+        raise
+    except Exception:
+        pass
+    if mode == "reputation":
+        results = await asyncio.gather(*(reputation_reply(c, use_cache=use_cache) for c in comments))
+    else:
+        results = await asyncio.gather(*(mass_personal_replies(c, 1, use_cache=use_cache) for c in comments))
+    return list(results)
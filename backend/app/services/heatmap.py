@@ -0,0 +1,138 @@
+import heapq
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChannelHeatmap, ChannelStatsSnapshot
+
+HOURS = 24
+DAYS = 7
+CELLS = HOURS * DAYS
+TOP_SLOTS = 5
+
+
+def cell_index(hour_utc: int, day_of_week: int) -> int:
+    return hour_utc * DAYS + day_of_week
+
+
+def cell_score(posts: int, views: int, reactions: int) -> float:
+    if not posts:
+        return 0.0
+    return views / posts * 0.3 + reactions / posts * 10
+
+
+def best_slots(posts: list[int], views: list[int], reactions: list[int]) -> list[dict]:
+    scored = (
+        (cell_score(posts[i], views[i], reactions[i]), i)
+        for i in range(CELLS)
+        if posts[i]
+    )
+    return [
+        {"hour_utc": i // DAYS, "day_of_week": i % DAYS, "score": score}
+        for score, i in heapq.nlargest(TOP_SLOTS, scored, key=lambda x: (x[0], -x[1]))
+    ]
+
+
+async def snapshot_cells(db: AsyncSession, channel_id: int) -> dict[int, tuple[int, int, int]]:
+    result = await db.execute(
+        select(
+            ChannelStatsSnapshot.period_value,
+            ChannelStatsSnapshot.day_of_week,
+            ChannelStatsSnapshot.posts_count,
+            ChannelStatsSnapshot.total_views,
+            ChannelStatsSnapshot.total_reactions,
+        ).where(
+            ChannelStatsSnapshot.channel_id == channel_id,
+            ChannelStatsSnapshot.period_type == "heatmap",
+        )
+    )
+    cells: dict[int, tuple[int, int, int]] = {}
+    for hour_utc, day_of_week, posts, views, reactions in result.all():
+        i = cell_index(hour_utc, day_of_week or 0)
+        p, v, r = cells.get(i, (0, 0, 0))
+        cells[i] = (p + (posts or 0), v + (views or 0), r + (reactions or 0))
+    return cells
+
+
+def _apply(agg: ChannelHeatmap, cells: dict[int, tuple[int, int, int]]) -> None:
+    posts, views, reactions = list(agg.posts), list(agg.views), list(agg.reactions)
+    for i, (p, v, r) in cells.items():
+        posts[i] += p
+        views[i] += v
+        reactions[i] += r
+    agg.posts, agg.views, agg.reactions = posts, views, reactions
+    agg.best_slots = best_slots(posts, views, reactions)
+
+
+async def _load_for_update(db: AsyncSession, channel_id: int) -> ChannelHeatmap:
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    created = (await db.execute(
+        insert(ChannelHeatmap)
+        .values(channel_id=channel_id, posts=[0] * CELLS, views=[0] * CELLS, reactions=[0] * CELLS)
+        .on_conflict_do_nothing(index_elements=["channel_id"])
+        .returning(ChannelHeatmap.channel_id)
+    )).scalar_one_or_none()
+    result = await db.execute(
+        select(ChannelHeatmap)
+        .where(ChannelHeatmap.channel_id == channel_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    agg = result.scalar_one()
+    if created is not None:
+        _apply(agg, await snapshot_cells(db, channel_id))
+    return agg
+
+
+async def apply_cells(db: AsyncSession, channel_id: int, cells: dict[int, tuple[int, int, int]]) -> ChannelHeatmap:
+    agg = await _load_for_update(db, channel_id)
+    _apply(agg, cells)
+    await db.flush()
+    return agg
+
+
+async def record_heatmap_snapshots(
+    db: AsyncSession,
+    channel_id: int,
+    rows: Iterable[tuple[int, int, int, int, int]],
+) -> ChannelHeatmap:
+    agg = await _load_for_update(db, channel_id)
+    cells: dict[int, tuple[int, int, int]] = {}
+    for hour_utc, day_of_week, posts, views, reactions in rows:
+        db.add(ChannelStatsSnapshot(
+            channel_id=channel_id,
+            period_type="heatmap",
+            period_value=hour_utc,
+            day_of_week=day_of_week,
+            posts_count=posts,
+            total_views=views,
+            total_reactions=reactions,
+        ))
+        i = cell_index(hour_utc, day_of_week)
+        p, v, r = cells.get(i, (0, 0, 0))
+        cells[i] = (p + posts, v + views, r + reactions)
+    _apply(agg, cells)
+    await db.flush()
+    return agg
+
+
+def heatmap_cells(agg: ChannelHeatmap) -> list[dict]:
+    return [
+        {
+            "hour_utc": i // DAYS,
+            "day_of_week": i % DAYS,
+            "posts_count": p,
+            "avg_views": v / p if p else 0.0,
+            "avg_reactions": r / p if p else 0.0,
+            "score": cell_score(p, v, r),
+        }
+        for i, (p, v, r) in enumerate(zip(agg.posts, agg.views, agg.reactions))
+    ]
+
+
+def empty_heatmap(channel_id: int) -> ChannelHeatmap:
+    return ChannelHeatmap(channel_id=channel_id, posts=[0] * CELLS, views=[0] * CELLS, reactions=[0] * CELLS, best_slots=[])
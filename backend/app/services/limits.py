@@ -0,0 +1,120 @@
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Channel, Competitor, NegotiationRequest, UsageCounter
+from app.services.cache import redis_delete, redis_get_json, redis_set_json
+
+CHANNELS = "channels"
+COMPETITORS = "competitors"
+NEGOTIATIONS = "negotiations"
+GENERATIONS = "generations"
+COUNTED = (CHANNELS, COMPETITORS, NEGOTIATIONS)
+
+DEFAULT_TARIFF = "creator"
+TARIFF_LIMITS: dict[str, dict[str, int | None]] = {
+    "creator": {CHANNELS: 1, COMPETITORS: 1, NEGOTIATIONS: 0, GENERATIONS: 5},
+    "strategist": {CHANNELS: 3, COMPETITORS: 15, NEGOTIATIONS: 20, GENERATIONS: 100},
+    "agency": {CHANNELS: 10, COMPETITORS: 50, NEGOTIATIONS: None, GENERATIONS: 999999},
+}
+
+
+class LimitExceeded(Exception):
+    def __init__(self, resource: str, limit: int):
+        super().__init__(f"Tariff limit: max {limit} {resource}")
+        self.resource = resource
+        self.limit = limit
+
+
+def limit_for(tariff: str, resource: str) -> int | None:
+    return TARIFF_LIMITS.get(tariff, TARIFF_LIMITS[DEFAULT_TARIFF])[resource]
+
+
+def _usage_query(user_id: int, resource: str):
+    if resource == CHANNELS:
+        return select(func.count(Channel.id)).where(Channel.owner_id == user_id)
+    if resource == COMPETITORS:
+        return select(func.count(Competitor.id)).where(Competitor.owner_id == user_id)
+    if resource == NEGOTIATIONS:
+        return select(func.count(NegotiationRequest.id)).where(
+            NegotiationRequest.from_user_id == user_id,
+            NegotiationRequest.status == "pending",
+        )
+    raise ValueError(f"Unknown resource: {resource}")
+
+
+def _flag_key(user_id: int, resource: str) -> str:
+    return f"limit:{user_id}:{resource}"
+
+
+async def _init_counter(db: AsyncSession, user_id: int, resource: str) -> None:
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    used = _usage_query(user_id, resource).scalar_subquery()
+    await db.execute(
+        insert(UsageCounter)
+        .from_select(
+            ["user_id", "resource", "used"],
+            select(literal(user_id), literal(resource), used),
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "resource"])
+    )
+
+
+async def _increment(db: AsyncSession, user_id: int, resource: str, amount: int, limit: int | None) -> int | None:
+    stmt = update(UsageCounter).where(UsageCounter.user_id == user_id, UsageCounter.resource == resource)
+    if limit is not None:
+        stmt = stmt.where(UsageCounter.used + amount <= limit)
+    stmt = (
+        stmt.values(used=UsageCounter.used + amount)
+        .returning(UsageCounter.used)
+        .execution_options(synchronize_session=False)
+    )
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def resync(db: AsyncSession, user_id: int, resource: str) -> bool:
+    key = (UsageCounter.user_id == user_id, UsageCounter.resource == resource)
+    used = await db.scalar(select(UsageCounter.used).where(*key).with_for_update())
+    if used is None:
+        return False
+    actual = await db.scalar(_usage_query(user_id, resource))
+    if actual == used:
+        return False
+    await db.execute(
+        update(UsageCounter)
+        .where(*key)
+        .values(used=actual)
+        .execution_options(synchronize_session=False)
+    )
+    await redis_delete(_flag_key(user_id, resource))
+    return True
+
+
+async def reserve(db: AsyncSession, user_id: int, tariff: str, resource: str, amount: int = 1) -> int:
+    limit = limit_for(tariff, resource)
+    if limit is not None and await redis_get_json(_flag_key(user_id, resource)) == limit:
+        raise LimitExceeded(resource, limit)
+    used = await _increment(db, user_id, resource, amount, limit)
+    if used is None:
+        await _init_counter(db, user_id, resource)
+        used = await _increment(db, user_id, resource, amount, limit)
+    if used is None and await resync(db, user_id, resource):
+        used = await _increment(db, user_id, resource, amount, limit)
+    if used is None:
+        await redis_set_json(_flag_key(user_id, resource), limit, settings.limit_flag_ttl_seconds)
+        raise LimitExceeded(resource, limit)
+    return used
+
+
+async def release(db: AsyncSession, user_id: int, resource: str, amount: int = 1) -> None:
+    used = UsageCounter.used
+    await db.execute(
+        update(UsageCounter)
+        .where(UsageCounter.user_id == user_id, UsageCounter.resource == resource)
+        .values(used=case((used >= amount, used - amount), else_=0))
+        .execution_options(synchronize_session=False)
+    )
+    await redis_delete(_flag_key(user_id, resource))
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from app.config import settings
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_client = None
+_semaphore = asyncio.Semaphore(settings.openai_max_concurrency)
+_stats = {
+    "requests": 0,
+    "errors": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "queued": 0,
+    "max_queued": 0,
+    "queue_wait_seconds_total": 0.0,
+    "upstream_seconds_total": 0.0,
+}
+
+
+class LLMBusy(Exception):
+    pass
+
+
+def enabled() -> bool:
+    return bool(settings.openai_api_key)
+
+
+def get_client():
+    global _client
+    if not enabled():
+        return None
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry_seconds,
+            ),
+            timeout=httpx.Timeout(
+                settings.openai_timeout_seconds,
+                connect=settings.openai_connect_timeout_seconds,
+            ),
+        )
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url or None,
+            max_retries=settings.openai_max_retries,
+            http_client=http_client,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+@asynccontextmanager
+async def slot():
+    if _stats["queued"] >= settings.openai_max_queue:
+        _stats["rejected"] += 1
+        raise LLMBusy("Generation queue is full")
+    _stats["queued"] += 1
+    _stats["max_queued"] = max(_stats["max_queued"], _stats["queued"])
+    started = time.monotonic()
+    try:
+        async with asyncio.timeout(settings.openai_queue_timeout_seconds):
+            await _semaphore.acquire()
+    except TimeoutError:
+        _stats["rejected"] += 1
+        raise LLMBusy("Timed out waiting for a generation slot")
+    finally:
+        _stats["queued"] -= 1
+        _stats["queue_wait_seconds_total"] += time.monotonic() - started
+    _stats["in_flight"] += 1
+    started = time.monotonic()
+    try:
+        yield
+    except Exception:
+        _stats["errors"] += 1
+        raise
+    finally:
+        _stats["in_flight"] -= 1
+        _stats["requests"] += 1
+        _stats["upstream_seconds_total"] += time.monotonic() - started
+        _semaphore.release()
+
+
+async def completion(prompt: str, *, model: str = DEFAULT_MODEL, timeout: float | None = None, **params):
+    client = get_client()
+    async with slot():
+        return await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=timeout or settings.openai_timeout_seconds,
+            **params,
+        )
+
+
+async def complete(prompt: str, *, model: str = DEFAULT_MODEL, timeout: float | None = None, **params) -> str:
+    resp = await completion(prompt, model=model, timeout=timeout, **params)
+    return resp.choices[0].message.content or ""
+
+
+async def stream(prompt: str, *, model: str = DEFAULT_MODEL, timeout: float | None = None, **params):
+    client = get_client()
+    async with slot():
+        resp = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=timeout or settings.openai_timeout_seconds,
+            stream=True,
+            **params,
+        )
+        try:
+            async for chunk in resp:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await resp.close()
+
+
+def stats() -> dict:
+    return {
+        **_stats,
+        "max_concurrency": settings.openai_max_concurrency,
+        "max_queue": settings.openai_max_queue,
+    }
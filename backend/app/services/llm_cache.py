@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import json
+import time
+
+from app.config import settings
+from app.services import llm
+from app.services.cache import TTLCache, redis_get_json, redis_set_json
+
+_local = TTLCache(settings.llm_cache_max_size, settings.llm_cache_ttl_seconds)
+_inflight: dict[str, asyncio.Future] = {}
+_stats = {
+    "hits_local": 0,
+    "hits_redis": 0,
+    "misses": 0,
+    "coalesced": 0,
+    "bypassed": 0,
+    "saved_seconds_total": 0.0,
+    "saved_tokens_total": 0,
+}
+
+
+def cache_key(prompt: str, model: str, params: dict) -> str:
+    normalized = " ".join(prompt.split())
+    raw = json.dumps({"prompt": normalized, "model": model, "params": params}, sort_keys=True)
+    return "llm:v2:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _record_hit(entry: dict, tier: str) -> str:
+    _stats[tier] += 1
+    _stats["saved_seconds_total"] += entry.get("seconds", 0.0)
+    _stats["saved_tokens_total"] += entry.get("tokens", 0)
+    return entry["text"]
+
+
+async def _fetch(key: str, prompt: str, model: str, params: dict) -> str:
+    entry = await redis_get_json(key)
+    if entry is not None:
+        _local.set(key, entry)
+        return _record_hit(entry, "hits_redis")
+    _stats["misses"] += 1
+    started = time.monotonic()
+    resp = await llm.completion(prompt, model=model, **params)
+    entry = {
+        "text": resp.choices[0].message.content or "",
+        "tokens": resp.usage.total_tokens if resp.usage else 0,
+        "seconds": time.monotonic() - started,
+    }
+    _local.set(key, entry)
+    await redis_set_json(key, entry, settings.llm_cache_redis_ttl_seconds)
+    return entry["text"]
+
+
+async def complete(prompt: str, *, model: str = llm.DEFAULT_MODEL, use_cache: bool = True, **params) -> str:
+    if not use_cache or not settings.llm_cache_enabled:
+        _stats["bypassed"] += 1
+        return await llm.complete(prompt, model=model, **params)
+    key = cache_key(prompt, model, params)
+    entry = _local.get(key)
+    if entry is not None:
+        return _record_hit(entry, "hits_local")
+    pending = _inflight.get(key)
+    if pending is not None:
+        _stats["coalesced"] += 1
+        return await asyncio.shield(pending)
+    task = asyncio.ensure_future(_fetch(key, prompt, model, params))
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+def stats() -> dict:
+    lookups = _stats["hits_local"] + _stats["hits_redis"] + _stats["misses"] + _stats["coalesced"]
+    hits = lookups - _stats["misses"]
+    return {**_stats, "entries": len(_local), "hit_ratio": hits / lookups if lookups else 0.0}
@@ -0,0 +1,35 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Channel, NegotiationRequest
+from app.services.channel_search import normalize_username
+
+
+async def resolve_recipient(db: AsyncSession, to_username: str) -> int | None:
+    username = normalize_username(to_username)
+    if not username:
+        return None
+    return await db.scalar(
+        select(Channel.owner_id)
+        .where(func.lower(Channel.username) == username)
+        .limit(1)
+    )
+
+
+async def claim_for_channel(db: AsyncSession, user_id: int, username: str | None) -> None:
+    username = normalize_username(username)
+    if not username:
+        return
+    await db.execute(
+        update(NegotiationRequest)
+        .where(
+            func.lower(NegotiationRequest.to_channel_username) == username,
+            NegotiationRequest.to_user_id.is_(None),
+        )
+        .values(to_user_id=user_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def addressed_to(user_id: int):
+    return NegotiationRequest.to_user_id == user_id
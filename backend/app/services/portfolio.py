@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.database import read_session
+from app.models import Channel, Competitor, NegotiationRequest
+from app.services import negotiations, rollups
+from app.services.channel_search import normalize_username
+
+
+async def _rows(stmt):
+    async with read_session() as db:
+        return (await db.execute(stmt)).all()
+
+
+async def _scalars(stmt):
+    async with read_session() as db:
+        return (await db.execute(stmt)).scalars().all()
+
+
+async def load(user_id: int, period_days: int) -> list[dict]:
+    today = datetime.utcnow().date()
+    since = today - timedelta(days=period_days - 1)
+    owned = select(Channel.id).where(Channel.owner_id == user_id)
+    channels, windows, competitors, outgoing, incoming = await asyncio.gather(
+        _rows(
+            select(Channel.id, Channel.title, Channel.username, Channel.subscribers_count)
+            .where(Channel.owner_id == user_id)
+            .order_by(Channel.created_at, Channel.id)
+        ),
+        _scalars(rollups.windows_stmt(owned, since, today)),
+        _rows(
+            select(Competitor.channel_id, func.count(Competitor.id))
+            .where(Competitor.owner_id == user_id)
+            .group_by(Competitor.channel_id)
+        ),
+        _rows(
+            select(NegotiationRequest.from_channel_id, func.count(NegotiationRequest.id))
+            .where(NegotiationRequest.from_user_id == user_id, NegotiationRequest.status == "pending")
+            .group_by(NegotiationRequest.from_channel_id)
+        ),
+        _rows(
+            select(func.lower(NegotiationRequest.to_channel_username), func.count(NegotiationRequest.id))
+            .where(negotiations.addressed_to(user_id), NegotiationRequest.status == "pending")
+            .group_by(func.lower(NegotiationRequest.to_channel_username))
+        ),
+    )
+    stats = rollups.summarize_windows(windows, since)
+    competitors, outgoing, incoming = dict(competitors), dict(outgoing), dict(incoming)
+    out = []
+    for channel_id, title, username, subscribers in channels:
+        window = stats.get(channel_id)
+        if subscribers is None and window:
+            subscribers = window.subscribers_count
+        out.append({
+            "id": channel_id,
+            "title": title,
+            "username": username,
+            "subscribers_count": subscribers,
+            "growth": window.growth if window else None,
+            "er_estimate": window.er if window else None,
+            "posts_count": window.posts if window else 0,
+            "competitors_count": competitors.get(channel_id, 0),
+            "pending_outgoing": outgoing.get(channel_id, 0),
+            "pending_incoming": incoming.get(normalize_username(username), 0),
+        })
+    return out
@@ -0,0 +1,122 @@
+import re
+from typing import Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChannelPsychographics
+
+EMOTIONS = ("joy", "trust", "interest", "neutral", "criticism")
+TYPES = ("enthusiasts", "silent_readers", "critics", "discussants")
+DISCUSSION_LENGTH = 80
+
+LEXICON = {
+    "joy": (
+        "класс", "классно", "круто", "супер", "отлично", "ура", "люблю", "обожаю", "кайф", "огонь",
+        "смешно", "ахаха", "хаха", "лол", "lol", "great", "love", "awesome", "cool", "amazing", "nice",
+        "😂", "😍", "🔥", "❤", "🥰", "😊", "👍", "🎉",
+    ),
+    "trust": (
+        "спасибо", "благодарю", "согласен", "согласна", "верно", "точно", "правда", "полезно", "полезный",
+        "рекомендую", "доверяю", "thanks", "thank", "agree", "true", "useful", "helpful", "👏", "🙏", "💯",
+    ),
+    "interest": (
+        "интересно", "почему", "зачем", "подскажите", "расскажите", "подробнее", "узнать", "хочу",
+        "interesting", "why", "how", "tell", "more", "🤔", "👀",
+    ),
+    "criticism": (
+        "плохо", "ужас", "ужасно", "бред", "чушь", "фигня", "отписка", "отписываюсь", "скучно", "врете",
+        "неправда", "обман", "bad", "awful", "terrible", "boring", "fake", "spam", "scam", "wrong", "hate",
+        "👎", "💩", "🤮", "😡",
+    ),
+}
+_SCORED = ("joy", "trust", "interest", "criticism")
+_QUESTION, _EXCLAIM = len(_SCORED), len(_SCORED) + 1
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def _build_model() -> tuple[np.ndarray, np.ndarray]:
+    weights: dict[str, np.ndarray] = {}
+    for col, emotion in enumerate(_SCORED):
+        for word in LEXICON[emotion]:
+            weights.setdefault(word, np.zeros(len(_SCORED) + 2, dtype=np.float32))[col] += 1.0
+    weights.setdefault("?", np.zeros(len(_SCORED) + 2, dtype=np.float32))[_QUESTION] = 1.0
+    weights.setdefault("!", np.zeros(len(_SCORED) + 2, dtype=np.float32))[_EXCLAIM] = 1.0
+    vocab = np.array(sorted(weights))
+    return vocab, np.stack([weights[w] for w in vocab])
+
+
+_VOCAB, _WEIGHTS = _build_model()
+
+
+def score_batch(comments: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    n = len(comments)
+    tokenized = [_TOKEN.findall(c.lower()) for c in comments]
+    counts = np.fromiter((len(t) for t in tokenized), dtype=np.intp, count=n)
+    lengths = np.fromiter((len(c) for c in comments), dtype=np.intp, count=n)
+    tokens = np.array([tok for toks in tokenized for tok in toks] or [""])
+    doc = np.repeat(np.arange(n), counts)
+    pos = np.minimum(np.searchsorted(_VOCAB, tokens[:len(doc)]), len(_VOCAB) - 1)
+    hit = _VOCAB[pos] == tokens[:len(doc)]
+    features = np.zeros((n, _WEIGHTS.shape[1]), dtype=np.float32)
+    np.add.at(features, doc[hit], _WEIGHTS[pos[hit]])
+
+    scores = features[:, :len(_SCORED)]
+    best = scores.argmax(axis=1)
+    has_emotion = scores.max(axis=1) > 0
+    emotion = np.where(has_emotion, np.array([EMOTIONS.index(e) for e in _SCORED])[best], EMOTIONS.index("neutral"))
+
+    critic = emotion == EMOTIONS.index("criticism")
+    enthusiast = ~critic & (
+        np.isin(emotion, [EMOTIONS.index("joy"), EMOTIONS.index("trust")]) | (features[:, _EXCLAIM] > 0)
+    )
+    discussant = ~critic & ~enthusiast & (
+        (features[:, _QUESTION] > 0) | (lengths >= DISCUSSION_LENGTH) | (emotion == EMOTIONS.index("interest"))
+    )
+    audience_type = np.select(
+        [critic, enthusiast, discussant],
+        [TYPES.index("critics"), TYPES.index("enthusiasts"), TYPES.index("discussants")],
+        default=TYPES.index("silent_readers"),
+    )
+    return (
+        np.bincount(emotion, minlength=len(EMOTIONS)),
+        np.bincount(audience_type, minlength=len(TYPES)),
+    )
+
+
+async def _load_for_update(db: AsyncSession, channel_id: int) -> ChannelPsychographics:
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    await db.execute(
+        insert(ChannelPsychographics)
+        .values(channel_id=channel_id, emotion_counts={}, type_counts={}, comments_count=0)
+        .on_conflict_do_nothing(index_elements=["channel_id"])
+    )
+    result = await db.execute(
+        select(ChannelPsychographics)
+        .where(ChannelPsychographics.channel_id == channel_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def ingest(db: AsyncSession, channel_id: int, comments: Sequence[str]) -> ChannelPsychographics:
+    emotions, types = score_batch(comments) if comments else (np.zeros(len(EMOTIONS)), np.zeros(len(TYPES)))
+    row = await _load_for_update(db, channel_id)
+    row.emotion_counts = {
+        e: int(row.emotion_counts.get(e, 0) + emotions[i]) for i, e in enumerate(EMOTIONS)
+    }
+    row.type_counts = {t: int(row.type_counts.get(t, 0) + types[i]) for i, t in enumerate(TYPES)}
+    row.comments_count += len(comments)
+    await db.flush()
+    return row
+
+
+def distribution(counts: dict, labels: Sequence[str]) -> dict[str, float]:
+    total = sum(counts.get(label, 0) for label in labels)
+    return {label: round(counts.get(label, 0) / total, 4) if total else 0.0 for label in labels}
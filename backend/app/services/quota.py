@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, literal, or_, select, update
+
+from app.database import async_session
+from app.models.user import User
+from app.services import limits, user_cache
+
+QUOTA_PERIOD = timedelta(days=7)
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Weekly limit ({limit}) reached.")
+        self.limit = limit
+
+
+class UnknownUser(Exception):
+    pass
+
+
+def weekly_limit(tariff: str) -> int:
+    return limits.limit_for(tariff, limits.GENERATIONS)
+
+
+def _limit_expr():
+    return case(
+        *(
+            (User.tariff == tariff, tariff_limits[limits.GENERATIONS])
+            for tariff, tariff_limits in limits.TARIFF_LIMITS.items()
+        ),
+        else_=weekly_limit(limits.DEFAULT_TARIFF),
+    )
+
+
+class Reservation:
+    def __init__(self, user_id: int, amount: int, week_reset_at: datetime):
+        self.user_id = user_id
+        self.amount = amount
+        self.week_reset_at = week_reset_at
+        self.settled = False
+
+    def commit(self) -> None:
+        self.settled = True
+
+    async def refund(self, amount: int | None = None) -> None:
+        if self.settled:
+            return
+        amount = self.amount if amount is None else min(amount, self.amount)
+        self.amount -= amount
+        if self.amount <= 0:
+            self.settled = True
+        if amount <= 0:
+            return
+        used = User.content_generations_used_this_week
+        async with async_session() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == self.user_id, User.content_week_reset_at == self.week_reset_at)
+                .values(content_generations_used_this_week=case((used >= amount, used - amount), else_=0))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        await user_cache.invalidate_user(self.user_id)
+
+
+async def reserve(user_id: int, amount: int = 1) -> Reservation:
+    now = datetime.utcnow()
+    used = User.content_generations_used_this_week
+    limit = _limit_expr()
+    expired = or_(User.content_week_reset_at.is_(None), User.content_week_reset_at <= now)
+    stmt = (
+        update(User)
+        .where(
+            User.id == user_id,
+            or_(and_(expired, literal(amount) <= limit), used + amount <= limit),
+        )
+        .values(
+            content_generations_used_this_week=case((expired, amount), else_=used + amount),
+            content_week_reset_at=case((expired, now + QUOTA_PERIOD), else_=User.content_week_reset_at),
+        )
+        .returning(User.content_week_reset_at)
+        .execution_options(synchronize_session=False)
+    )
+    async with async_session() as db:
+        week_reset_at = (await db.execute(stmt)).scalar_one_or_none()
+        if week_reset_at is None:
+            tariff = await db.scalar(select(User.tariff).where(User.id == user_id))
+            await db.rollback()
+            if tariff is None:
+                raise UnknownUser()
+            raise QuotaExceeded(weekly_limit(tariff))
+        await db.commit()
+    await user_cache.invalidate_user(user_id)
+    return Reservation(user_id, amount, week_reset_at)
+
+
+async def set_tariff(user_id: int, tariff: str) -> bool:
+    async with async_session() as db:
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(tariff=tariff)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    await user_cache.invalidate_user(user_id)
+    return result.rowcount > 0
+
+
+@asynccontextmanager
+async def settle(reservation: Reservation):
+    try:
+        yield reservation
+    except BaseException:
+        await asyncio.shield(reservation.refund())
+        raise
+    reservation.commit()
@@ -0,0 +1,170 @@
+from datetime import date, datetime
+from typing import NamedTuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChannelDailyRollup, ChannelStatsSnapshot
+
+R = ChannelDailyRollup
+S = ChannelStatsSnapshot
+
+
+class WindowStats(NamedTuple):
+    posts: int
+    views: int
+    reactions: int
+    growth: int | None
+    er: float | None
+    subscribers_count: int | None
+
+
+async def apply_days(
+    db: AsyncSession,
+    channel_id: int,
+    days: dict[date, tuple[int, int, int, int | None]],
+) -> None:
+    if not days:
+        return
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    start = min(days)
+    await db.execute(
+        insert(R)
+        .values([
+            {
+                "channel_id": channel_id,
+                "day": day,
+                "posts_count": 0,
+                "total_views": 0,
+                "total_reactions": 0,
+                "running_posts": 0,
+                "running_views": 0,
+                "running_reactions": 0,
+            }
+            for day in sorted(days)
+        ])
+        .on_conflict_do_nothing(index_elements=["channel_id", "day"])
+    )
+    result = await db.execute(
+        select(R)
+        .where(R.channel_id == channel_id, R.day >= start)
+        .order_by(R.day)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    rows = {row.day: row for row in result.scalars().all()}
+    base = (await db.execute(
+        select(R).where(R.channel_id == channel_id, R.day < start).order_by(R.day.desc()).limit(1)
+    )).scalar_one_or_none()
+
+    for day, (posts, views, reactions, subscribers) in days.items():
+        row = rows[day]
+        row.posts_count += posts
+        row.total_views += views
+        row.total_reactions += reactions
+        if subscribers is not None:
+            row.subscribers_count = subscribers
+
+    posts = base.running_posts if base else 0
+    views = base.running_views if base else 0
+    reactions = base.running_reactions if base else 0
+    subscribers = base.last_subscribers_count if base else None
+    for day in sorted(rows):
+        row = rows[day]
+        posts += row.posts_count
+        views += row.total_views
+        reactions += row.total_reactions
+        if row.subscribers_count is not None:
+            subscribers = row.subscribers_count
+        row.running_posts, row.running_views, row.running_reactions = posts, views, reactions
+        row.last_subscribers_count = subscribers
+    await db.flush()
+
+
+async def daily_snapshots(db: AsyncSession, channel_id: int) -> dict[date, tuple[int, int, int, int | None]]:
+    result = await db.execute(
+        select(S.period_value, S.posts_count, S.total_views, S.total_reactions, S.subscribers_count)
+        .where(S.channel_id == channel_id, S.period_type == "daily")
+        .order_by(S.period_value, S.created_at, S.id)
+    )
+    days: dict[date, tuple[int, int, int, int | None]] = {}
+    for value, posts, views, reactions, subscribers in result.all():
+        day = datetime.strptime(str(value), "%Y%m%d").date()
+        p, v, r, subs = days.get(day, (0, 0, 0, None))
+        days[day] = (p + (posts or 0), v + (views or 0), r + (reactions or 0), subscribers if subscribers is not None else subs)
+    return days
+
+
+async def rebuild(db: AsyncSession, channel_id: int) -> int:
+    await db.execute(delete(R).where(R.channel_id == channel_id).execution_options(synchronize_session=False))
+    days = await daily_snapshots(db, channel_id)
+    await apply_days(db, channel_id, days)
+    return len(days)
+
+
+def summarize(rows: list[ChannelDailyRollup], since: date) -> WindowStats | None:
+    if not rows or rows[-1].day < since:
+        return None
+    end = rows[-1]
+    start = rows[0] if rows[0].day < since else None
+    posts = end.running_posts - (start.running_posts if start else 0)
+    views = end.running_views - (start.running_views if start else 0)
+    reactions = end.running_reactions - (start.running_reactions if start else 0)
+    opening = start.last_subscribers_count if start else None
+    if opening is None:
+        opening = next((r.last_subscribers_count for r in rows if r.day >= since), None)
+    growth = None
+    if opening is not None and end.last_subscribers_count is not None:
+        growth = end.last_subscribers_count - opening
+    return WindowStats(
+        posts=posts,
+        views=views,
+        reactions=reactions,
+        growth=growth,
+        er=reactions / views if views else None,
+        subscribers_count=end.last_subscribers_count,
+    )
+
+
+async def window(db: AsyncSession, channel_id: int, since: date, until: date) -> WindowStats | None:
+    scope = (R.channel_id == channel_id,)
+    before = select(func.max(R.day)).where(*scope, R.day < since).scalar_subquery()
+    first = select(func.min(R.day)).where(*scope, R.day >= since, R.day <= until).scalar_subquery()
+    last = select(func.max(R.day)).where(*scope, R.day <= until).scalar_subquery()
+    result = await db.execute(select(R).where(*scope, R.day.in_([before, first, last])).order_by(R.day))
+    return summarize(result.scalars().all(), since)
+
+
+def windows_stmt(channel_ids, since: date, until: date):
+    bounds = (
+        select(
+            R.channel_id,
+            func.max(case((R.day < since, R.day))).label("before"),
+            func.min(case((R.day >= since, R.day))).label("first"),
+            func.max(R.day).label("last"),
+        )
+        .where(R.channel_id.in_(channel_ids), R.day <= until)
+        .group_by(R.channel_id)
+        .subquery()
+    )
+    return (
+        select(R)
+        .join(bounds, R.channel_id == bounds.c.channel_id)
+        .where(R.day.in_([bounds.c.before, bounds.c.first, bounds.c.last]))
+        .order_by(R.channel_id, R.day)
+    )
+
+
+def summarize_windows(rows: list[ChannelDailyRollup], since: date) -> dict[int, WindowStats]:
+    by_channel: dict[int, list[ChannelDailyRollup]] = {}
+    for row in rows:
+        by_channel.setdefault(row.channel_id, []).append(row)
+    out = {}
+    for channel_id, channel_rows in by_channel.items():
+        stats = summarize(channel_rows, since)
+        if stats is not None:
+            out[channel_id] = stats
+    return out
@@ -0,0 +1,235 @@
+import asyncio
+import fcntl
+import json
+import math
+import os
+import re
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import ChannelCatalogEntry
+
+TEXT_DIM = 256
+SIZE_BANDS = (1_000, 5_000, 20_000, 100_000, 500_000)
+ER_BANDS = (0.01, 0.03, 0.06, 0.1)
+DIM = TEXT_DIM + len(SIZE_BANDS) + 1 + len(ER_BANDS) + 1
+TEXT_WEIGHT = 0.85
+SIZE_WEIGHT = 0.35
+ER_WEIGHT = 0.2
+INITIAL_CAPACITY = 1024
+
+_WORD = re.compile(r"\w+")
+
+
+def _bucket(x: float, bands: tuple) -> int:
+    return sum(x >= b for b in bands)
+
+
+def _add_hashed(vec: np.ndarray, feature: str, weight: float) -> None:
+    h = zlib.crc32(feature.encode())
+    vec[h % TEXT_DIM] += weight if h & 0x80000000 else -weight
+
+
+def featurize(
+    title: str | None,
+    description: str | None,
+    username: str | None,
+    subscribers_count: int | None,
+    er_estimate: float | None,
+) -> np.ndarray:
+    vec = np.zeros(DIM, dtype=np.float32)
+    text = vec[:TEXT_DIM]
+    for part, weight in ((title, 2.0), (username, 1.0), (description, 1.0)):
+        for word in _WORD.findall((part or "").lower()):
+            _add_hashed(text, "w:" + word, weight)
+            padded = f"^{word}$"
+            for i in range(len(padded) - 2):
+                _add_hashed(text, "g:" + padded[i:i + 3], weight * 0.5)
+    norm = np.linalg.norm(text)
+    if norm:
+        text *= TEXT_WEIGHT / norm
+    if subscribers_count is not None:
+        vec[TEXT_DIM + _bucket(subscribers_count, SIZE_BANDS)] = SIZE_WEIGHT
+    if er_estimate is not None:
+        vec[TEXT_DIM + len(SIZE_BANDS) + 1 + _bucket(er_estimate, ER_BANDS)] = ER_WEIGHT
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class SimilarityIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.meta: dict | None = None
+        self.meta_mtime = 0.0
+        self.mapped: tuple[dict, np.ndarray, np.ndarray, np.ndarray] | None = None
+        self.checked_at = 0.0
+
+    def _file(self, name: str, generation: int) -> str:
+        return os.path.join(self.path, f"{name}.{generation}.bin")
+
+    def _read_meta(self) -> dict | None:
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta: dict) -> None:
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def _map(self, meta: dict, mode: str):
+        shape = (meta["capacity"],)
+        gen = meta["generation"]
+        return (
+            np.memmap(self._file("vectors", gen), dtype=np.float32, mode=mode, shape=(meta["capacity"], DIM)),
+            np.memmap(self._file("ids", gen), dtype=np.int64, mode=mode, shape=shape),
+            np.memmap(self._file("hidden", gen), dtype=np.bool_, mode=mode, shape=shape),
+        )
+
+    def _allocate(self, capacity: int, generation: int, previous: dict | None) -> dict:
+        meta = {
+            "generation": generation,
+            "capacity": capacity,
+            "count": previous["count"] if previous else 0,
+            "watermark": previous["watermark"] if previous else None,
+            "dim": DIM,
+        }
+        for name, dtype, shape in (
+            ("vectors", np.float32, (capacity, DIM)),
+            ("ids", np.int64, (capacity,)),
+            ("hidden", np.bool_, (capacity,)),
+        ):
+            arr = np.memmap(self._file(name, generation), dtype=dtype, mode="w+", shape=shape)
+            if name == "ids":
+                arr[:] = -1
+            arr.flush()
+        if previous:
+            old, new = self._map(previous, "r"), self._map(meta, "r+")
+            n = previous["count"]
+            for src, dst in zip(old, new):
+                dst[:n] = src[:n]
+                dst.flush()
+        return meta
+
+    @contextmanager
+    def _lock(self, blocking: bool):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def open(self) -> bool:
+        try:
+            mtime = os.stat(os.path.join(self.path, "meta.json")).st_mtime
+        except OSError:
+            return False
+        if self.meta is not None and mtime == self.meta_mtime:
+            return True
+        meta = self._read_meta()
+        if not meta or meta.get("dim") != DIM:
+            return self.meta is not None
+        try:
+            self.mapped = (meta, *self._map(meta, "r"))
+        except (OSError, ValueError):
+            return self.meta is not None
+        self.meta, self.meta_mtime = meta, mtime
+        return True
+
+    async def refresh(self, db: AsyncSession, full: bool = False, blocking: bool = True) -> int:
+        with self._lock(blocking):
+            current = self._read_meta()
+            meta = None if full or (current and current.get("dim") != DIM) else current
+            retired = [current["generation"]] if current and meta is None else []
+            if meta is None:
+                meta = self._allocate(INITIAL_CAPACITY, int(time.time() * 1000), None)
+            watermark = datetime.fromisoformat(meta["watermark"]) if meta["watermark"] else None
+            stmt = select(
+                ChannelCatalogEntry.id,
+                ChannelCatalogEntry.title,
+                ChannelCatalogEntry.description,
+                ChannelCatalogEntry.username,
+                ChannelCatalogEntry.subscribers_count,
+                ChannelCatalogEntry.er_estimate,
+                ChannelCatalogEntry.source,
+                ChannelCatalogEntry.updated_at,
+            ).order_by(ChannelCatalogEntry.updated_at, ChannelCatalogEntry.id)
+            if watermark is not None:
+                stmt = stmt.where(ChannelCatalogEntry.updated_at >= watermark)
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                return 0
+            vectors, ids, hidden = self._map(meta, "r+")
+            positions = {int(i): pos for pos, i in enumerate(ids[:meta["count"]])}
+            new_rows = sum(1 for r in rows if r.id not in positions)
+            if meta["count"] + new_rows > meta["capacity"]:
+                capacity = max(meta["capacity"] * 2, 1 << math.ceil(math.log2(meta["count"] + new_rows)))
+                previous = meta
+                meta = self._allocate(capacity, previous["generation"] + 1, previous)
+                vectors, ids, hidden = self._map(meta, "r+")
+                retired.append(previous["generation"])
+            for r in rows:
+                pos = positions.get(r.id)
+                if pos is None:
+                    pos = positions[r.id] = meta["count"]
+                    meta["count"] += 1
+                vectors[pos] = featurize(r.title, r.description, r.username, r.subscribers_count, r.er_estimate)
+                ids[pos] = r.id
+                hidden[pos] = not r.username
+            for arr in (vectors, ids, hidden):
+                arr.flush()
+            meta["watermark"] = rows[-1].updated_at.isoformat()
+            self._write_meta(meta)
+            for generation in retired:
+                for name in ("vectors", "ids", "hidden"):
+                    try:
+                        os.unlink(self._file(name, generation))
+                    except FileNotFoundError:
+                        pass
+            return len(rows)
+
+    async def reload(self) -> bool:
+        now = time.monotonic()
+        if self.meta is not None and now - self.checked_at < settings.similarity_refresh_interval_seconds:
+            return True
+        self.checked_at = now
+        return await asyncio.to_thread(self.open)
+
+    def query(self, vec: np.ndarray, k: int, exclude_ids: set[int]) -> list[tuple[int, float]]:
+        if self.mapped is None:
+            return []
+        meta, vectors, ids, hidden = self.mapped
+        n = meta["count"]
+        if not n:
+            return []
+        scores = np.asarray(vectors[:n] @ vec)
+        ids = np.asarray(ids[:n])
+        scores[np.asarray(hidden[:n])] = -np.inf
+        if exclude_ids:
+            scores[np.isin(ids, list(exclude_ids))] = -np.inf
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i]) and scores[i] > 0]
+
+
+_index: SimilarityIndex | None = None
+
+
+def get_index() -> SimilarityIndex:
+    global _index
+    if _index is None:
+        _index = SimilarityIndex(settings.similarity_index_dir)
+    return _index
@@ -0,0 +1,222 @@
+import codecs
+import csv
+import json
+import time
+from collections import deque
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Iterable, Iterator, NamedTuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChannelStatsSnapshot
+from app.services import heatmap, rollups
+
+SNAPSHOT_COLUMNS = (
+    "channel_id",
+    "period_type",
+    "period_value",
+    "day_of_week",
+    "posts_count",
+    "total_views",
+    "total_reactions",
+    "subscribers_count",
+    "created_at",
+)
+TIMESTAMP_FIELDS = ("timestamp", "date", "posted_at")
+
+
+class ImportReport(NamedTuple):
+    rows: int
+    skipped: int
+    snapshots_written: int
+    seconds: float
+    rows_per_second: float
+
+
+def _parse_timestamp(value) -> datetime:
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.strip().isdigit()):
+        return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+    ts = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _int(value) -> int:
+    return int(float(value)) if value not in (None, "") else 0
+
+
+class StatsAggregator:
+    def __init__(self):
+        self.cells: dict[int, tuple[int, int, int]] = {}
+        self.days: dict[date, list] = {}
+        self.rows = 0
+        self.skipped = 0
+
+    def add(self, record: dict) -> None:
+        try:
+            raw_ts = next(record[f] for f in TIMESTAMP_FIELDS if record.get(f) not in (None, ""))
+            ts = _parse_timestamp(raw_ts)
+            views = _int(record.get("views"))
+            reactions = _int(record.get("reactions"))
+            subscribers = record.get("subscribers")
+            subscribers = _int(subscribers) if subscribers not in (None, "") else None
+        except (StopIteration, ValueError, TypeError, OverflowError):
+            self.skipped += 1
+            return
+        self.rows += 1
+        i = heatmap.cell_index(ts.hour, ts.weekday())
+        p, v, r = self.cells.get(i, (0, 0, 0))
+        self.cells[i] = (p + 1, v + views, r + reactions)
+        day = self.days.get(ts.date())
+        if day is None:
+            self.days[ts.date()] = [1, views, reactions, subscribers]
+        else:
+            day[0] += 1
+            day[1] += views
+            day[2] += reactions
+            if subscribers is not None:
+                day[3] = subscribers
+
+    def snapshot_records(self, channel_id: int) -> list[tuple]:
+        now = datetime.utcnow()
+        records = [
+            (channel_id, "heatmap", i // heatmap.DAYS, i % heatmap.DAYS, p, v, r, None, now)
+            for i, (p, v, r) in sorted(self.cells.items())
+        ]
+        records.extend(
+            (channel_id, "daily", int(day.strftime("%Y%m%d")), day.weekday(), p, v, r, subs, now)
+            for day, (p, v, r, subs) in sorted(self.days.items())
+        )
+        return records
+
+
+class _PendingLines:
+    def __init__(self):
+        self.lines: deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+class RecordParser:
+    def __init__(self, fmt: str):
+        if fmt not in ("csv", "ndjson", "jsonl"):
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.fmt = fmt
+        self.header: list[str] | None = None
+        self.partial = ""
+        self.record = ""
+        self.quotes = 0
+        self.pending = _PendingLines()
+        self.reader = csv.reader(self.pending)
+
+    def feed(self, text: str) -> Iterator[dict]:
+        self.partial += text
+        *lines, self.partial = self.partial.split("\n")
+        for line in lines:
+            yield from self._line(line + "\n")
+
+    def finish(self) -> Iterator[dict]:
+        if self.partial:
+            yield from self._line(self.partial)
+            self.partial = ""
+        if self.record:
+            self.pending.lines.append(self.record)
+            self.record = ""
+            yield from self._rows()
+
+    def _line(self, line: str) -> Iterator[dict]:
+        if self.fmt != "csv":
+            if not line.strip():
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = {}
+            yield record if isinstance(record, dict) else {}
+            return
+        self.record += line
+        self.quotes += line.count('"')
+        if self.quotes % 2:
+            return
+        self.pending.lines.append(self.record)
+        self.record = ""
+        self.quotes = 0
+        yield from self._rows()
+
+    def _rows(self) -> Iterator[dict]:
+        for row in self.reader:
+            if not any(field.strip() for field in row):
+                continue
+            if self.header is None:
+                self.header = [h.strip().lower() for h in row]
+                continue
+            yield dict(zip(self.header, row))
+
+
+def format_from_filename(filename: str | None) -> str:
+    suffix = (filename or "").rsplit(".", 1)[-1].lower()
+    return "ndjson" if suffix in ("ndjson", "jsonl", "json") else "csv"
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[dict]:
+    parser = RecordParser(fmt)
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.finish()
+
+
+async def aiter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[dict]:
+    parser = RecordParser(fmt)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    async for chunk in chunks:
+        for record in parser.feed(decoder.decode(chunk)):
+            yield record
+    for record in parser.feed(decoder.decode(b"", final=True)):
+        yield record
+    for record in parser.finish():
+        yield record
+
+
+async def _copy_snapshots(db: AsyncSession, records: list[tuple]) -> None:
+    conn = await db.connection()
+    if conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            ChannelStatsSnapshot.__tablename__,
+            records=records,
+            columns=SNAPSHOT_COLUMNS,
+        )
+        return
+    await db.execute(insert(ChannelStatsSnapshot), [dict(zip(SNAPSHOT_COLUMNS, r)) for r in records])
+
+
+async def write_aggregate(db: AsyncSession, channel_id: int, agg: StatsAggregator) -> int:
+    if not agg.rows:
+        return 0
+    await heatmap.apply_cells(db, channel_id, agg.cells)
+    await rollups.apply_days(db, channel_id, {day: tuple(bucket) for day, bucket in agg.days.items()})
+    records = agg.snapshot_records(channel_id)
+    await _copy_snapshots(db, records)
+    return len(records)
+
+
+async def import_records(db: AsyncSession, channel_id: int, records) -> ImportReport:
+    started = time.monotonic()
+    agg = StatsAggregator()
+    if hasattr(records, "__aiter__"):
+        async for record in records:
+            agg.add(record)
+    else:
+        for record in records:
+            agg.add(record)
+    written = await write_aggregate(db, channel_id, agg)
+    seconds = time.monotonic() - started
+    return ImportReport(agg.rows, agg.skipped, written, seconds, agg.rows / seconds if seconds else 0.0)
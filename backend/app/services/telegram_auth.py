@@ -1,8 +1,18 @@
 import hashlib
 import hmac
+from functools import lru_cache
 from app.config import settings
 
 
+@lru_cache(maxsize=4)
+def _secret_for(bot_token: str) -> bytes:
+    return hashlib.sha256(bot_token.encode()).digest()
+
+
+def bot_secret() -> bytes:
+    return _secret_for(settings.telegram_bot_token)
+
+
 def verify_telegram_auth(auth_data: dict) -> bool:
     check_hash = auth_data.get("hash")
     if not check_hash:
@@ -11,8 +21,7 @@ def verify_telegram_auth(auth_data: dict) -> bool:
     data_check_string = "\n".join(
         f"{k}={auth_data_str[k]}" for k in sorted(auth_data_str)
     )
-    secret_key = hashlib.sha256(settings.telegram_bot_token.encode()).digest()
     calculated = hmac.new(
-        secret_key, data_check_string.encode(), hashlib.sha256
+        bot_secret(), data_check_string.encode(), hashlib.sha256
     ).hexdigest()
     return hmac.compare_digest(calculated, check_hash)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+from app.services.cache import TTLCache, redis_client, redis_delete, redis_get_json, redis_publish, redis_set_json
+
+INVALIDATING_FIELDS = ("tariff", "content_generations_used_this_week", "content_week_reset_at")
+_DATETIME_FIELDS = ("content_week_reset_at", "created_at", "updated_at")
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+log = logging.getLogger(__name__)
+
+_local = TTLCache(settings.user_cache_max_size, settings.user_cache_ttl_seconds)
+_pending_tasks: set[asyncio.Task] = set()
+_listener: asyncio.Task | None = None
+
+
+class UserIdentity(NamedTuple):
+    id: int
+    tariff: str
+
+
+def _redis_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _to_dict(user: User) -> dict:
+    return {c.key: getattr(user, c.key) for c in User.__table__.columns}
+
+
+def to_user(data: dict) -> User:
+    fields = dict(data)
+    for name in _DATETIME_FIELDS:
+        if isinstance(fields.get(name), str):
+            fields[name] = datetime.fromisoformat(fields[name])
+    return User(**fields)
+
+
+async def get_user_data(user_id: int) -> dict | None:
+    data = _local.get(user_id)
+    if data is not None:
+        return data
+    data = await redis_get_json(_redis_key(user_id))
+    if data is not None:
+        _local.set(user_id, data)
+    return data
+
+
+async def store_user(user: User) -> dict:
+    data = _to_dict(user)
+    _local.set(user.id, data)
+    await redis_set_json(_redis_key(user.id), data, settings.user_cache_redis_ttl_seconds)
+    return data
+
+
+async def recently_active(user_ids) -> set[int]:
+    user_ids = list(user_ids)
+    client = redis_client()
+    if client is None or not user_ids:
+        return set()
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.exists(_redis_key(user_id))
+            found = await pipe.execute()
+    except Exception:
+        return set()
+    return {user_id for user_id, hit in zip(user_ids, found) if hit}
+
+
+async def _invalidate_shared(user_ids) -> None:
+    await redis_delete(*(_redis_key(i) for i in user_ids))
+    await redis_publish(INVALIDATION_CHANNEL, ",".join(str(i) for i in user_ids))
+
+
+async def invalidate_user(user_id: int) -> None:
+    _local.pop(user_id)
+    await _invalidate_shared([user_id])
+
+
+def drop_local(message: bytes | str) -> None:
+    if isinstance(message, bytes):
+        message = message.decode()
+    for part in message.split(","):
+        if part.isdigit():
+            _local.pop(int(part))
+
+
+async def _listen() -> None:
+    while True:
+        try:
+            async with redis_client().pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                _local.clear()
+                while True:
+                    message = await pubsub.get_message(timeout=settings.user_cache_listen_timeout_seconds)
+                    if message is not None:
+                        drop_local(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.warning("user cache invalidation channel lost, resubscribing", exc_info=True)
+        _local.clear()
+        await asyncio.sleep(settings.user_cache_listen_timeout_seconds)
+
+
+def start_listener() -> None:
+    global _listener
+    if redis_client() is None or _listener is not None:
+        return
+    _listener = asyncio.get_running_loop().create_task(_listen())
+
+
+async def stop_listener() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.cancel()
+    try:
+        await _listener
+    except asyncio.CancelledError:
+        pass
+    _listener = None
+
+
+def _schedule_invalidation(user_ids: set[int]) -> None:
+    for user_id in user_ids:
+        _local.pop(user_id)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_invalidate_shared(user_ids))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("user_cache_invalidate", set())
+    for obj in session.dirty:
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[name].history.has_changes() for name in INVALIDATING_FIELDS):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    changed = session.info.pop("user_cache_invalidate", None)
+    if changed:
+        _schedule_invalidation(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("user_cache_invalidate", None)
@@ -0,0 +1,123 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+    sa.Column('username', sa.String(length=255), nullable=True),
+    sa.Column('first_name', sa.String(length=255), nullable=True),
+    sa.Column('last_name', sa.String(length=255), nullable=True),
+    sa.Column('tariff', sa.String(length=32), nullable=False),
+    sa.Column('content_generations_used_this_week', sa.Integer(), nullable=False),
+    sa.Column('content_week_reset_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_telegram_id'), 'users', ['telegram_id'], unique=True)
+    op.create_table('channels',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('telegram_channel_id', sa.BigInteger(), nullable=False),
+    sa.Column('username', sa.String(length=255), nullable=True),
+    sa.Column('title', sa.String(length=512), nullable=True),
+    sa.Column('subscribers_count', sa.Integer(), nullable=True),
+    sa.Column('raw_metadata', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_channels_telegram_channel_id'), 'channels', ['telegram_channel_id'], unique=True)
+    op.create_table('subscriptions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tariff', sa.String(length=32), nullable=False),
+    sa.Column('period_ends_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('channel_stats_snapshots',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('channel_id', sa.Integer(), nullable=False),
+    sa.Column('period_type', sa.String(), nullable=False),
+    sa.Column('period_value', sa.Integer(), nullable=False),
+    sa.Column('day_of_week', sa.Integer(), nullable=True),
+    sa.Column('posts_count', sa.Integer(), nullable=False),
+    sa.Column('total_views', sa.Integer(), nullable=False),
+    sa.Column('total_reactions', sa.Integer(), nullable=False),
+    sa.Column('subscribers_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('competitors',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('channel_id', sa.Integer(), nullable=False),
+    sa.Column('telegram_username', sa.String(length=255), nullable=True),
+    sa.Column('telegram_channel_id', sa.BigInteger(), nullable=True),
+    sa.Column('title', sa.String(length=512), nullable=True),
+    sa.Column('subscribers_count', sa.Integer(), nullable=True),
+    sa.Column('er_estimate', sa.Float(), nullable=True),
+    sa.Column('raw_metadata', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('negotiation_requests',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('from_user_id', sa.Integer(), nullable=False),
+    sa.Column('from_channel_id', sa.Integer(), nullable=False),
+    sa.Column('to_channel_username', sa.String(length=255), nullable=False),
+    sa.Column('proposed_text', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('to_user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['from_channel_id'], ['channels.id'], ),
+    sa.ForeignKeyConstraint(['from_user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['to_user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('competitor_ad_activities',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('competitor_id', sa.Integer(), nullable=False),
+    sa.Column('detected_at', sa.DateTime(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('post_url', sa.String(length=512), nullable=True),
+    sa.ForeignKeyConstraint(['competitor_id'], ['competitors.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('competitor_ad_activities')
+    op.drop_table('negotiation_requests')
+    op.drop_table('competitors')
+    op.drop_table('channel_stats_snapshots')
+    op.drop_table('subscriptions')
+    op.drop_index(op.f('ix_channels_telegram_channel_id'), table_name='channels')
+    op.drop_table('channels')
+    op.drop_index(op.f('ix_users_telegram_id'), table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,170 @@
+"""analytics, catalog and keyset schema
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+Databases created by the old create_all() startup hook may already hold
+some of these objects, so every step checks the reflected schema first.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _has_table(table: str) -> bool:
+    return _inspector().has_table(table)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c['name'] for c in _inspector().get_columns(table)}
+
+
+def _has_unique(table: str, name: str) -> bool:
+    return name in {c['name'] for c in _inspector().get_unique_constraints(table)}
+
+
+def _create_index(name: str, table: str, columns: list, **kw) -> None:
+    op.create_index(name, table, columns, if_not_exists=True, **kw)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    if not _has_table('audience_sketches'):
+        op.create_table('audience_sketches',
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+        sa.Column('hll', sa.LargeBinary(), nullable=False),
+        sa.Column('minhash', sa.LargeBinary(), nullable=False),
+        sa.Column('members_ingested', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('kind', 'ref_id')
+        )
+    if not _has_table('channel_catalog'):
+        op.create_table('channel_catalog',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('telegram_channel_id', sa.BigInteger(), nullable=True),
+        sa.Column('title', sa.String(length=512), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('subscribers_count', sa.Integer(), nullable=True),
+        sa.Column('er_estimate', sa.Float(), nullable=True),
+        sa.Column('source', sa.String(length=32), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('search_text', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+        )
+    _create_index('ix_channel_catalog_search_trgm', 'channel_catalog', ['search_text'], unique=False, postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    _create_index(op.f('ix_channel_catalog_telegram_channel_id'), 'channel_catalog', ['telegram_channel_id'], unique=False)
+    _create_index(op.f('ix_channel_catalog_updated_at'), 'channel_catalog', ['updated_at'], unique=False)
+    _create_index('ix_channel_catalog_username_prefix', 'channel_catalog', ['username'], unique=False, postgresql_ops={'username': 'text_pattern_ops'})
+
+    if not _has_column('channels', 'competitors_version'):
+        op.add_column('channels', sa.Column('competitors_version', sa.Integer(), server_default='0', nullable=False))
+    _create_index('ix_channels_owner_created', 'channels', ['owner_id', 'created_at', 'id'], unique=False)
+    _create_index('ix_channels_username_lower', 'channels', [sa.text('lower(username)')], unique=False)
+
+    if not _has_table('usage_counters'):
+        op.create_table('usage_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('resource', sa.String(length=32), nullable=False),
+        sa.Column('used', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'resource')
+        )
+    if not _has_table('channel_daily_rollups'):
+        op.create_table('channel_daily_rollups',
+        sa.Column('channel_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('posts_count', sa.Integer(), nullable=False),
+        sa.Column('total_views', sa.BigInteger(), nullable=False),
+        sa.Column('total_reactions', sa.BigInteger(), nullable=False),
+        sa.Column('subscribers_count', sa.Integer(), nullable=True),
+        sa.Column('running_posts', sa.BigInteger(), nullable=False),
+        sa.Column('running_views', sa.BigInteger(), nullable=False),
+        sa.Column('running_reactions', sa.BigInteger(), nullable=False),
+        sa.Column('last_subscribers_count', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ),
+        sa.PrimaryKeyConstraint('channel_id', 'day')
+        )
+    if not _has_table('channel_heatmaps'):
+        op.create_table('channel_heatmaps',
+        sa.Column('channel_id', sa.Integer(), nullable=False),
+        sa.Column('posts', sa.JSON(), nullable=False),
+        sa.Column('views', sa.JSON(), nullable=False),
+        sa.Column('reactions', sa.JSON(), nullable=False),
+        sa.Column('best_slots', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ),
+        sa.PrimaryKeyConstraint('channel_id')
+        )
+    if not _has_table('channel_psychographics'):
+        op.create_table('channel_psychographics',
+        sa.Column('channel_id', sa.Integer(), nullable=False),
+        sa.Column('emotion_counts', sa.JSON(), nullable=False),
+        sa.Column('type_counts', sa.JSON(), nullable=False),
+        sa.Column('comments_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['channel_id'], ['channels.id'], ),
+        sa.PrimaryKeyConstraint('channel_id')
+        )
+
+    _create_index('ix_channel_stats_snapshots_channel_period', 'channel_stats_snapshots', ['channel_id', 'period_type', 'period_value'], unique=False)
+    _create_index('ix_competitors_channel_created', 'competitors', ['channel_id', 'created_at', 'id'], unique=False)
+    _create_index('ix_competitors_owner_created', 'competitors', ['owner_id', 'created_at', 'id'], unique=False)
+    _create_index('ix_negotiation_requests_from_user_created', 'negotiation_requests', ['from_user_id', 'created_at', 'id'], unique=False)
+    _create_index('ix_negotiation_requests_to_user_created', 'negotiation_requests', ['to_user_id', 'created_at', 'id'], unique=False)
+    _create_index('ix_negotiation_requests_to_username_lower', 'negotiation_requests', [sa.text('lower(to_channel_username)')], unique=False)
+
+    if not _has_column('competitor_ad_activities', 'fingerprint'):
+        with op.batch_alter_table('competitor_ad_activities') as batch_op:
+            batch_op.add_column(sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    if not _has_unique('competitor_ad_activities', 'uq_competitor_ad_activities_fingerprint'):
+        with op.batch_alter_table('competitor_ad_activities') as batch_op:
+            batch_op.create_unique_constraint('uq_competitor_ad_activities_fingerprint', ['competitor_id', 'fingerprint'])
+    _create_index('ix_competitor_ad_activities_competitor_detected', 'competitor_ad_activities', ['competitor_id', 'detected_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_competitor_ad_activities_competitor_detected', table_name='competitor_ad_activities')
+    with op.batch_alter_table('competitor_ad_activities') as batch_op:
+        batch_op.drop_constraint('uq_competitor_ad_activities_fingerprint', type_='unique')
+        batch_op.drop_column('fingerprint')
+    op.drop_index('ix_negotiation_requests_to_username_lower', table_name='negotiation_requests')
+    op.drop_index('ix_negotiation_requests_to_user_created', table_name='negotiation_requests')
+    op.drop_index('ix_negotiation_requests_from_user_created', table_name='negotiation_requests')
+    op.drop_index('ix_competitors_owner_created', table_name='competitors')
+    op.drop_index('ix_competitors_channel_created', table_name='competitors')
+    op.drop_index('ix_channel_stats_snapshots_channel_period', table_name='channel_stats_snapshots')
+    op.drop_table('channel_psychographics')
+    op.drop_table('channel_heatmaps')
+    op.drop_table('channel_daily_rollups')
+    op.drop_table('usage_counters')
+    op.drop_index('ix_channels_username_lower', table_name='channels')
+    op.drop_index('ix_channels_owner_created', table_name='channels')
+    with op.batch_alter_table('channels') as batch_op:
+        batch_op.drop_column('competitors_version')
+    op.drop_index('ix_channel_catalog_username_prefix', table_name='channel_catalog', postgresql_ops={'username': 'text_pattern_ops'})
+    op.drop_index(op.f('ix_channel_catalog_updated_at'), table_name='channel_catalog')
+    op.drop_index(op.f('ix_channel_catalog_telegram_channel_id'), table_name='channel_catalog')
+    op.drop_index('ix_channel_catalog_search_trgm', table_name='channel_catalog', postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+    op.drop_table('channel_catalog')
+    op.drop_table('audience_sketches')
@@ -0,0 +1,33 @@
+"""normalize channel usernames
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE channels SET username = NULLIF(ltrim(trim(username), '@'), '') "
+        "WHERE username <> ltrim(trim(username), '@')"
+    )
+    op.execute(
+        "UPDATE negotiation_requests SET to_user_id = ("
+        "SELECT channels.owner_id FROM channels "
+        "WHERE lower(channels.username) = lower(negotiation_requests.to_channel_username) LIMIT 1"
+        ") WHERE to_user_id IS NULL"
+    )
+
+
+def downgrade() -> None:
+    pass
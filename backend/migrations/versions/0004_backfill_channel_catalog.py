@@ -0,0 +1,105 @@
+"""backfill channel catalog from channels and competitors
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+channels = sa.table(
+    'channels',
+    sa.column('owner_id', sa.Integer),
+    sa.column('telegram_channel_id', sa.BigInteger),
+    sa.column('username', sa.String),
+    sa.column('title', sa.String),
+    sa.column('subscribers_count', sa.Integer),
+)
+competitors = sa.table(
+    'competitors',
+    sa.column('telegram_username', sa.String),
+    sa.column('title', sa.String),
+    sa.column('subscribers_count', sa.Integer),
+    sa.column('er_estimate', sa.Float),
+)
+catalog = sa.table(
+    'channel_catalog',
+    sa.column('username', sa.String),
+    sa.column('telegram_channel_id', sa.BigInteger),
+    sa.column('title', sa.String),
+    sa.column('subscribers_count', sa.Integer),
+    sa.column('er_estimate', sa.Float),
+    sa.column('source', sa.String),
+    sa.column('owner_id', sa.Integer),
+    sa.column('search_text', sa.Text),
+    sa.column('created_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def _normalize(username):
+    if not username:
+        return None
+    return username.strip().lstrip('@').lower() or None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    known_usernames = {u for (u,) in bind.execute(sa.select(catalog.c.username)) if u}
+    known_ids = {i for (i,) in bind.execute(sa.select(catalog.c.telegram_channel_id)) if i is not None}
+    now = datetime.utcnow()
+    entries = {}
+    for owner_id, telegram_channel_id, username, title, subscribers in bind.execute(sa.select(channels)):
+        username = _normalize(username)
+        key = username or telegram_channel_id
+        if username in known_usernames or (not username and telegram_channel_id in known_ids):
+            continue
+        entries[key] = {
+            'username': username,
+            'telegram_channel_id': telegram_channel_id,
+            'title': title,
+            'subscribers_count': subscribers,
+            'er_estimate': None,
+            'source': 'owned',
+            'owner_id': owner_id,
+        }
+    for username, title, subscribers, er in bind.execute(sa.select(competitors)):
+        username = _normalize(username)
+        if not username or username in known_usernames or username in entries:
+            continue
+        entries[username] = {
+            'username': username,
+            'telegram_channel_id': None,
+            'title': title,
+            'subscribers_count': subscribers,
+            'er_estimate': er,
+            'source': 'competitor',
+            'owner_id': None,
+        }
+    rows = [
+        {
+            **e,
+            'search_text': ' '.join(p for p in (e['username'], e['title']) if p).lower(),
+            'created_at': now,
+            'updated_at': now,
+        }
+        for e in entries.values()
+    ]
+    for i in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(catalog, rows[i:i + BATCH_SIZE])
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,87 @@
+"""backfill channel heatmaps from heatmap snapshots
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from datetime import datetime
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.heatmap import CELLS, best_slots, cell_index
+
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+snapshots = sa.table(
+    'channel_stats_snapshots',
+    sa.column('channel_id', sa.Integer),
+    sa.column('period_type', sa.String),
+    sa.column('period_value', sa.Integer),
+    sa.column('day_of_week', sa.Integer),
+    sa.column('posts_count', sa.Integer),
+    sa.column('total_views', sa.BigInteger),
+    sa.column('total_reactions', sa.BigInteger),
+)
+heatmaps = sa.table(
+    'channel_heatmaps',
+    sa.column('channel_id', sa.Integer),
+    sa.column('posts', sa.JSON),
+    sa.column('views', sa.JSON),
+    sa.column('reactions', sa.JSON),
+    sa.column('best_slots', sa.JSON),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    s = snapshots.c
+    result = bind.execute(
+        sa.select(
+            s.channel_id,
+            s.period_value,
+            s.day_of_week,
+            sa.func.sum(s.posts_count),
+            sa.func.sum(s.total_views),
+            sa.func.sum(s.total_reactions),
+        )
+        .where(s.period_type == 'heatmap', s.channel_id.not_in(sa.select(heatmaps.c.channel_id)))
+        .group_by(s.channel_id, s.period_value, s.day_of_week)
+        .order_by(s.channel_id)
+    ).all()
+    now = datetime.utcnow()
+    batch = []
+    for channel_id, cells in groupby(result, key=lambda row: row[0]):
+        posts, views, reactions = [0] * CELLS, [0] * CELLS, [0] * CELLS
+        for _, hour_utc, day_of_week, p, v, r in cells:
+            i = cell_index(hour_utc, day_of_week or 0)
+            posts[i] += p or 0
+            views[i] += v or 0
+            reactions[i] += r or 0
+        batch.append({
+            'channel_id': channel_id,
+            'posts': posts,
+            'views': views,
+            'reactions': reactions,
+            'best_slots': best_slots(posts, views, reactions),
+            'updated_at': now,
+        })
+        if len(batch) >= BATCH_SIZE:
+            op.bulk_insert(heatmaps, batch)
+            batch = []
+    if batch:
+        op.bulk_insert(heatmaps, batch)
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="growthkit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["REDIS_URL"] = ""
+os.environ["SIMILARITY_INDEX_DIR"] = os.path.join(_db_dir, "similarity")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import models  # noqa: F401
+from app.database import Base, async_session, engine, read_engine
+from app.main import app
+from app.models import User
+from app.services import benchmark, user_cache
+from app.services.auth import create_access_token
+
+
+class Api:
+    def __init__(self, client: TestClient):
+        self.client = client
+
+    def run(self, fn, *args):
+        return self.client.portal.call(fn, *args)
+
+    def user(self, telegram_id: int, tariff: str = "strategist") -> dict:
+        async def create():
+            async with async_session() as db:
+                user = User(telegram_id=telegram_id, tariff=tariff)
+                db.add(user)
+                await db.commit()
+                return user.id
+
+        user_id = self.run(create)
+        return {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+
+
+def _distinct_engines():
+    if read_engine.sync_engine.pool is engine.sync_engine.pool:
+        return [engine]
+    return [engine, read_engine]
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        for e in _distinct_engines():
+            event.listen(e.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        for e in _distinct_engines():
+            event.remove(e.sync_engine, "before_cursor_execute", self)
+
+
+@pytest.fixture
+def api():
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def dispose():
+        for e in _distinct_engines():
+            await e.dispose()
+
+    user_cache._local.clear()
+    benchmark._local.clear()
+    with TestClient(app) as client:
+        api = Api(client)
+        api.run(reset)
+        yield api
+        api.run(dispose)
+
+
+@pytest.fixture
+def statements():
+    return StatementCounter()
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.services import ad_detector
+
+
+def _classify(text: str) -> str | None:
+    return ad_detector.classify(ad_detector.Post(1, text, channel_username="own_channel"))
+
+
+@pytest.mark.parametrize("text", [
+    "Реклама. ERID: 2VtzqwX",
+    "https://example.com/?erid=LjN8K",
+    "Партнёрский материал erid 2Vtzqx",
+])
+def test_erid_token_is_strong(text):
+    assert "erid" in _classify(text)
+
+
+@pytest.mark.parametrize("text", [
+    "Sunrise over the Meridian",
+    "Sheridan Smith joins the cast",
+    "Peridot is the birthstone of August",
+])
+def test_erid_inside_words_is_ignored(text):
+    assert _classify(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "Рекламация принята, товар заменим",
+    "Это нерекламный пост, просто мысли",
+    "Скидкаметр показывает цены за неделю",
+    "Sponsoredness is not a word",
+])
+def test_word_markers_inside_longer_words_are_ignored(text):
+    assert _classify(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "#реклама Лучший курс по кофе",
+    "Держите промокодом KOFE10 и скидку у @coffee_shop_bar",
+])
+def test_word_markers_match_as_whole_words(text):
+    assert _classify(text) is not None
+
+
+def test_stream_retries_posts_whose_write_failed(api, monkeypatch):
+    post = ad_detector.Post(1, "Реклама. erid 2VtzqwX", "https://t.me/c/1")
+    calls = []
+    real_write = ad_detector.write
+
+    async def flaky_write(db, detections):
+        calls.append(len(detections))
+        if len(calls) == 1:
+            raise ConnectionError("db down")
+        return await real_write(db, detections)
+
+    monkeypatch.setattr(ad_detector, "write", flaky_write)
+
+    async def scenario():
+        stream = ad_detector.AdStream(batch_size=1)
+        runner = asyncio.create_task(stream.run())
+        for _ in range(3):
+            await stream.submit(post)
+        await stream.close()
+        return await runner
+
+    stats = api.run(scenario)
+    assert calls == [1, 1]
+    assert stats["written"] == 1
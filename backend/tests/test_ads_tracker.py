@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.database import async_session, engine
+from app.models import Channel, Competitor, CompetitorAdActivity
+
+START = datetime(2026, 1, 1)
+
+
+async def _seed() -> int:
+    async with async_session() as db:
+        channel = Channel(owner_id=1, telegram_channel_id=-100)
+        db.add(channel)
+        await db.flush()
+        competitors = [Competitor(owner_id=1, channel_id=channel.id, telegram_username=f"c{i}") for i in range(3)]
+        db.add_all(competitors)
+        await db.flush()
+        for n in range(12):
+            db.add(CompetitorAdActivity(
+                competitor_id=competitors[n % 3].id,
+                detected_at=START + timedelta(hours=n),
+                description=f"ad {n}",
+            ))
+        await db.commit()
+        return channel.id
+
+
+def test_ads_tracker_merges_competitor_pages_in_order(api):
+    headers = api.user(1)
+    channel_id = api.run(_seed)
+    seen, cursor = [], None
+    while True:
+        params = {"channel_id": channel_id, "page_size": 5}
+        if cursor:
+            params["cursor"] = cursor
+        body = api.client.get("/api/v1/competitors/ads-tracker", params=params, headers=headers).json()
+        seen.extend(a["description"] for a in body["activities"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [f"ad {n}" for n in range(11, -1, -1)]
+
+
+def test_ads_tracker_walks_the_competitor_index(api):
+    headers = api.user(1)
+    channel_id = api.run(_seed)
+    executed = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "competitor_ad_activities" in statement:
+            executed.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        resp = api.client.get("/api/v1/competitors/ads-tracker", params={"channel_id": channel_id}, headers=headers)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    assert resp.status_code == 200, resp.text
+    [(statement, parameters)] = executed
+
+    async def plan():
+        async with engine.connect() as conn:
+            rows = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[-1] for row in rows]
+
+    detail = api.run(plan)
+    assert sum("USING INDEX ix_competitor_ad_activities_competitor_detected" in d for d in detail) == 3
+    assert not any(d.startswith("SCAN competitor_ad_activities") for d in detail)
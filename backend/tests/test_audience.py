@@ -0,0 +1,26 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models import AudienceSketch
+from app.services import audience
+
+
+def test_concurrent_first_ingests_merge_into_one_sketch(api):
+    async def ingest(member_ids):
+        async with async_session() as db:
+            await audience.ingest(db, "channel", 7, member_ids)
+            await db.commit()
+
+    async def scenario():
+        await asyncio.gather(ingest(range(0, 3000)), ingest(range(2000, 5000)))
+        async with async_session() as db:
+            rows = (await db.execute(select(AudienceSketch))).scalars().all()
+            sketches = await audience.load(db, [("channel", 7)])
+        return rows, sketches
+
+    rows, sketches = api.run(scenario)
+    assert [(r.kind, r.ref_id, r.members_ingested) for r in rows] == [("channel", 7, 6000)]
+    registers, _ = sketches[("channel", 7)]
+    assert abs(audience.cardinality(registers) - 5000) < 5000 * 0.05
@@ -0,0 +1,76 @@
+from app.services import auth as auth_tokens
+
+
+class BrokenRedis:
+    async def set(self, *args, **kwargs):
+        raise ConnectionError("redis down")
+
+
+class FakeRedis:
+    def __init__(self):
+        self.keys = {}
+        self.zset = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = (value, ex)
+        return True
+
+    async def zadd(self, key, mapping, nx=False):
+        self.zset.update(mapping)
+        return len(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        pass
+
+    async def zrangebyscore(self, key, low, high, withscores=False):
+        return list(self.zset.items())
+
+
+def _refresh(api, token: str):
+    return api.client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+
+
+def test_refresh_token_is_single_use(api):
+    token = auth_tokens.create_refresh_token({"sub": "1"})
+    first = _refresh(api, token)
+    assert first.status_code == 200
+    assert auth_tokens.verify_token(first.json()["access_token"])["sub"] == "1"
+    assert _refresh(api, token).status_code == 401
+
+
+def test_refresh_rejected_when_revocation_store_fails(api, monkeypatch):
+    monkeypatch.setattr(auth_tokens, "redis_client", lambda: BrokenRedis())
+    token = auth_tokens.create_refresh_token({"sub": "1"})
+    resp = _refresh(api, token)
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "5"
+    monkeypatch.setattr(auth_tokens, "redis_client", lambda: None)
+    assert _refresh(api, token).status_code == 200
+
+
+def test_refresh_consumption_stays_out_of_the_synced_revocation_set(api, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(auth_tokens, "redis_client", lambda: redis)
+    token = auth_tokens.create_refresh_token({"sub": "1"})
+    jti = auth_tokens.verify_token(token, auth_tokens.REFRESH)["jti"]
+
+    first = _refresh(api, token)
+    assert first.status_code == 200
+    value, ttl = redis.keys[auth_tokens.CONSUMED_PREFIX + jti]
+    assert 0 < ttl <= auth_tokens.settings.refresh_token_ttl_days * 86400 + 1
+    assert redis.zset == {}
+
+    auth_tokens._consumed.clear()
+    assert _refresh(api, token).status_code == 401
+
+    access, refresh_token = first.json()["access_token"], first.json()["refresh_token"]
+    resp = api.client.post(
+        "/api/v1/auth/logout",
+        json={"refresh_token": refresh_token},
+        headers={"Authorization": f"Bearer {access}"},
+    )
+    assert resp.status_code == 204
+    assert list(redis.zset) == [auth_tokens.verify_token(access)["jti"]]
+    assert _refresh(api, refresh_token).status_code == 401
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.database import async_session
+from app.models import Channel, Competitor
+
+
+async def _seed() -> int:
+    async with async_session() as db:
+        channel = Channel(owner_id=1, telegram_channel_id=-100, subscribers_count=300)
+        db.add(channel)
+        await db.flush()
+        db.add_all(
+            Competitor(owner_id=1, channel_id=channel.id, telegram_username=f"c{i}", subscribers_count=subs, er_estimate=er)
+            for i, (subs, er) in enumerate(((100, 0.01), (200, 0.02), (400, 0.03), (800, None)))
+        )
+        await db.commit()
+        return channel.id
+
+
+def _benchmark(api, headers, channel_id):
+    resp = api.client.get("/api/v1/competitors/benchmark", params={"channel_id": channel_id}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_benchmark_reports_niche_quantiles(api):
+    headers = api.user(1)
+    body = _benchmark(api, headers, api.run(_seed))
+    assert body["competitors_count"] == 4
+    assert body["your_subscribers"] == 300
+    assert body["niche_avg_subscribers"] == 375
+    assert (body["niche_p25_subscribers"], body["niche_median_subscribers"], body["niche_p75_subscribers"]) == (
+        175, 300, 500
+    )
+    assert body["your_subscribers_percentile"] == 0.5
+    assert body["niche_avg_er"] == pytest.approx(0.02)
+    assert body["niche_median_er"] == pytest.approx(0.02)
+    assert body["your_er_estimate"] == 0.0
+    assert body["your_er_percentile"] is None
+
+
+def test_benchmark_cache_follows_competitors_version(api):
+    headers = api.user(1)
+    channel_id = api.run(_seed)
+    assert _benchmark(api, headers, channel_id)["niche_avg_subscribers"] == 375
+
+    async def grow_competitors():
+        async with async_session() as db:
+            await db.execute(update(Competitor).values(subscribers_count=Competitor.subscribers_count * 2))
+            await db.commit()
+
+    api.run(grow_competitors)
+    assert _benchmark(api, headers, channel_id)["niche_avg_subscribers"] == 375
+
+    resp = api.client.post(
+        "/api/v1/competitors", json={"channel_id": channel_id, "telegram_username": "@c4"}, headers=headers
+    )
+    assert resp.status_code == 200, resp.text
+    body = _benchmark(api, headers, channel_id)
+    assert body["competitors_count"] == 5
+    assert body["niche_avg_subscribers"] == 750
+
+    async def version():
+        async with async_session() as db:
+            return await db.scalar(select(Channel.competitors_version).where(Channel.id == channel_id))
+
+    assert api.run(version) == 1
@@ -0,0 +1,60 @@
+import pytest
+
+from app.api.pagination import encode_cursor
+
+
+def _connect(api, headers, telegram_channel_id, username=None, title=None) -> int:
+    params = {"telegram_channel_id": telegram_channel_id, "title": title}
+    if username:
+        params["username"] = username
+    resp = api.client.post("/api/v1/channels/connect", params=params, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["channel_id"]
+
+
+def _search(api, headers, q):
+    resp = api.client.get("/api/v1/channels/search", params={"q": q}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["items"]
+
+
+def test_owned_public_channel_stays_searchable_for_others(api):
+    owner, other = api.user(1101), api.user(1102)
+    channel_id = _connect(api, owner, -4001, "@Barista_Notes", "Barista notes")
+    private_id = _connect(api, owner, -4002, None, "Barista private club")
+
+    mine = _search(api, owner, "barista")
+    assert {(i["id"], i["username"]) for i in mine} == {(channel_id, "barista_notes"), (private_id, None)}
+    assert all(i["catalog_id"] for i in mine)
+
+    theirs = _search(api, other, "barista")
+    assert [(i["id"], i["username"]) for i in theirs] == [(None, "barista_notes")]
+
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor(1.5),
+    encode_cursor(1.5, 3, 4),
+    encode_cursor("high", 3),
+    encode_cursor(1.5, "3"),
+    encode_cursor(1.5, 3.7),
+    encode_cursor(True, 3),
+    "not-base64!",
+])
+def test_malformed_search_cursor_is_rejected(api, cursor):
+    headers = api.user(1101)
+    _connect(api, headers, -4001, "barista_notes", "Barista notes")
+    resp = api.client.get("/api/v1/channels/search", params={"q": "barista", "cursor": cursor}, headers=headers)
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Invalid cursor"
+
+
+def test_search_cursor_pages_forward(api):
+    headers = api.user(1101)
+    for n in range(3):
+        _connect(api, headers, -4001 - n, f"barista_{n}", f"Barista {n}")
+    first = api.client.get("/api/v1/channels/search", params={"q": "barista", "limit": 2}, headers=headers).json()
+    second = api.client.get(
+        "/api/v1/channels/search", params={"q": "barista", "limit": 2, "cursor": first["next_cursor"]}, headers=headers
+    ).json()
+    assert len(first["items"]) == 2 and len(second["items"]) == 1
+    assert second["next_cursor"] is None
@@ -0,0 +1,80 @@
+import httpx
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models import Channel, Competitor, User
+from app.services import competitor_refresh
+
+
+class FakeTGStat:
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/channels/stat"
+        assert request.url.params["token"] == "secret"
+        username = request.url.params["channelId"].lstrip("@")
+        self.calls[username] = self.calls.get(username, 0) + 1
+        if username == "coffee_news":
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200,
+                json={"status": "ok", "response": {"participants_count": 1200, "er_percent": 4.5}},
+                headers={"ETag": '"v1"'},
+            )
+        if username == "busy_channel":
+            return httpx.Response(429, headers={"Retry-After": "0.01"})
+        return httpx.Response(404)
+
+
+def _source(server: FakeTGStat) -> competitor_refresh.TGStatSource:
+    source = competitor_refresh.TGStatSource("https://tgstat.test", "secret", 5)
+    source.client = httpx.AsyncClient(base_url=source.base_url, transport=httpx.MockTransport(server))
+    return source
+
+
+async def _seed():
+    async with async_session() as db:
+        user = User(telegram_id=801, tariff="agency")
+        db.add(user)
+        await db.flush()
+        channel = Channel(owner_id=user.id, telegram_channel_id=-2001, username="mine")
+        db.add(channel)
+        await db.flush()
+        db.add_all([
+            Competitor(owner_id=user.id, channel_id=channel.id, telegram_username=name)
+            for name in ("@Coffee_News", "busy_channel", "gone_channel")
+        ])
+        await db.commit()
+
+
+async def _cycle(source):
+    return await competitor_refresh.run_cycle(source, rate_per_second=1000, burst=100)
+
+
+async def _competitor(username: str) -> Competitor:
+    async with async_session() as db:
+        return await db.scalar(select(Competitor).where(Competitor.telegram_username == username))
+
+
+def test_refresh_cycle_against_fake_tgstat(api):
+    assert competitor_refresh.StatsSource.__abstractmethods__ == {"fetch"}
+    api.run(_seed)
+    server = FakeTGStat()
+    source = _source(server)
+    try:
+        report = api.run(_cycle, source)
+        assert (report.channels, report.updated, report.missing, report.deferred) == (3, 1, 1, 1)
+        assert server.calls["busy_channel"] == competitor_refresh.settings.competitor_refresh_max_retries + 1
+        refreshed = api.run(_competitor, "@Coffee_News")
+        assert refreshed.subscribers_count == 1200
+        assert refreshed.er_estimate == 0.045
+        assert refreshed.raw_metadata["etag"] == '"v1"'
+
+        report = api.run(_cycle, source)
+        assert (report.updated, report.not_modified) == (0, 1)
+        assert api.run(_competitor, "@Coffee_News").updated_at > refreshed.updated_at
+        assert competitor_refresh._buckets.keys() == {"tgstat.test"}
+    finally:
+        api.run(source.close)
@@ -0,0 +1,60 @@
+from sqlalchemy import select
+
+from app.api import content
+from app.database import async_session
+from app.models import User
+from app.services import content_generator, llm, quota
+
+
+async def _used(telegram_id: int) -> int:
+    async with async_session() as db:
+        return await db.scalar(select(User.content_generations_used_this_week).where(User.telegram_id == telegram_id))
+
+
+def test_stream_failure_after_first_token_emits_error(api, monkeypatch):
+    async def broken(prompt, **kwargs):
+        yield "Hello"
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(llm, "enabled", lambda: True)
+    monkeypatch.setattr(llm, "stream", broken)
+    headers = api.user(501)
+    resp = api.client.post("/api/v1/content/generate-post/stream", json={"topic": "coffee"}, headers=headers)
+    assert resp.status_code == 200
+    assert "event: delta" in resp.text
+    assert "event: error" in resp.text
+    assert "event: done" not in resp.text
+    assert api.run(_used, 501) == 0
+
+
+def test_reservation_refunded_when_stream_never_starts(api, monkeypatch):
+    monkeypatch.setattr(content_generator.llm, "enabled", lambda: False)
+    api.user(502)
+
+    async def abandon():
+        async with async_session() as db:
+            user_id = await db.scalar(select(User.id).where(User.telegram_id == 502))
+        identity = type("Identity", (), {"id": user_id})()
+        response = await content.generate_post_stream(content.GeneratePostInput(topic="tea"), identity)
+        used_before = await _used(502)
+        await response.background()
+        return used_before
+
+    assert api.run(abandon) == 1
+    assert api.run(_used, 502) == 0
+
+
+def test_bulk_reply_reports_unknown_user_per_pack(api, monkeypatch):
+    async def vanished(user_id, amount=1):
+        raise quota.UnknownUser()
+
+    monkeypatch.setattr(quota, "reserve", vanished)
+    headers = api.user(503)
+    resp = api.client.post(
+        "/api/v1/content/bulk-reply/stream",
+        json={"comments": ["great post", "nice"], "mode": "reputation"},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert 'event: error\ndata: {"indexes": [0, 1], "detail": "User not found"}' in resp.text
+    assert '"failed": 2' in resp.text
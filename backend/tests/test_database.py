@@ -0,0 +1,37 @@
+from sqlalchemy import select, update
+
+from app import database
+from app.database import async_session, read_session
+from app.models import User
+
+
+def test_reads_share_the_primary_pool_in_autocommit_without_a_replica():
+    assert database.read_engine.sync_engine.pool is database.engine.sync_engine.pool
+    assert database.read_engine.get_execution_options()["isolation_level"] == "AUTOCOMMIT"
+
+
+def test_read_session_does_not_hold_a_transaction(api):
+    api.user(1)
+
+    async def in_transaction(factory, stmt):
+        async with factory() as db:
+            await db.execute(stmt)
+            raw = await (await db.connection()).get_raw_connection()
+            return raw.driver_connection.in_transaction
+
+    assert not api.run(in_transaction, read_session, update(User).where(User.id == 1).values(username="reader"))
+    assert api.run(in_transaction, async_session, update(User).where(User.id == 1).values(username="writer"))
+
+    async def username():
+        async with async_session() as db:
+            return await db.scalar(select(User.username).where(User.id == 1))
+
+    assert api.run(username) == "reader"
+
+
+def test_replica_engine_skips_pre_ping_and_transactions():
+    options = database._engine_options("postgresql+asyncpg://u:p@replica/db", read_only=True)
+    assert options["isolation_level"] == "AUTOCOMMIT"
+    assert options["pool_pre_ping"] is False
+    assert options["connect_args"]["server_settings"] == {"default_transaction_read_only": "on"}
+    assert database._engine_options("postgresql+asyncpg://u:p@primary/db")["pool_pre_ping"] is True
@@ -0,0 +1,52 @@
+from app.database import async_session
+from app.models import Channel, ChannelStatsSnapshot, User
+from app.services import heatmap
+from app.services.auth import create_access_token
+
+
+async def _seed() -> int:
+    async with async_session() as db:
+        user = User(telegram_id=901)
+        db.add(user)
+        await db.flush()
+        channel = Channel(owner_id=user.id, telegram_channel_id=-3001)
+        db.add(channel)
+        await db.flush()
+        db.add(ChannelStatsSnapshot(
+            channel_id=channel.id, period_type="heatmap", period_value=10, day_of_week=2,
+            posts_count=2, total_views=200, total_reactions=6,
+        ))
+        await db.commit()
+        return channel.id
+
+
+async def _apply(channel_id: int, cells: dict) -> tuple:
+    async with async_session() as db:
+        agg = await heatmap.apply_cells(db, channel_id, cells)
+        await db.commit()
+        i = heatmap.cell_index(10, 2)
+        return agg.posts[i], agg.views[i], agg.reactions[i], sum(agg.posts)
+
+
+def test_apply_cells_seeds_missing_row_from_snapshots_once(api):
+    channel_id = api.run(_seed)
+    i = heatmap.cell_index(10, 2)
+    assert api.run(_apply, channel_id, {i: (1, 50, 1)}) == (3, 250, 7, 3)
+    assert api.run(_apply, channel_id, {i: (1, 50, 1), 0: (1, 10, 0)}) == (4, 300, 8, 5)
+
+
+def test_heatmap_read_uses_only_the_aggregate(api, statements):
+    channel_id = api.run(_seed)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "1"})}
+    url = f"/api/v1/analytics/channel/{channel_id}/heatmap"
+    with statements:
+        resp = api.client.get(url, headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert statements.count == 2
+    assert sum(c["posts_count"] for c in resp.json()["cells"]) == 0
+
+    i = heatmap.cell_index(10, 2)
+    api.run(_apply, channel_id, {i: (1, 50, 1)})
+    body = api.client.get(url, headers=headers).json()
+    assert body["cells"][i]["posts_count"] == 3
+    assert body["best_post_hour_utc"] == 10
@@ -0,0 +1,60 @@
+from sqlalchemy import delete, select, update
+
+from app.database import async_session
+from app.models import Channel, UsageCounter
+from app.services import limits
+
+
+def _connect(api, headers, telegram_channel_id):
+    return api.client.post(
+        "/api/v1/channels/connect",
+        params={"telegram_channel_id": telegram_channel_id},
+        headers=headers,
+    )
+
+
+def _counter(api, user_id):
+    async def used():
+        async with async_session() as db:
+            return await db.scalar(
+                select(UsageCounter.used).where(
+                    UsageCounter.user_id == user_id, UsageCounter.resource == limits.CHANNELS
+                )
+            )
+
+    return api.run(used)
+
+
+def test_denied_reservation_recounts_leaked_usage(api):
+    headers = api.user(1, tariff="creator")
+    assert _connect(api, headers, 100).status_code == 200
+
+    async def drop_channels():
+        async with async_session() as db:
+            await db.execute(delete(Channel).where(Channel.owner_id == 1))
+            await db.commit()
+
+    api.run(drop_channels)
+    assert _counter(api, 1) == 1
+    assert _connect(api, headers, 101).status_code == 200
+    assert _counter(api, 1) == 1
+    assert _connect(api, headers, 102).status_code == 403
+
+
+def test_resync_corrects_undercounted_usage(api):
+    headers = api.user(1, tariff="strategist")
+    for telegram_channel_id in (100, 101):
+        assert _connect(api, headers, telegram_channel_id).status_code == 200
+
+    async def undercount_and_resync():
+        async with async_session() as db:
+            await db.execute(update(UsageCounter).where(UsageCounter.user_id == 1).values(used=0))
+            await db.commit()
+        async with async_session() as db:
+            changed = await limits.resync(db, 1, limits.CHANNELS)
+            unchanged = await limits.resync(db, 1, limits.CHANNELS)
+            await db.commit()
+        return changed, unchanged
+
+    assert api.run(undercount_and_resync) == (True, False)
+    assert _counter(api, 1) == 2
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.config import settings
+from app.services import llm, llm_cache
+from app.services.cache import TTLCache
+
+
+def _fake_openai() -> FastAPI:
+    fake = FastAPI()
+
+    @fake.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        if prompt.startswith("slow"):
+            await asyncio.sleep(0.5)
+        if body.get("stream"):
+            async def events():
+                for word in ("Hello", ", ", "world"):
+                    chunk = {
+                        "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return JSONResponse({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"echo: {prompt}"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    return fake
+
+
+@pytest.fixture(scope="module")
+def fake_openai_url():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(_fake_openai(), log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+def openai(fake_openai_url, monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "openai_base_url", fake_openai_url)
+    monkeypatch.setattr(llm, "_client", None)
+
+
+def _run(coro_fn):
+    async def wrapper():
+        try:
+            return await coro_fn()
+        finally:
+            await llm.close_client()
+
+    return asyncio.run(wrapper())
+
+
+def test_completion_and_stream_against_fake_server(openai):
+    async def scenario():
+        text = await llm.complete("ping")
+        deltas = [d async for d in llm.stream("ping")]
+        return text, deltas
+
+    requests = llm.stats()["requests"]
+    text, deltas = _run(scenario)
+    assert text == "echo: ping"
+    assert deltas == ["Hello", ", ", "world"]
+    assert llm.stats()["requests"] == requests + 2
+    assert llm.stats()["in_flight"] == 0
+
+
+def test_queue_timeout_does_not_leak_slots(openai, monkeypatch):
+    monkeypatch.setattr(settings, "openai_queue_timeout_seconds", 0.05)
+
+    async def scenario():
+        semaphore = asyncio.Semaphore(1)
+        monkeypatch.setattr(llm, "_semaphore", semaphore)
+        holder = asyncio.create_task(llm.complete("slow ping"))
+        await asyncio.sleep(0.1)
+        with pytest.raises(llm.LLMBusy):
+            await llm.complete("ping")
+        waiter = asyncio.create_task(llm.complete("ping"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await holder == "echo: slow ping"
+        assert not semaphore.locked()
+        return await llm.complete("ping")
+
+    assert _run(scenario) == "echo: ping"
+    assert llm.stats()["queued"] == 0
+
+
+def test_metrics_requires_token(api, monkeypatch):
+    assert api.client.get("/metrics").status_code == 404
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+    assert api.client.get("/metrics").status_code == 401
+    assert api.client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    resp = api.client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert resp.status_code == 200
+    assert "llm" in resp.json()
+
+
+def test_cache_key_collapses_whitespace_but_keeps_case():
+    key = llm_cache.cache_key("Write  a post\nabout   NASA", "gpt-4o-mini", {"temperature": 0.7})
+    assert key == llm_cache.cache_key(" Write a post about NASA ", "gpt-4o-mini", {"temperature": 0.7})
+    assert key != llm_cache.cache_key("write a post about nasa", "gpt-4o-mini", {"temperature": 0.7})
+
+
+class CountingCompletion:
+    def __init__(self, fail_first=False):
+        self.calls = 0
+        self.fail_first = fail_first
+        self.release = asyncio.Event()
+
+    async def __call__(self, prompt, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError("upstream failed")
+        message = SimpleNamespace(content=f"reply to {prompt}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=SimpleNamespace(total_tokens=7))
+
+
+@pytest.fixture
+def stub_completion(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_local", TTLCache(100, 60))
+    monkeypatch.setattr(llm_cache, "_stats", dict.fromkeys(llm_cache._stats, 0))
+
+    def install(**kwargs):
+        completion = CountingCompletion(**kwargs)
+        monkeypatch.setattr(llm, "completion", completion)
+        return completion
+
+    return install
+
+
+def test_concurrent_identical_prompts_share_one_upstream_call(stub_completion):
+    completion = stub_completion()
+
+    async def scenario():
+        calls = [asyncio.ensure_future(llm_cache.complete("Write  about tea")) for _ in range(5)]
+        await asyncio.sleep(0)
+        completion.release.set()
+        texts = await asyncio.gather(*calls)
+        return texts, await llm_cache.complete("Write about tea")
+
+    texts, cached = asyncio.run(scenario())
+    assert texts == ["reply to Write  about tea"] * 5
+    assert cached == texts[0]
+    assert completion.calls == 1
+    stats = llm_cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits_local"]) == (1, 4, 1)
+
+
+def test_failed_leader_does_not_poison_followers(stub_completion):
+    completion = stub_completion(fail_first=True)
+
+    async def scenario():
+        leader = asyncio.ensure_future(llm_cache.complete("Write about tea"))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(llm_cache.complete("Write about tea"))
+        await asyncio.sleep(0)
+        completion.release.set()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        assert not llm_cache._inflight
+        return results, await llm_cache.complete("Write about tea")
+
+    results, retried = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retried == "reply to Write about tea"
+    assert completion.calls == 2
+    assert len(llm_cache._local) == 1
+
+
+def test_cancelled_leader_still_serves_followers(stub_completion):
+    completion = stub_completion()
+
+    async def scenario():
+        leader = asyncio.ensure_future(llm_cache.complete("Write about tea"))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(llm_cache.complete("Write about tea"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        completion.release.set()
+        return await follower, leader.cancelled()
+
+    assert asyncio.run(scenario()) == ("reply to Write about tea", True)
+    assert completion.calls == 1
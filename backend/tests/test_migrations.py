@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app import migrate
+from app.database import Base
+from app.services import heatmap
+
+
+def _diff(conn) -> list:
+    return compare_metadata(MigrationContext.configure(conn), Base.metadata)
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/migrate.db")
+    yield engine
+    engine.dispose()
+
+
+def test_fresh_database_matches_models(sync_engine):
+    with sync_engine.begin() as conn:
+        migrate._upgrade(conn, "head")
+    with sync_engine.connect() as conn:
+        assert _diff(conn) == []
+
+
+def test_pre_alembic_baseline_is_upgraded(sync_engine):
+    with sync_engine.begin() as conn:
+        migrate._upgrade(conn, migrate.BASELINE)
+        conn.execute(text("DROP TABLE alembic_version"))
+        conn.execute(text("INSERT INTO users (telegram_id, tariff, content_generations_used_this_week, created_at, updated_at) VALUES (1, 'creator', 0, '2024-01-01', '2024-01-01')"))
+        conn.execute(text("INSERT INTO channels (owner_id, telegram_channel_id, username, created_at, updated_at) VALUES (1, 10, ' @Foo', '2024-01-01', '2024-01-01')"))
+        conn.execute(text(
+            "INSERT INTO channel_stats_snapshots (channel_id, period_type, period_value, day_of_week, posts_count, total_views, total_reactions, created_at) "
+            "VALUES (1, 'heatmap', 10, 2, 2, 200, 6, '2024-01-01'), (1, 'heatmap', 10, 2, 1, 100, 0, '2024-01-02')"
+        ))
+    assert "channel_catalog" not in inspect(sync_engine).get_table_names()
+    with sync_engine.begin() as conn:
+        migrate._upgrade(conn, "head")
+    with sync_engine.connect() as conn:
+        assert _diff(conn) == []
+        assert conn.scalar(text("SELECT username FROM channels")) == "Foo"
+        assert conn.scalar(text("SELECT competitors_version FROM channels")) == 0
+        assert conn.execute(text("SELECT username, source, owner_id FROM channel_catalog")).all() == [("foo", "owned", 1)]
+        posts, best = conn.execute(text("SELECT posts, best_slots FROM channel_heatmaps WHERE channel_id = 1")).one()
+        assert json.loads(posts)[heatmap.cell_index(10, 2)] == 3
+        assert [(b["hour_utc"], b["day_of_week"]) for b in json.loads(best)] == [(10, 2)]
+
+
+def test_create_all_database_is_adopted(sync_engine):
+    Base.metadata.create_all(sync_engine)
+    with sync_engine.begin() as conn:
+        migrate._upgrade(conn, "head")
+    with sync_engine.connect() as conn:
+        assert conn.scalar(text("SELECT version_num FROM alembic_version")) == "0005"
+        assert _diff(conn) == []
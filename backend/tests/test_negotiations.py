@@ -0,0 +1,110 @@
+from sqlalchemy import select, text
+
+from app.api.pagination import keyset
+from app.database import async_session
+from app.models import NegotiationRequest
+from app.services import channel_search, negotiations
+
+
+def _connect(api, headers, telegram_channel_id, username):
+    r = api.client.post(
+        "/api/v1/channels/connect",
+        params={"telegram_channel_id": telegram_channel_id, "username": username},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["channel_id"]
+
+
+def _propose(api, headers, channel_id, to_username):
+    r = api.client.post(
+        "/api/v1/partners/negotiation",
+        json={"from_channel_id": channel_id, "to_channel_username": to_username},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+
+
+def _inbox(api, headers):
+    r = api.client.get("/api/v1/partners/negotiation", params={"direction": "received"}, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()["items"]
+
+
+def test_at_prefixed_channel_receives_requests(api):
+    owner = api.user(1)
+    sender = api.user(2)
+    sender_channel = _connect(api, sender, 200, "sender")
+    _propose(api, sender, sender_channel, "foo")
+    _connect(api, owner, 100, "@Foo")
+    _propose(api, sender, sender_channel, "@FOO")
+    assert [i["to_channel_username"] for i in _inbox(api, owner)] == ["FOO", "foo"]
+
+
+def test_received_inbox_query_count_is_constant(api, statements):
+    owner = api.user(1)
+    _connect(api, owner, 100, "target")
+    senders = []
+    for i in range(6):
+        headers = api.user(10 + i)
+        senders.append((headers, _connect(api, headers, 200 + i, f"sender{i}")))
+
+    _propose(api, *senders[0], "target")
+    _inbox(api, owner)
+    with statements:
+        assert len(_inbox(api, owner)) == 1
+    single = statements.count
+
+    for headers, channel_id in senders[1:]:
+        _propose(api, headers, channel_id, "@Target")
+    with statements:
+        items = _inbox(api, owner)
+    assert len(items) == 6
+    assert all(i["from_channel_title"] is None for i in items)
+    assert statements.count == single
+
+
+def test_portfolio_counts_requests_addressed_to_owner(api):
+    owner = api.user(1)
+    sender = api.user(2)
+    sender_channel = _connect(api, sender, 200, "sender")
+    _propose(api, sender, sender_channel, "foo")
+    foo = _connect(api, owner, 100, "@Foo")
+    _propose(api, sender, sender_channel, "@FOO")
+    bar = _connect(api, owner, 101, "bar")
+
+    r = api.client.get("/api/v1/analytics/portfolio", headers=owner)
+    assert r.status_code == 200, r.text
+    incoming = {c["id"]: c["pending_incoming"] for c in r.json()["channels"]}
+    assert incoming == {foo: 2, bar: 0}
+
+
+def test_received_inbox_pages_on_recipient_index(api):
+    async def plan():
+        stmt = keyset(
+            select(NegotiationRequest).where(negotiations.addressed_to(1)),
+            NegotiationRequest.created_at,
+            NegotiationRequest.id,
+            None,
+            20,
+        )
+        async with async_session() as db:
+            compiled = stmt.compile(db.bind, compile_kwargs={"literal_binds": True})
+            rows = await db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+            return " ".join(row[-1] for row in rows)
+
+    detail = api.run(plan)
+    assert "ix_negotiation_requests_to_user_created" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_blank_recipient_is_rejected(api):
+    sender = api.user(2)
+    sender_channel = _connect(api, sender, 200, "sender")
+    r = api.client.post(
+        "/api/v1/partners/negotiation",
+        json={"from_channel_id": sender_channel, "to_channel_username": " @ "},
+        headers=sender,
+    )
+    assert r.status_code == 400
+    assert negotiations.normalize_username is channel_search.normalize_username
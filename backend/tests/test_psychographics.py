@@ -0,0 +1,31 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models import ChannelPsychographics
+from app.services import psychographics
+
+
+def test_concurrent_first_ingests_share_one_counter_row(api):
+    headers = api.user(1)
+    resp = api.client.post("/api/v1/channels/connect", params={"telegram_channel_id": 100}, headers=headers)
+    channel_id = resp.json()["channel_id"]
+
+    async def ingest(comments):
+        async with async_session() as db:
+            await psychographics.ingest(db, channel_id, comments)
+            await db.commit()
+
+    async def scenario():
+        await asyncio.gather(
+            ingest(["Класс, люблю этот канал!"] * 30),
+            ingest(["Почему так дорого?"] * 20),
+        )
+        async with async_session() as db:
+            return (await db.execute(select(ChannelPsychographics))).scalars().all()
+
+    rows = api.run(scenario)
+    assert [(r.channel_id, r.comments_count) for r in rows] == [(channel_id, 50)]
+    assert sum(rows[0].emotion_counts.values()) == 50
+    assert sum(rows[0].type_counts.values()) == 50
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.database import async_session
+from app.models import User
+from app.services import quota
+
+
+def _user_id(api, telegram_id):
+    async def lookup():
+        async with async_session() as db:
+            return await db.scalar(select(User.id).where(User.telegram_id == telegram_id))
+
+    return api.run(lookup)
+
+
+def _used(api, user_id):
+    async def used():
+        async with async_session() as db:
+            return await db.scalar(select(User.content_generations_used_this_week).where(User.id == user_id))
+
+    return api.run(used)
+
+
+def test_concurrent_reservations_stop_at_weekly_limit(api):
+    api.user(601, tariff="creator")
+    user_id = _user_id(api, 601)
+    limit = quota.weekly_limit("creator")
+
+    async def burst():
+        return await asyncio.gather(*(quota.reserve(user_id) for _ in range(limit + 3)), return_exceptions=True)
+
+    results = api.run(burst)
+    assert sum(isinstance(r, quota.Reservation) for r in results) == limit
+    assert sum(isinstance(r, quota.QuotaExceeded) for r in results) == 3
+    assert _used(api, user_id) == limit
+
+
+def test_failed_generation_refunds_reservation(api):
+    api.user(602, tariff="creator")
+    user_id = _user_id(api, 602)
+
+    async def generate_and_fail():
+        reservation = await quota.reserve(user_id)
+        async with quota.settle(reservation):
+            raise RuntimeError("upstream failed")
+
+    with pytest.raises(RuntimeError):
+        api.run(generate_and_fail)
+    assert _used(api, user_id) == 0
+
+    async def generate():
+        async with quota.settle(await quota.reserve(user_id)) as reservation:
+            return reservation
+
+    assert api.run(generate).settled
+    assert _used(api, user_id) == 1
+
+
+def test_refund_skipped_after_weekly_reset(api):
+    api.user(603, tariff="creator")
+    user_id = _user_id(api, 603)
+
+    async def refund_across_reset():
+        stale = await quota.reserve(user_id)
+        async with async_session() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(content_week_reset_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await db.commit()
+        fresh = await quota.reserve(user_id)
+        await stale.refund()
+        return stale, fresh
+
+    stale, fresh = api.run(refund_across_reset)
+    assert stale.settled and fresh.week_reset_at > stale.week_reset_at
+    assert _used(api, user_id) == 1
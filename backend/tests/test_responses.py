@@ -0,0 +1,95 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.api.responses import CompressionMiddleware, FastJSONResponse, dumps
+from app.database import async_session
+from app.models import Channel, Competitor, CompetitorAdActivity
+
+
+class Slot(BaseModel):
+    hour_utc: int
+    score: float
+
+
+def test_dumps_matches_the_previous_wire_format():
+    at = datetime(2026, 3, 1, 12, 30, 5, 123456)
+    payload = {
+        "detected_at": at,
+        "cells": {3: np.float32(0.5)},
+        "counts": np.array([1, 2, 3]),
+        "best": [Slot(hour_utc=9, score=1.5)],
+    }
+    assert json.loads(dumps(payload)) == {
+        "detected_at": at.isoformat(),
+        "cells": {"3": 0.5},
+        "counts": [1, 2, 3],
+        "best": [{"hour_utc": 9, "score": 1.5}],
+    }
+
+
+def test_compression_skips_small_bodies_and_streams():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    body = "x" * 500
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/big")
+    async def big():
+        return {"body": body}
+
+    @app.get("/generate/stream")
+    async def stream():
+        return PlainTextResponse(body)
+
+    client = TestClient(app)
+    assert "content-encoding" not in client.get("/small").headers
+    resp = client.get("/big")
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.json() == {"body": body}
+    resp = client.get("/generate/stream")
+    assert "content-encoding" not in resp.headers
+    assert resp.text == body
+
+
+async def _seed_activities() -> int:
+    async with async_session() as db:
+        channel = Channel(owner_id=1, telegram_channel_id=-100)
+        db.add(channel)
+        await db.flush()
+        competitor = Competitor(owner_id=1, channel_id=channel.id, telegram_username="rival")
+        db.add(competitor)
+        await db.flush()
+        db.add_all(
+            CompetitorAdActivity(
+                competitor_id=competitor.id,
+                detected_at=datetime(2026, 1, 1) + timedelta(minutes=n),
+                description=f"ad {n}",
+            )
+            for n in range(30)
+        )
+        await db.commit()
+        return channel.id
+
+
+def test_large_api_page_is_gzipped(api):
+    headers = api.user(1)
+    channel_id = api.run(_seed_activities)
+    resp = api.client.get(
+        "/api/v1/competitors/ads-tracker",
+        params={"channel_id": channel_id, "page_size": 30},
+        headers={**headers, "Accept-Encoding": "gzip"},
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.headers["content-encoding"] == "gzip"
+    activities = resp.json()["activities"]
+    assert len(activities) == 30
+    assert activities[0]["detected_at"] == "2026-01-01T00:29:00"
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models import Channel, ChannelDailyRollup, ChannelStatsSnapshot, User
+from app.services import rollups, stats_import
+
+TODAY = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+async def _seed(telegram_id: int) -> int:
+    async with async_session() as db:
+        user = User(telegram_id=telegram_id)
+        db.add(user)
+        await db.flush()
+        channel = Channel(owner_id=user.id, telegram_channel_id=-telegram_id)
+        db.add(channel)
+        await db.flush()
+        records = [
+            {"timestamp": (TODAY - timedelta(days=n)).isoformat(), "views": 100, "reactions": 5, "subscribers": 1000 - n * 10}
+            for n in range(20)
+        ]
+        await stats_import.import_records(db, channel.id, records)
+        await db.commit()
+        return channel.id
+
+
+async def _rollup_rows(channel_id: int) -> list[tuple]:
+    async with async_session() as db:
+        rows = (await db.scalars(select(ChannelDailyRollup).where(ChannelDailyRollup.channel_id == channel_id).order_by(ChannelDailyRollup.day))).all()
+        return [(r.day, r.posts_count, r.total_views, r.running_posts, r.running_views, r.last_subscribers_count) for r in rows]
+
+
+async def _rebuild(channel_id: int) -> int:
+    async with async_session() as db:
+        days = await rollups.rebuild(db, channel_id)
+        await db.commit()
+        return days
+
+
+async def _write_snapshot_directly(channel_id: int) -> None:
+    async with async_session() as db:
+        day = TODAY.date()
+        db.add(ChannelStatsSnapshot(
+            channel_id=channel_id, period_type="daily", period_value=int(day.strftime("%Y%m%d")),
+            day_of_week=day.weekday(), posts_count=3, total_views=900, total_reactions=30, subscribers_count=1100,
+        ))
+        await db.commit()
+
+
+async def _window(channel_id: int, days: int):
+    async with async_session() as db:
+        return await rollups.window(db, channel_id, TODAY.date() - timedelta(days=days - 1), TODAY.date())
+
+
+def test_rebuild_matches_importer_and_picks_up_outside_snapshots(api):
+    channel_id = api.run(_seed, 1001)
+    maintained = api.run(_rollup_rows, channel_id)
+    assert api.run(_rebuild, channel_id) == 20
+    assert api.run(_rollup_rows, channel_id) == maintained
+
+    api.run(_write_snapshot_directly, channel_id)
+    assert api.run(_window, channel_id, 7).posts == 7
+    api.run(_rebuild, channel_id)
+    week = api.run(_window, channel_id, 7)
+    assert (week.posts, week.views, week.growth) == (10, 1600, 170)
+
+
+def test_growth_7d_is_pinned_while_growth_follows_period(api):
+    headers = api.user(1002)
+    channel_id = api.run(_seed, 1003)
+
+    async def adopt():
+        async with async_session() as db:
+            owner = await db.scalar(select(User.id).where(User.telegram_id == 1002))
+            channel = await db.get(Channel, channel_id)
+            channel.owner_id = owner
+            await db.commit()
+
+    api.run(adopt)
+    body = api.client.get(f"/api/v1/analytics/channel/{channel_id}?period_days=30", headers=headers).json()
+    assert (body["growth_7d"], body["growth"], body["period_days"]) == (70, 190, 30)
+
+
+def test_concurrent_writers_creating_the_same_day_both_land(api):
+    channel_id = api.run(_seed, 3)
+    day = TODAY.date() + timedelta(days=1)
+    before = api.run(_rollup_rows, channel_id)[-1]
+
+    async def apply(posts):
+        async with async_session() as db:
+            await rollups.apply_days(db, channel_id, {day: (posts, posts * 100, posts * 5, None)})
+            await db.commit()
+
+    async def scenario():
+        await asyncio.gather(apply(2), apply(3))
+
+    api.run(scenario)
+    last = api.run(_rollup_rows, channel_id)[-1]
+    assert last[:3] == (day, 5, 500)
+    assert last[3] == before[3] + 5
+    assert last[5] == before[5]
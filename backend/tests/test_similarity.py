@@ -0,0 +1,49 @@
+import os
+
+from app.database import async_session
+from app.models import Channel, ChannelCatalogEntry, User
+from app.services import similarity
+from app.services.auth import create_access_token
+
+
+def _seed(api):
+    async def seed():
+        async with async_session() as db:
+            user = User(telegram_id=701, tariff="strategist")
+            db.add(user)
+            await db.flush()
+            channel = Channel(owner_id=user.id, telegram_channel_id=-1001, username="coffee_daily", title="Coffee daily")
+            db.add(channel)
+            db.add_all([
+                ChannelCatalogEntry(username="coffee_news", title="Coffee news", subscribers_count=5000, search_text="coffee news"),
+                ChannelCatalogEntry(username="espresso_lab", title="Espresso and coffee lab", subscribers_count=8000, search_text="espresso"),
+                ChannelCatalogEntry(username="car_reviews", title="Car reviews", subscribers_count=9000, search_text="car"),
+            ])
+            await db.commit()
+            return user.id, channel.id
+
+    return api.run(seed)
+
+
+async def _refresh(index):
+    async with async_session() as db:
+        return await index.refresh(db)
+
+
+def test_scout_reads_index_built_out_of_band(api, monkeypatch, tmp_path):
+    index = similarity.SimilarityIndex(str(tmp_path / "index"))
+    monkeypatch.setattr(similarity, "_index", index)
+    user_id, channel_id = _seed(api)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+    url = f"/api/v1/partners/scout?channel_id={channel_id}"
+
+    resp = api.client.get(url, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json() == []
+    assert not os.path.exists(tmp_path / "index" / "meta.json")
+
+    assert api.run(_refresh, index) == 3
+    index.checked_at = 0
+    names = [c["username"] for c in api.client.get(url, headers=headers).json()]
+    assert names[0] == "coffee_news"
+    assert "espresso_lab" in names
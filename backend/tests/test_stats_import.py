@@ -0,0 +1,43 @@
+import asyncio
+import io
+
+from app.services import stats_import
+
+CSV = (
+    'timestamp,views,reactions,text\r\n'
+    '2024-01-01T10:00:00Z,100,5,"first line\r\nsecond, with comma\r\nthird ""quoted"""\r\n'
+    '\r\n'
+    '2024-01-02T11:00:00Z,200,7,plain\r\n'
+    '2024-01-03T12:00:00Z,300,9,"no trailing newline"'
+)
+
+
+def _aiter(data: bytes, size: int, fmt: str = "csv"):
+    async def chunks():
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+
+    async def collect():
+        return [r async for r in stats_import.aiter_records(chunks(), fmt)]
+
+    return asyncio.run(collect())
+
+
+def test_csv_quoted_newlines_survive_line_iteration():
+    records = list(stats_import.iter_records(io.StringIO(CSV, newline=""), "csv"))
+    assert [r["views"] for r in records] == ["100", "200", "300"]
+    assert records[0]["text"] == 'first line\r\nsecond, with comma\r\nthird "quoted"'
+    assert records[2]["text"] == "no trailing newline"
+
+
+def test_csv_quoted_newlines_survive_any_chunking():
+    data = ("﻿" + CSV).encode("utf-8")
+    expected = list(stats_import.iter_records([CSV], "csv"))
+    for size in (1, 2, 3, 7, 64, len(data)):
+        assert _aiter(data, size) == expected
+
+
+def test_ndjson_chunks():
+    data = b'{"timestamp": "2024-01-01T10:00:00", "views": 1}\n\n{"timestamp": 1704103200}\nnot json\n[1]'
+    records = _aiter(data, 5, "ndjson")
+    assert records == [{"timestamp": "2024-01-01T10:00:00", "views": 1}, {"timestamp": 1704103200}, {}, {}]
@@ -0,0 +1,88 @@
+import asyncio
+
+from app.services import cache, quota, user_cache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.messages = asyncio.Queue()
+        self.subscribed = asyncio.Event()
+        self.deleted = []
+
+    async def delete(self, *keys):
+        self.deleted.extend(keys)
+
+    async def publish(self, channel, message):
+        await self.messages.put({"type": "message", "channel": channel.encode(), "data": message.encode()})
+
+    def pubsub(self, **kwargs):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def subscribe(self, channel):
+        self.redis.subscribed.set()
+
+    async def get_message(self, timeout=None):
+        try:
+            async with asyncio.timeout(timeout):
+                return await self.redis.messages.get()
+        except TimeoutError:
+            return None
+
+
+def _dashboard_tariff(api, headers):
+    resp = api.client.get("/api/v1/analytics/dashboard", headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["tariff"]
+
+
+def test_tariff_change_reaches_cached_user(api):
+    headers = api.user(1, tariff="creator")
+    assert _dashboard_tariff(api, headers) == "creator"
+    assert user_cache._local.get(1)["tariff"] == "creator"
+
+    assert api.run(quota.set_tariff, 1, "agency")
+    assert user_cache._local.get(1) is None
+    assert _dashboard_tariff(api, headers) == "agency"
+    assert not api.run(quota.set_tariff, 999, "agency")
+
+
+def test_listener_drops_users_invalidated_by_other_workers(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "redis_client", lambda: redis)
+    monkeypatch.setattr(user_cache, "redis_client", lambda: redis)
+
+    async def wait_dropped(user_id):
+        for _ in range(100):
+            if user_cache._local.get(user_id) is None:
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    async def scenario():
+        user_cache.start_listener()
+        await redis.subscribed.wait()
+        for user_id in (1, 2, 3):
+            user_cache._local.set(user_id, {"id": user_id, "tariff": "creator"})
+
+        await redis.publish(user_cache.INVALIDATION_CHANNEL, "1,2")
+        assert await wait_dropped(1) and await wait_dropped(2)
+        assert user_cache._local.get(3) is not None
+
+        await user_cache.invalidate_user(3)
+        assert redis.deleted == ["user:3"]
+        assert await wait_dropped(3)
+        await user_cache.stop_listener()
+
+    user_cache._local.clear()
+    asyncio.run(scenario())
@@ -42,7 +42,7 @@ export default function CompetitorsPage() {
 
   useEffect(() => {
     if (!channelId) return;
-    getCompetitors(channelId).then(setCompetitors).catch(() => {});
+    getCompetitors(channelId).then((r) => setCompetitors(r.items)).catch(() => {});
     getBenchmark(channelId).then(setBenchmark).catch(() => {});
     getAdsTracker(channelId).then((r) => setAds(r.activities)).catch(() => {});
     getAudienceOverlap(channelId).then((r) => setOverlaps(r.overlaps)).catch(() => {});
@@ -2,11 +2,13 @@
 
 import { useEffect, useState } from "react";
 import Link from "next/link";
-import { getDashboard, type DashboardData } from "@/lib/api";
+import { useRouter } from "next/navigation";
+import { getDashboard, logout, type DashboardData } from "@/lib/api";
 
 export default function DashboardPage() {
   const [data, setData] = useState<DashboardData | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const router = useRouter();
 
   useEffect(() => {
     getDashboard()
@@ -39,7 +41,15 @@ export default function DashboardPage() {
         <Link href="/" className="text-xl font-bold text-growthkit-primary">
           GrowthKit
         </Link>
-        <span className="text-sm text-gray-400">Тариф: {data.tariff}</span>
+        <div className="flex items-center gap-4">
+          <span className="text-sm text-gray-400">Тариф: {data.tariff}</span>
+          <button
+            onClick={() => logout().then(() => router.push("/login"))}
+            className="text-sm text-gray-400 hover:text-white"
+          >
+            Выйти
+          </button>
+        </div>
       </header>
       <h2 className="text-2xl font-semibold mb-4">Мои каналы</h2>
       <div className="grid gap-4 md:grid-cols-2 lg:grid-cols-3">
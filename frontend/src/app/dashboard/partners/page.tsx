@@ -21,6 +21,9 @@ export default function PartnersPage() {
   const [scoutLoading, setScoutLoading] = useState(false);
   const [sent, setSent] = useState<NegotiationOut[]>([]);
   const [received, setReceived] = useState<NegotiationOut[]>([]);
+  const [sentCursor, setSentCursor] = useState<string | null>(null);
+  const [receivedCursor, setReceivedCursor] = useState<string | null>(null);
+  const [moreLoading, setMoreLoading] = useState(false);
   const [toUsername, setToUsername] = useState("");
   const [proposedText, setProposedText] = useState("");
   const [submitLoading, setSubmitLoading] = useState(false);
@@ -36,10 +39,40 @@ export default function PartnersPage() {
   }, [channelId]);
 
   useEffect(() => {
-    listNegotiations("sent").then((r) => setSent(r.items)).catch(() => {});
-    listNegotiations("received").then((r) => setReceived(r.items)).catch(() => {});
+    listNegotiations("sent")
+      .then((r) => {
+        setSent(r.items);
+        setSentCursor(r.next_cursor);
+      })
+      .catch(() => {});
+    listNegotiations("received")
+      .then((r) => {
+        setReceived(r.items);
+        setReceivedCursor(r.next_cursor);
+      })
+      .catch(() => {});
   }, []);
 
+  const loadMore = async (direction: "sent" | "received") => {
+    const cursor = direction === "sent" ? sentCursor : receivedCursor;
+    if (!cursor) return;
+    setMoreLoading(true);
+    try {
+      const page = await listNegotiations(direction, cursor);
+      if (direction === "sent") {
+        setSent((prev) => [...prev, ...page.items]);
+        setSentCursor(page.next_cursor);
+      } else {
+        setReceived((prev) => [...prev, ...page.items]);
+        setReceivedCursor(page.next_cursor);
+      }
+    } catch (e) {
+      setError(e instanceof Error ? e.message : "Ошибка загрузки");
+    } finally {
+      setMoreLoading(false);
+    }
+  };
+
   const runScout = async () => {
     if (!channelId) return;
     setScoutLoading(true);
@@ -193,6 +226,15 @@ export default function PartnersPage() {
             ))}
           </ul>
         )}
+        {sentCursor && (
+          <button
+            onClick={() => loadMore("sent")}
+            disabled={moreLoading}
+            className="mt-3 px-4 py-2 rounded-lg border border-gray-700 text-gray-300 disabled:opacity-50"
+          >
+            {moreLoading ? "..." : "Показать ещё"}
+          </button>
+        )}
       </section>
 
       <section>
@@ -216,6 +258,15 @@ export default function PartnersPage() {
             ))}
           </ul>
         )}
+        {receivedCursor && (
+          <button
+            onClick={() => loadMore("received")}
+            disabled={moreLoading}
+            className="mt-3 px-4 py-2 rounded-lg border border-gray-700 text-gray-300 disabled:opacity-50"
+          >
+            {moreLoading ? "..." : "Показать ещё"}
+          </button>
+        )}
       </section>
 
       {error && <p className="text-red-400 mt-4">{error}</p>}
@@ -2,6 +2,7 @@
 
 import { useEffect } from "react";
 import { useRouter } from "next/navigation";
+import { storeTokens } from "@/lib/api";
 
 declare global {
   interface Window {
@@ -42,7 +43,7 @@ export default function LoginPage() {
     });
     if (res.ok) {
       const data = await res.json();
-      localStorage.setItem("growthkit_token", data.access_token);
+      storeTokens(data);
       router.push("/dashboard");
     } else {
       const msg = await res.text();
@@ -5,9 +5,46 @@ function getToken(): string | null {
   return localStorage.getItem("growthkit_token");
 }
 
+export function storeTokens(tokens: { access_token: string; refresh_token: string }) {
+  localStorage.setItem("growthkit_token", tokens.access_token);
+  localStorage.setItem("growthkit_refresh_token", tokens.refresh_token);
+}
+
+function clearTokens() {
+  localStorage.removeItem("growthkit_token");
+  localStorage.removeItem("growthkit_refresh_token");
+}
+
+let refreshing: Promise<boolean> | null = null;
+
+function refreshTokens(): Promise<boolean> {
+  if (refreshing) return refreshing;
+  const refreshToken = typeof window === "undefined" ? null : localStorage.getItem("growthkit_refresh_token");
+  if (!refreshToken) return Promise.resolve(false);
+  refreshing = fetch(`${API_URL}/api/v1/auth/refresh`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ refresh_token: refreshToken }),
+  })
+    .then(async (res) => {
+      if (!res.ok) {
+        if (res.status === 401) clearTokens();
+        return false;
+      }
+      storeTokens(await res.json());
+      return true;
+    })
+    .catch(() => false)
+    .finally(() => {
+      refreshing = null;
+    });
+  return refreshing;
+}
+
 export async function api<T>(
   path: string,
-  options: RequestInit = {}
+  options: RequestInit = {},
+  retry = true
 ): Promise<T> {
   const token = getToken();
   const headers: HeadersInit = {
@@ -16,29 +53,75 @@ export async function api<T>(
   };
   if (token) (headers as Record<string, string>)["Authorization"] = `Bearer ${token}`;
   const res = await fetch(`${API_URL}${path}`, { ...options, headers });
+  if (res.status === 401 && retry && (await refreshTokens())) return api<T>(path, options, false);
   if (!res.ok) throw new Error(await res.text().catch(() => res.statusText));
+  if (res.status === 204) return undefined as T;
   return res.json();
 }
 
+export async function logout(): Promise<void> {
+  const refreshToken = localStorage.getItem("growthkit_refresh_token");
+  await api<void>("/api/v1/auth/logout", {
+    method: "POST",
+    body: refreshToken ? JSON.stringify({ refresh_token: refreshToken }) : undefined,
+  }).catch(() => {});
+  clearTokens();
+}
+
 export interface DashboardData {
   channels: { id: number; title: string | null; username: string | null; subscribers_count: number | null }[];
   tariff: string;
+  next_cursor: string | null;
+}
+
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
+function cursorParam(cursor?: string | null): string {
+  return cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+}
+
+export function getDashboard(cursor?: string | null): Promise<DashboardData> {
+  const q = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+  return api<DashboardData>(`/api/v1/analytics/dashboard${q}`);
+}
+
+export interface PortfolioChannel {
+  id: number;
+  title: string | null;
+  username: string | null;
+  subscribers_count: number | null;
+  growth: number | null;
+  er_estimate: number | null;
+  posts_count: number;
+  competitors_count: number;
+  pending_outgoing: number;
+  pending_incoming: number;
+}
+
+export interface PortfolioData {
+  channels: PortfolioChannel[];
+  tariff: string;
+  period_days: number;
 }
 
-export function getDashboard(): Promise<DashboardData> {
-  return api<DashboardData>("/api/v1/analytics/dashboard");
+export function getPortfolio(periodDays = 7): Promise<PortfolioData> {
+  return api<PortfolioData>(`/api/v1/analytics/portfolio?period_days=${periodDays}`);
 }
 
 export interface ChannelStats {
   channel_id: number;
   subscribers_count: number | null;
   growth_7d: number | null;
+  growth: number | null;
   er_estimate: number | null;
   period_days: number;
 }
 
-export function getChannelAnalytics(channelId: number): Promise<ChannelStats> {
-  return api<ChannelStats>(`/api/v1/analytics/channel/${channelId}`);
+export function getChannelAnalytics(channelId: number, periodDays = 7): Promise<ChannelStats> {
+  return api<ChannelStats>(`/api/v1/analytics/channel/${channelId}?period_days=${periodDays}`);
 }
 
 export function generatePost(topic: string, styleHint?: string): Promise<{ text: string; generated_at: string }> {
@@ -97,6 +180,7 @@ export interface HeatmapData {
   cells: HeatmapCell[];
   best_post_hour_utc: number;
   best_reply_hour_utc: number;
+  best_slots: { hour_utc: number; day_of_week: number; score: number }[];
 }
 
 export function getChannelHeatmap(channelId: number): Promise<HeatmapData> {
@@ -123,9 +207,12 @@ export interface CompetitorOut {
   created_at: string;
 }
 
-export function getCompetitors(channelId?: number): Promise<CompetitorOut[]> {
-  const q = channelId != null ? `?channel_id=${channelId}` : "";
-  return api<CompetitorOut[]>(`/api/v1/competitors${q}`);
+export function getCompetitors(channelId?: number, cursor?: string | null): Promise<Page<CompetitorOut>> {
+  const params = new URLSearchParams();
+  if (channelId != null) params.set("channel_id", String(channelId));
+  if (cursor) params.set("cursor", cursor);
+  const q = params.toString();
+  return api<Page<CompetitorOut>>(`/api/v1/competitors${q ? `?${q}` : ""}`);
 }
 
 export function addCompetitor(channelId: number, telegramUsername: string, title?: string): Promise<CompetitorOut> {
@@ -141,6 +228,14 @@ export interface BenchmarkData {
   your_er_estimate: number;
   niche_avg_subscribers: number;
   niche_avg_er: number;
+  niche_median_subscribers: number | null;
+  niche_p25_subscribers: number | null;
+  niche_p75_subscribers: number | null;
+  niche_median_er: number | null;
+  niche_p25_er: number | null;
+  niche_p75_er: number | null;
+  your_subscribers_percentile: number | null;
+  your_er_percentile: number | null;
   competitors_count: number;
 }
 
@@ -155,9 +250,9 @@ export interface AdsActivity {
   description: string | null;
 }
 
-export function getAdsTracker(channelId: number, competitorId?: number): Promise<{ activities: AdsActivity[] }> {
+export function getAdsTracker(channelId: number, competitorId?: number, cursor?: string | null): Promise<{ activities: AdsActivity[]; next_cursor: string | null }> {
   const q = competitorId != null ? `&competitor_id=${competitorId}` : "";
-  return api<{ activities: AdsActivity[] }>(`/api/v1/competitors/ads-tracker?channel_id=${channelId}${q}`);
+  return api<{ activities: AdsActivity[]; next_cursor: string | null }>(`/api/v1/competitors/ads-tracker?channel_id=${channelId}${q}${cursorParam(cursor)}`);
 }
 
 export interface AudienceOverlapItem {
@@ -166,6 +261,7 @@ export interface AudienceOverlapItem {
   competitor_title: string | null;
   overlap_estimate: number | null;
   came_from_you_estimate: number | null;
+  jaccard_estimate: number | null;
 }
 
 export function getAudienceOverlap(channelId: number): Promise<{ channel_id: number; overlaps: AudienceOverlapItem[] }> {
@@ -202,8 +298,8 @@ export function createNegotiation(fromChannelId: number, toChannelUsername: stri
   });
 }
 
-export function listNegotiations(direction: "sent" | "received"): Promise<{ items: NegotiationOut[]; direction: string }> {
-  return api<{ items: NegotiationOut[]; direction: string }>(`/api/v1/partners/negotiation?direction=${direction}`);
+export function listNegotiations(direction: "sent" | "received", cursor?: string | null): Promise<Page<NegotiationOut> & { direction: string }> {
+  return api<Page<NegotiationOut> & { direction: string }>(`/api/v1/partners/negotiation?direction=${direction}${cursorParam(cursor)}`);
 }
 
 export function acceptNegotiation(requestId: number): Promise<{ status: string }> {